@@ -40,7 +40,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'core',
     'rest_framework',
-    'rest_framework.authtoken',
     'drf_spectacular',
     'user',
     'task',
@@ -54,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -80,13 +80,24 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_CONN_MAX_AGE is how many seconds a connection is reused by later requests, 0 closes it after
+# every request and 'none' never does. With DB_CONN_HEALTH_CHECKS, a reused connection is pinged
+# before each request and replaced if the database dropped it, see 'core.db'. Set DB_PGBOUNCER
+# when connecting through PgBouncer in transaction pooling mode, which cannot hold server-side
+# cursors between transactions.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true',
         'TEST': {
             'NAME': 'testdatabase',
         },
@@ -94,6 +105,30 @@ DATABASES = {
 }
 
 
+# Read replicas for the task list, detail and stats, as comma separated 'host' or 'host:port'
+# in DB_REPLICA_HOSTS. Reads fall back to the primary when a replica is down or lags more than
+# MAX_LAG seconds, checked every CHECK_INTERVAL seconds, and for PIN_SECONDS after a user writes
+# so they read their own writes. Set CACHE_ALIAS to a shared cache so pins hold across processes.
+DB_REPLICA_HOSTS = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+for index, replica_host in enumerate(DB_REPLICA_HOSTS):
+    replica_host, _, replica_port = replica_host.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [f'replica_{index}' for index in range(len(DB_REPLICA_HOSTS))],
+    'MAX_LAG': float(os.environ.get('DB_REPLICA_MAX_LAG', 5)),
+    'CHECK_INTERVAL': float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5)),
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10)),
+    'CACHE_ALIAS': os.environ.get('DB_REPLICA_PIN_CACHE_ALIAS', 'default'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -139,6 +174,152 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Fail any test request that runs more queries than its view's 'query_budget'.
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Hasher of new passwords, 'pbkdf2_sha256' or 'argon2', and its work factor. Passwords stored
+# with another hasher or work factor still verify, and are rehashed when their user logs in.
+# The Argon2 defaults are the 19 MiB, 2 passes and 1 lane of the OWASP minimum, about 8 times
+# the logins per core of Django's 100 MiB and 8 lanes, see 'benchmarks.login'.
+PASSWORD_HASHING = {
+    'HASHER': os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256'),
+    'PBKDF2_ITERATIONS': int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000)),
+    'ARGON2_TIME_COST': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)),
+}
+
+_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = sorted(_PASSWORD_HASHERS.values(), key=lambda path: path != _PASSWORD_HASHERS[PASSWORD_HASHING['HASHER']])
+
+# Failed logins per email allowed within TIMEOUT seconds before '/api/user/token/' answers 429
+# without checking the password, see 'core.authentication.LoginThrottle'. Set
+# LOGIN_THROTTLE_CACHE_ALIAS to a shared cache in CACHES to count failures across processes.
+LOGIN_THROTTLE = {
+    'MAX_FAILURES': int(os.environ.get('LOGIN_THROTTLE_MAX_FAILURES', 5)),
+    'TIMEOUT': int(os.environ.get('LOGIN_THROTTLE_TIMEOUT', 300)),
+    'CACHE_ALIAS': os.environ.get('LOGIN_THROTTLE_CACHE_ALIAS', 'default'),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TokenBucketThrottle'],
+}
+
+# Token bucket rate limits per user (per client address before login), see 'core.throttling'. Each
+# API_THROTTLE_<SCOPE> is 'rate,burst': requests per second, and requests that may be sent at once.
+# Buckets are kept in each process, set API_THROTTLE_REDIS_URL to share them between nodes.
+API_THROTTLE_SCOPES = {
+    'read': '20,200',
+    'write': '5,50',
+    'bulk': '0.5,10',
+    'login': '0.1,10',
+    'signup': '0.01,5',
+}
+API_THROTTLE = {
+    'ENABLED': os.environ.get('API_THROTTLE', 'true').lower() == 'true',
+    'REDIS_URL': os.environ.get('API_THROTTLE_REDIS_URL') or None,
+    'MAX_SIZE': int(os.environ.get('API_THROTTLE_MAX_SIZE', 100000)),
+    'SCOPES': {
+        scope: tuple(float(value) for value in os.environ.get(f'API_THROTTLE_{scope.upper()}', default).split(','))
+        for scope, default in API_THROTTLE_SCOPES.items()
+    },
+}
+
+# Seconds an API token issued by '/api/user/token/' stays valid. Logins reuse the user's token until
+# it expires. Delete expired tokens with 'python manage.py purge_auth_tokens'.
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 60 * 60 * 24 * 30))
+
+# Token -> user lookups cached by 'core.authentication.CachedTokenAuthentication'. Set
+# TOKEN_AUTH_CACHE_ALIAS to a shared cache in CACHES to share lookups between processes.
+TOKEN_AUTH_CACHE = {
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS') or None,
+}
+
+# Cache backends by name, for the *_CACHE_BACKEND variables. 'locmem' is private to each process,
+# 'file' is shared by the processes of a host and 'redis' (any server speaking its protocol, with
+# a redis:// LOCATION) by every host.
+_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+TASK_LIST_CACHE_BACKEND = os.environ.get('TASK_LIST_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS['locmem'],
+    },
+    'task_list': {
+        'BACKEND': _CACHE_BACKENDS[TASK_LIST_CACHE_BACKEND],
+        'LOCATION': os.environ.get('TASK_LIST_CACHE_LOCATION', 'task-list'),
+        'OPTIONS': {} if TASK_LIST_CACHE_BACKEND == 'redis' else {
+            'MAX_ENTRIES': int(os.environ.get('TASK_LIST_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Task list responses cached per user for TIMEOUT seconds, see 'task.cache'. Every write to a user's
+# tasks drops their cached lists, so stale lists are only served if a process misses the write:
+# with more than one process, use the 'file' or 'redis' TASK_LIST_CACHE_BACKEND.
+TASK_LIST_CACHE = {
+    'ENABLED': os.environ.get('TASK_LIST_CACHE', 'false').lower() == 'true',
+    'TIMEOUT': int(os.environ.get('TASK_LIST_CACHE_TIMEOUT', 300)),
+    'CACHE_ALIAS': 'task_list',
+}
+
+# Keyset pagination for the task list, enabled per request with 'cursor' or 'page_size'.
+TASK_PAGINATION = {
+    'PAGE_SIZE': int(os.environ.get('TASK_PAGE_SIZE', 100)),
+    'MAX_PAGE_SIZE': int(os.environ.get('TASK_MAX_PAGE_SIZE', 1000)),
+}
+
+# Serialize the task list from 'values()' rows with 'task.serializers.RowSerializer' instead of
+# 'TaskSerializer'. The output is identical, see 'benchmarks/serializers.py' for the speed up.
+TASK_FAST_LIST_SERIALIZATION = os.environ.get('TASK_FAST_LIST_SERIALIZATION', 'false').lower() == 'true'
+
+# Delta sync at /api/task/sync/. Changes younger than SETTLE_SECONDS are held back until
+# any transaction that stamped an earlier 'updated_at' has had time to commit.
+TASK_SYNC = {
+    'PAGE_SIZE': int(os.environ.get('TASK_SYNC_PAGE_SIZE', 500)),
+    'MAX_PAGE_SIZE': int(os.environ.get('TASK_SYNC_MAX_PAGE_SIZE', 5000)),
+    'SETTLE_SECONDS': float(os.environ.get('TASK_SYNC_SETTLE_SECONDS', 1)),
+}
+
+# Rows fetched per round trip when streaming task exports.
+TASK_EXPORT_CHUNK_SIZE = int(os.environ.get('TASK_EXPORT_CHUNK_SIZE', 2000))
+
+# Task imports validate and write BATCH_SIZE rows per transaction and report up to MAX_ERRORS failed rows.
+TASK_IMPORT = {
+    'BATCH_SIZE': int(os.environ.get('TASK_IMPORT_BATCH_SIZE', 5000)),
+    'MAX_ERRORS': int(os.environ.get('TASK_IMPORT_MAX_ERRORS', 100)),
+}
+
+# Completed tasks are moved to the archive table this many days after they were completed (and
+# were due), by the 'archive_tasks' command, see 'task.archive'. Lists only read the archive for
+# date ranges starting before this age, so after raising it ranges between the old and new age
+# miss the tasks archived under the old one.
+TASK_ARCHIVE = {
+    'AFTER_DAYS': int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', 90)),
+}
+
+# Largest number of tasks a single bulk create, update or complete request may touch.
+TASK_BULK_MAX_ITEMS = int(os.environ.get('TASK_BULK_MAX_ITEMS', 1000))
+
+# Whether '/health/ready/' also waits for every migration to be applied, see 'core.views'.
+HEALTH_CHECK_MIGRATIONS = os.environ.get('HEALTH_CHECK_MIGRATIONS', 'true').lower() == 'true'
+
+# Per-request query count, SQL time, render time and response size, see 'core.middleware'. Set
+# ENFORCE_BUDGETS to fail requests over their view's query budget instead of logging a warning.
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING', 'true').lower() == 'true',
+    'SERVER_TIMING': os.environ.get('REQUEST_PROFILING_SERVER_TIMING', 'true').lower() == 'true',
+    'ENFORCE_BUDGETS': os.environ.get('REQUEST_PROFILING_ENFORCE_BUDGETS', 'false').lower() == 'true',
 }
@@ -0,0 +1,11 @@
+"""
+Micro benchmarks, run from the 'app' directory with 'python -m benchmarks.<name>'.
+"""
+import os
+
+
+def setup():
+    """Configure Django so benchmarks can import models and serializers."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
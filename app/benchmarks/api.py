@@ -0,0 +1,258 @@
+"""
+Reproducible load test of the token, user and task endpoints, written to a JSON report.
+
+Seed users and tasks into the database the server uses, start the server, then run the
+scenario against it and compare reports between commits:
+
+    python -m benchmarks.api seed [--users 10] [--tasks 10000]
+    API_THROTTLE=false python manage.py runserver 0.0.0.0:8000 --noreload
+    python -m benchmarks.api run [--concurrency 10] [--requests 2000] [--output report.json]
+    python -m benchmarks.api compare base.json report.json
+
+Every run sends the same sequence of requests for a given '--random-seed', spread over a
+fixed number of concurrent clients. Query counts are read from the 'Server-Timing' header,
+so they are only reported while request profiling is enabled. Rate limiting must be off:
+a run that is answered '429 Too Many Requests' stops without a report, as its latencies
+would not be comparable.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks import setup
+from benchmarks.client import parse_url, query_count, request
+
+EMAIL = 'bench-{}@example.com'
+PASSWORD = 'benchmarkpassword'
+
+THROTTLED = 'The server answered 429 Too Many Requests, restart it with API_THROTTLE=false.'
+
+# Relative weight of each operation in the scenario.
+MIX = {
+    'token': 1,
+    'me': 4,
+    'list': 40,
+    'detail': 25,
+    'create': 15,
+    'complete': 15,
+}
+
+
+def seed(users, tasks, batch_size):
+    """Replace the benchmark users with 'users' users of 'tasks' tasks each."""
+    setup()
+    from django.core.management import call_command
+
+    call_command(
+        'generate_data', users=users, tasks=tasks, email_prefix='bench', password=PASSWORD,
+        replace=True, batch_size=batch_size,
+    )
+
+
+def make_plan(total, mix, random_seed):
+    """Return the operation of each of the 'total' requests."""
+    rng = random.Random(random_seed)
+    names = list(mix)
+    return rng.choices(names, weights=[mix[name] for name in names], k=total)
+
+
+class Scenario:
+    """The requests of each operation, for the benchmark users."""
+
+    def __init__(self, host, port, users, random_seed):
+        self.host = host
+        self.port = port
+        self.users = users
+        self.rng = random.Random(random_seed)
+        self.tokens = {}
+        self.task_ids = {}
+        self.created = 0
+
+    async def prepare(self):
+        """Fetch a token and the first page of task ids of every benchmark user."""
+        for i in range(self.users):
+            email = EMAIL.format(i)
+            res = await request(self.host, self.port, 'POST', '/api/user/token/', data={'email': email, 'password': PASSWORD})
+            if res.status == 429:
+                raise SystemExit(THROTTLED)
+            if res.status != 200:
+                raise SystemExit(f'Could not log in as {email} ({res.status}), seed the database first.')
+            self.tokens[email] = json.loads(res.body)['token']
+            res = await request(self.host, self.port, 'GET', '/api/task/?page_size=1000', token=self.tokens[email])
+            self.task_ids[email] = [task['id'] for task in json.loads(res.body)['results']]
+            if not self.task_ids[email]:
+                raise SystemExit(f'{email} has no tasks, seed the database first.')
+
+    def build(self, name):
+        """Return the (method, path, token, data) of a request for the operation 'name'."""
+        email = self.rng.choice(sorted(self.tokens))
+        token = self.tokens[email]
+        if name == 'token':
+            return 'POST', '/api/user/token/', None, {'email': email, 'password': PASSWORD}
+        if name == 'me':
+            return 'GET', '/api/user/me/', token, None
+        if name == 'list':
+            today = date.today()
+            query = self.rng.choice([
+                'page_size=50',
+                'page_size=50&is_completed=false',
+                f'page_size=50&start_date={today}&end_date={today + timedelta(days=30)}',
+            ])
+            return 'GET', f'/api/task/?{query}', token, None
+        if name == 'detail':
+            return 'GET', f'/api/task/{self.rng.choice(self.task_ids[email])}/', token, None
+        if name == 'create':
+            self.created += 1
+            date_due = datetime.now(timezone.utc) + timedelta(days=self.rng.randint(1, 30))
+            return 'POST', '/api/task/', token, {'title': f'Benchmark task {self.created}', 'date_due': date_due.isoformat()}
+        if name == 'complete':
+            task_id = self.rng.choice(self.task_ids[email])
+            return 'PATCH', f'/api/task/{task_id}/', token, {'is_completed': self.rng.random() < 0.5}
+        raise ValueError(f'Unknown operation "{name}".')
+
+
+def percentile(quantiles, n):
+    return round(quantiles[n - 1] * 1000, 2) if quantiles else None
+
+
+def summarize(samples, seconds):
+    """Return the request count, errors, throughput, latency percentiles and query counts of samples."""
+    latencies = [latency for ok, latency, _ in samples if ok]
+    queries = [count for ok, _, count in samples if ok and count is not None]
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(latencies),
+        'throughput': round(len(latencies) / seconds, 2),
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+        'queries_mean': round(statistics.mean(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+async def run_scenario(args):
+    """Run the scenario and return its report."""
+    host, port = parse_url(args.url)
+    scenario = Scenario(host, port, args.users, args.random_seed)
+    await scenario.prepare()
+
+    plan = iter(make_plan(args.requests, MIX, args.random_seed))
+    samples = defaultdict(list)
+
+    async def client():
+        for name in plan:
+            method, path, token, data = scenario.build(name)
+            start = time.perf_counter()
+            try:
+                res = await request(host, port, method, path, token=token, data=data)
+            except OSError:
+                samples[name].append((False, None, None))
+                continue
+            ok = res.status < 400
+            samples[name].append((ok, time.perf_counter() - start, query_count(res)))
+            throttled[name] += res.status == 429
+
+    throttled = defaultdict(int)
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    seconds = time.perf_counter() - start
+    if any(throttled.values()):
+        counts = ', '.join(f'{count} {name}' for name, count in sorted(throttled.items()) if count)
+        raise SystemExit(f'{THROTTLED} Throttled requests: {counts}.')
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'url': args.url,
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'random_seed': args.random_seed,
+            'mix': MIX,
+        },
+        'seconds': round(seconds, 3),
+        'total': summarize([sample for name in samples for sample in samples[name]], seconds),
+        'endpoints': {name: summarize(samples[name], seconds) for name in sorted(samples)},
+    }
+
+
+def git(*args):
+    result = subprocess.run(['git', *args], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def print_report(report):
+    print(f'{"endpoint":>9} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50":>9} {"p95":>9} {"p99":>9} {"queries":>8}')
+    for name, result in [*report['endpoints'].items(), ('total', report['total'])]:
+        print(
+            f'{name:>9} {result["requests"]:>9} {result["errors"]:>7} {result["throughput"]:>8.1f}'
+            + ''.join(f' {format_number(result[key], "ms"):>9}' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            + f' {format_number(result["queries_mean"]):>8}'
+        )
+
+
+def format_number(value, unit=''):
+    return '-' if value is None else f'{value:.1f}{unit}'
+
+
+def compare(base, head):
+    """Print the change of every metric between two reports."""
+    print(f'{base["commit"]} -> {head["commit"]}')
+    print(f'{"endpoint":>9} {"metric":>12} {"base":>10} {"head":>10} {"change":>8}')
+    for name in [*sorted(set(base['endpoints']) | set(head['endpoints'])), 'total']:
+        old = base['total'] if name == 'total' else base['endpoints'].get(name, {})
+        new = head['total'] if name == 'total' else head['endpoints'].get(name, {})
+        for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_mean', 'errors'):
+            before, after = old.get(metric), new.get(metric)
+            change = f'{(after - before) / before * 100:+.1f}%' if before and after is not None else '-'
+            print(f'{name:>9} {metric:>12} {format_number(before):>10} {format_number(after):>10} {change:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='Replace the benchmark users and their tasks.')
+    seed_parser.add_argument('--users', type=int, default=10)
+    seed_parser.add_argument('--tasks', type=int, default=10000, help='Tasks per user.')
+    seed_parser.add_argument('--batch-size', type=int, default=10000)
+
+    run_parser = commands.add_parser('run', help='Run the scenario against a server.')
+    run_parser.add_argument('--url', default='http://0.0.0.0:8000', help='Base url of the server.')
+    run_parser.add_argument('--users', type=int, default=10, help='Seeded users to spread the requests over.')
+    run_parser.add_argument('--concurrency', type=int, default=10)
+    run_parser.add_argument('--requests', type=int, default=2000)
+    run_parser.add_argument('--random-seed', type=int, default=0)
+    run_parser.add_argument('--output', help='Path of the JSON report.')
+
+    compare_parser = commands.add_parser('compare', help='Compare two JSON reports.')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        seed(args.users, args.tasks, args.batch_size)
+    elif args.command == 'run':
+        report = asyncio.run(run_scenario(args))
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+                file.write('\n')
+    else:
+        with open(args.base) as base, open(args.head) as head:
+            compare(json.load(base), json.load(head))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Minimal asyncio HTTP/1.1 client for the load tests, so they need no extra dependencies.
+"""
+import asyncio
+import json
+import re
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+Response = namedtuple('Response', ['status', 'headers', 'body'])
+
+QUERY_COUNT_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+def parse_url(url):
+    """Return the (host, port) of a base url."""
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or 80
+
+
+async def request(host, port, method, path, token=None, data=None):
+    """Send a request over a new connection and return its 'Response'.
+
+    'data' is sent as a JSON body. The response body is returned undecoded.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {host}', 'Connection: close']
+        if token:
+            lines.append(f'Authorization: Token {token}')
+        if data is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin1') + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return Response(int(status_line.split()[1]), headers, await reader.read())
+    finally:
+        writer.close()
+
+
+def query_count(response):
+    """Return the number of queries reported in the 'Server-Timing' header, or None."""
+    match = QUERY_COUNT_PATTERN.search(response.headers.get('server-timing', ''))
+    return int(match.group(1)) if match else None
@@ -0,0 +1,60 @@
+"""
+Compare the per-request database latency of new, persistent and health checked connections.
+
+Each simulated request sends 'request_started', runs '--queries' trivial queries and sends
+'request_finished', so connections are opened, checked and closed exactly as for a real
+request. Run it against the database configured by the 'DB_*' environment variables:
+
+    python -m benchmarks.connections [--requests 500] [--queries 3]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup
+
+# Name -> (CONN_MAX_AGE, CONN_HEALTH_CHECKS).
+CONFIGS = {
+    'new connection': (0, False),
+    'persistent': (60, False),
+    'persistent + checks': (60, True),
+}
+
+
+def measure(requests, queries):
+    """Return the latency in seconds of each simulated request."""
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        request_started.send(sender=None)
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+        request_finished.send(sender=None)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=3, help='Queries run by each request.')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    print(f'{"connections":>20} {"p50":>9} {"p99":>9} {"req/s":>8}')
+    for name, (max_age, health_checks) in CONFIGS.items():
+        connection.close()
+        connection.settings_dict.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+        latencies = measure(args.requests, args.queries)
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f'{name:>20} {quantiles[49] * 1000:>7.2f}ms {quantiles[98] * 1000:>7.2f}ms {len(latencies) / sum(latencies):>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the throughput and latency of the sync and async task list under ASGI.
+
+Start the app under an ASGI server, then point the load test at it:
+
+    uvicorn app.asgi:application --workers 1
+    python -m benchmarks.load_test --token <token> [--concurrency 100] [--requests 2000] [--slow-clients 1000]
+
+'--slow-clients' holds that many extra connections open, trickling their request headers,
+for the whole run.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.client import parse_url, request
+
+PATHS = {'sync': '/api/task/', 'async': '/api/task/async/'}
+
+
+async def slow_client(host, port, path, stop):
+    """Hold a connection open by sending one header line a second until 'stop' is set."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'.encode('latin1'))
+        while not stop.is_set():
+            writer.write(b'X-Slow: 1\r\n')
+            await writer.drain()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run(host, port, path, token, concurrency, total):
+    """Send 'total' requests with 'concurrency' in flight and return (seconds, latencies, errors)."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = (await request(host, port, 'GET', path, token=token)).status
+            except OSError:
+                status = None
+            if status != 200:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def main(args):
+    host, port = parse_url(args.url)
+    print(f'{"view":>6} {"req/s":>9} {"p50":>9} {"p99":>9} {"errors":>7}')
+    for name in args.views:
+        path = PATHS[name] + (f'?{args.query}' if args.query else '')
+        stop = asyncio.Event()
+        slow_clients = [asyncio.ensure_future(slow_client(host, port, path, stop)) for _ in range(args.slow_clients)]
+        await request(host, port, 'GET', path, token=args.token)
+        seconds, latencies, errors = await run(host, port, path, args.token, args.concurrency, args.requests)
+        stop.set()
+        await asyncio.gather(*slow_clients)
+
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=100)
+            p50, p99 = quantiles[49] * 1000, quantiles[98] * 1000
+        else:
+            p50 = p99 = float('nan')
+        print(f'{name:>6} {len(latencies) / seconds:>9.1f} {p50:>7.1f}ms {p99:>7.1f}ms {errors:>7}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base url of the ASGI server.')
+    parser.add_argument('--token', required=True, help='API token of the user whose tasks are listed.')
+    parser.add_argument('--query', default='page_size=50', help='Query string for the task list.')
+    parser.add_argument('--views', nargs='+', choices=PATHS, default=list(PATHS))
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--slow-clients', type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
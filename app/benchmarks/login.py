@@ -0,0 +1,62 @@
+"""
+Measure how many logins a core verifies per second with each password hashing configuration.
+
+Each login is one 'check_password' against a stored hash, which is nearly all of the CPU
+time of '/api/user/token/':
+
+    python -m benchmarks.login [--configs pbkdf2-260k argon2-m100-t2-p8 ...] [--seconds 3]
+
+Logins per CPU second is the throughput of one core. Argon2 with a parallelism above 1
+runs its lanes in threads, so its wall clock rate on an idle machine can be higher.
+"""
+import argparse
+import time
+
+from benchmarks import setup
+
+PBKDF2 = ['core.hashers.PBKDF2PasswordHasher']
+ARGON2 = ['core.hashers.Argon2PasswordHasher']
+
+# Name -> (PASSWORD_HASHERS, PASSWORD_HASHING).
+CONFIGS = {
+    'pbkdf2-260k': (PBKDF2, {'PBKDF2_ITERATIONS': 260000}),
+    'pbkdf2-100k': (PBKDF2, {'PBKDF2_ITERATIONS': 100000}),
+    'argon2-m100-t2-p8': (ARGON2, {'ARGON2_TIME_COST': 2, 'ARGON2_MEMORY_COST': 102400, 'ARGON2_PARALLELISM': 8}),
+    'argon2-m19-t2-p1': (ARGON2, {'ARGON2_TIME_COST': 2, 'ARGON2_MEMORY_COST': 19456, 'ARGON2_PARALLELISM': 1}),
+    'argon2-m46-t1-p1': (ARGON2, {'ARGON2_TIME_COST': 1, 'ARGON2_MEMORY_COST': 47104, 'ARGON2_PARALLELISM': 1}),
+}
+
+
+def measure(seconds):
+    """Verify a password for at least 'seconds' and return (logins per second, logins per CPU second)."""
+    from django.contrib.auth.hashers import check_password, make_password
+
+    encoded = make_password('securepassword909')
+    count = 0
+    start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start < seconds:
+        if not check_password('securepassword909', encoded):
+            raise SystemExit('Password did not verify.')
+        count += 1
+    return count / (time.perf_counter() - start), count / (time.process_time() - cpu_start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', choices=CONFIGS, default=list(CONFIGS))
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import override_settings
+
+    print(f'{"config":>18} {"logins/s":>9} {"per core":>9}')
+    for name in args.configs:
+        hashers, config = CONFIGS[name]
+        with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASHING=config):
+            rate, cpu_rate = measure(args.seconds)
+        print(f'{name:>18} {rate:>9.1f} {cpu_rate:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare 'TaskSerializer' with the 'RowSerializer' fast path used for the task list.
+
+Rows are built in memory, so only serialization and rendering are measured:
+
+    python -m benchmarks.serializers [--sizes 1000 10000 100000] [--repeat 3]
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup
+
+
+def make_rows(count):
+    """Return 'count' task rows as 'values()' dicts, with some undated and completed tasks."""
+    now = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': i,
+            'title': f'Task {i}',
+            'date_created': now,
+            'date_due': None if i % 10 == 0 else now + timedelta(minutes=i, microseconds=i),
+            'date_completed': now + timedelta(days=1) if i % 3 == 0 else None,
+            'is_completed': i % 3 == 0,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from core.models import Task
+    from task.serializers import RowSerializer, TaskSerializer
+
+    row_serializer = RowSerializer(TaskSerializer)
+    renderer = JSONRenderer()
+
+    print(f'{"rows":>8} {"serializer":>12} {"fast path":>12} {"speed up":>9}')
+    for size in args.sizes:
+        rows = make_rows(size)
+        tasks = [Task(**row) for row in rows]
+
+        def serializer():
+            return renderer.render(TaskSerializer(tasks, many=True).data)
+
+        def fast_path():
+            return renderer.render(row_serializer.many(rows))
+
+        if serializer() != fast_path():
+            raise SystemExit(f'Outputs differ for {size} rows.')
+
+        slow = min(timeit.repeat(serializer, number=1, repeat=args.repeat))
+        fast = min(timeit.repeat(fast_path, number=1, repeat=args.repeat))
+        print(f'{size:>8} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
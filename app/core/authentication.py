@@ -0,0 +1,205 @@
+"""
+Authentication classes for the APIs.
+"""
+import copy
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import AuthToken
+
+
+class TokenCache:
+    """In-process LRU cache of token key -> (user, token), with a time to live.
+
+    When 'TOKEN_AUTH_CACHE["CACHE_ALIAS"]' names a Django cache, entries are also stored
+    there so processes can share lookups, along with a random generation per token key.
+    Local entries are only used while the shared generation is the one they were stored
+    under, which costs a shared cache read per lookup, and invalidation deletes it, so a
+    token deleted in one process is refused by all of them at once. Users are stored there
+    without their password hash, see 'shareable'.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE', {})
+
+    @property
+    def shared_cache(self):
+        alias = self.config.get('CACHE_ALIAS')
+        return caches[alias] if alias else None
+
+    def generation_key(self, key):
+        return f'{self.key_prefix}{key}:generation'
+
+    def get(self, key):
+        """Return the cached (user, token) for a token key, or None."""
+        now = time.monotonic()
+        shared_cache = self.shared_cache
+        generation = None
+        if shared_cache is not None:
+            generation = shared_cache.get(self.generation_key(key))
+            if generation is None:
+                return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, entry_generation, value = entry
+                if expires > now and entry_generation == generation:
+                    self._entries.move_to_end(key)
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+        if shared_cache is not None:
+            entry = shared_cache.get(self.key_prefix + key)
+            if entry is not None and entry[0] == generation:
+                self._set_local(key, generation, entry[1], now)
+                return entry[1]
+        return None
+
+    def set(self, key, value):
+        """Cache the (user, token) for a token key."""
+        shared_cache = self.shared_cache
+        generation = None
+        if shared_cache is not None:
+            timeout = self.config.get('TIMEOUT', 60)
+            generation_key = self.generation_key(key)
+            generation = secrets.token_hex(8)
+            if not shared_cache.add(generation_key, generation, timeout):
+                generation = shared_cache.get(generation_key, generation)
+            shared_cache.set(self.key_prefix + key, (generation, self.shareable(value)), timeout)
+        self._set_local(key, generation, value, time.monotonic())
+
+    def shareable(self, value):
+        """Return a copy of a (user, token) to store in the shared cache, without the user's password hash.
+
+        The password is left deferred, so it is only read from the database if it is used,
+        and saving the user does not write it.
+        """
+        user, token = value
+        user = copy.copy(user)
+        user.__dict__.pop('password', None)
+        return user, token
+
+    def _set_local(self, key, generation, value, now):
+        max_size = self.config.get('MAX_SIZE', 10000)
+        with self._lock:
+            self._entries[key] = (now + self.config.get('TIMEOUT', 60), generation, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        """Remove token keys from the cache."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared_cache = self.shared_cache
+        if shared_cache is not None and keys:
+            shared_cache.delete_many([name for key in keys for name in (self.generation_key(key), self.key_prefix + key)])
+
+    def clear(self):
+        """Remove every entry from the local cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class LoginThrottle:
+    """Failed login attempts, kept in the 'LOGIN_THROTTLE["CACHE_ALIAS"]' cache.
+
+    Once an email has failed 'MAX_FAILURES' times within 'TIMEOUT' seconds, its logins are
+    refused without hashing until the failures expire. Below that, repeating a password that
+    already failed against the user's current password hash is refused without hashing too.
+    Those attempts are remembered by an HMAC of the email, password and stored hash, so a
+    password change forgets them.
+    """
+    key_prefix = 'login-failure:'
+
+    @property
+    def config(self):
+        return getattr(settings, 'LOGIN_THROTTLE', {})
+
+    @property
+    def cache(self):
+        return caches[self.config.get('CACHE_ALIAS', 'default')]
+
+    def failures_key(self, email):
+        return self.key_prefix + salted_hmac(self.key_prefix, email).hexdigest()
+
+    def attempt_key(self, email, password, encoded):
+        return self.key_prefix + salted_hmac(self.key_prefix, f'{email}\0{password}\0{encoded}').hexdigest()
+
+    def get_stored_password(self, email):
+        """Return the password hash of the user with an email, or None."""
+        User = get_user_model()
+        return User._default_manager.filter(**{User.USERNAME_FIELD: email}).values_list('password', flat=True).first()
+
+    def is_blocked(self, email):
+        """Return whether an email has failed too often to try again."""
+        max_failures = self.config.get('MAX_FAILURES', 5)
+        return bool(max_failures) and self.cache.get(self.failures_key(email), 0) >= max_failures
+
+    def is_known_failure(self, email, password, encoded):
+        """Return whether a password already failed against a stored hash."""
+        return self.cache.get(self.attempt_key(email, password, encoded)) is not None
+
+    def add_failure(self, email, password, encoded):
+        """Count a failed attempt and remember its password."""
+        timeout = self.config.get('TIMEOUT', 300)
+        key = self.failures_key(email)
+        if not self.cache.add(key, 1, timeout):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                # Expired since 'add'.
+                self.cache.set(key, 1, timeout)
+        self.cache.set(self.attempt_key(email, password, encoded), True, timeout)
+
+    def reset(self, email):
+        """Forget the failure count of an email after a successful login."""
+        self.cache.delete(self.failures_key(email))
+
+
+login_throttle = LoginThrottle()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication with 'AuthToken' that caches the token -> user lookup.
+
+    A drop-in replacement for 'TokenAuthentication'. Entries are invalidated when a token
+    is deleted or its user is saved, see 'core.signals'. Expiry is checked on the token
+    the lookup or the cache returned, so it costs no query.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token))
+        else:
+            user, token = cached
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        return user, token
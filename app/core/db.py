@@ -0,0 +1,43 @@
+"""
+Database connection helpers.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+def close_unusable_connections():
+    """Close persistent connections the database has dropped, so their next query reconnects.
+
+    Django 3.2 only notices a dropped connection when a query on it fails. Connections
+    whose settings enable 'CONN_HEALTH_CHECKS' are pinged when they are reused instead,
+    as Django 4.1 does.
+    """
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if connection.settings_dict.get('CONN_HEALTH_CHECKS') and not connection.is_usable():
+            connection.close()
+
+
+def check_database(using=DEFAULT_DB_ALIAS):
+    """Raise 'OperationalError' unless the database answers a query."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+# Aliases whose migrations were all applied, which stays true until the next deploy.
+_migrated = set()
+
+
+def pending_migrations(using=DEFAULT_DB_ALIAS):
+    """Return the migrations not yet applied to the database.
+
+    Loading the migrations is slow, so once none are pending the database is not asked again.
+    """
+    if using in _migrated:
+        return []
+    executor = MigrationExecutor(connections[using])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if not plan:
+        _migrated.add(using)
+    return [migration for migration, backwards in plan]
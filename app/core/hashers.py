@@ -0,0 +1,39 @@
+"""
+Password hashers whose work factor is set per environment.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def get_config():
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """'PBKDF2PasswordHasher' running 'PASSWORD_HASHING["PBKDF2_ITERATIONS"]' iterations.
+
+    Passwords hashed with other iterations still verify, and are rehashed on login.
+    """
+
+    @property
+    def iterations(self):
+        return get_config().get('PBKDF2_ITERATIONS', super().iterations)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """'Argon2PasswordHasher' with the time cost, memory cost (KiB) and parallelism of 'PASSWORD_HASHING'.
+
+    Passwords hashed with other parameters still verify, and are rehashed on login.
+    """
+
+    @property
+    def time_cost(self):
+        return get_config().get('ARGON2_TIME_COST', super().time_cost)
+
+    @property
+    def memory_cost(self):
+        return get_config().get('ARGON2_MEMORY_COST', super().memory_cost)
+
+    @property
+    def parallelism(self):
+        return get_config().get('ARGON2_PARALLELISM', super().parallelism)
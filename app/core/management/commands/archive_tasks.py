@@ -0,0 +1,35 @@
+"""
+Django command to move old completed tasks to the archive table.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from task.archive import archive_batch, get_cutoff
+
+
+class Command(BaseCommand):
+    """Django command to archive completed tasks in small batches."""
+    help = (
+        'Move tasks completed more than TASK_ARCHIVE["AFTER_DAYS"] days ago to the archive table, in bounded '
+        'batches that each commit, so it is safe to run while the API is serving and to stop and run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tasks moved per transaction.')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = get_cutoff()
+        archived = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = archive_batch(cutoff, options['batch_size'])
+            archived += count
+            batches += 1
+            if count < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tasks in {batches} batches.'))
@@ -0,0 +1,55 @@
+"""
+Django command to export tasks as NDJSON or a JSON array.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ArchivedTask, Task
+from task.archive import CombinedQuerySet
+from task.export import iter_tasks
+from task.serializers import TaskDetailSerializer
+
+
+class TaskExportSerializer(TaskDetailSerializer):
+    """Serializer for exported tasks, which also identifies the owner."""
+
+    class Meta(TaskDetailSerializer.Meta):
+        fields = TaskDetailSerializer.Meta.fields + ['user']
+
+
+class Command(BaseCommand):
+    """Django command to stream tasks to a file or stdout."""
+    help = 'Export the tasks of one user (or every user) as NDJSON or a JSON array.'
+
+    def add_arguments(self, parser):
+        selection = parser.add_mutually_exclusive_group(required=True)
+        selection.add_argument('--user', help='Email of the user whose tasks are exported.')
+        selection.add_argument('--all', action='store_true', help='Export the tasks of every user.')
+        parser.add_argument('--format', choices=['ndjson', 'json'], default='ndjson', dest='output_format')
+        parser.add_argument('--output', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command.
+
+        Live and archived tasks are exported together, merged in order, see 'task.archive'.
+        """
+        if options['all']:
+            queryset = CombinedQuerySet(Task.objects.all(), ArchivedTask.objects.all(), ordering='id')
+            serializer = TaskExportSerializer()
+        else:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" does not exist.')
+            queryset = CombinedQuerySet(Task.objects.filter(user=user), ArchivedTask.objects.filter(user=user))
+            serializer = TaskDetailSerializer()
+
+        chunks = iter_tasks(queryset, serializer, output=options['output_format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
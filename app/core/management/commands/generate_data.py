@@ -0,0 +1,130 @@
+"""
+Django command to generate synthetic users and tasks.
+"""
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Task, TaskStats
+from task.importer import copy_tasks
+
+WORDS = (
+    'call email buy book pay review plan fix clean write read send check update order cancel '
+    'schedule prepare finish start renew return pick drop meeting report invoice groceries car '
+    'dentist doctor rent tax bill project client budget slides notes kitchen garden laundry '
+    'birthday gift tickets flight hotel insurance passport bank paperwork contract team weekly'
+).split()
+
+
+class Command(BaseCommand):
+    """Django command to bulk generate users and tasks for load and scaling tests."""
+    help = 'Generate users sharing one password, each with the same number of synthetic tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=1000, help='Tasks per user.')
+        parser.add_argument('--email-prefix', default='generated', help='Users are named "<prefix>-<n>@example.com".')
+        parser.add_argument('--password', default='generatedpassword', help='Password shared by every user.')
+        parser.add_argument('--replace', action='store_true', help='Delete existing users with the prefix first.')
+        parser.add_argument('--completion-rate', type=float, default=0.3, help='Fraction of completed tasks.')
+        parser.add_argument('--due-rate', type=float, default=0.9, help='Fraction of tasks with a due date.')
+        parser.add_argument(
+            '--due-days', type=int, nargs=2, default=[-60, 120], metavar=('FROM', 'TO'),
+            help='Due dates are spread evenly over this range of days from now.',
+        )
+        parser.add_argument('--description-rate', type=float, default=0.25, help='Fraction of tasks with a description.')
+        parser.add_argument(
+            '--description-length', type=int, default=200,
+            help='Mean length of descriptions, exponentially distributed so a few are long.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Tasks written per transaction.')
+        parser.add_argument('--method', choices=['auto', 'orm', 'copy'], default='auto', help='How tasks are written.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'orm'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('The "copy" method requires PostgreSQL.')
+
+        start = time.monotonic()
+        user_ids = self.create_users(options)
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+
+        created = 0
+        batch = []
+        for user_id in user_ids:
+            for number in range(options['tasks']):
+                batch.append(self.make_task(user_id, number, options))
+                if len(batch) == options['batch_size']:
+                    created += self.write(batch, method)
+                    batch = []
+        if batch:
+            created += self.write(batch, method)
+
+        elapsed = time.monotonic() - start
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users and {created} tasks in {elapsed:.2f}s, {rate:.0f} tasks/s.'
+        ))
+
+    def create_users(self, options):
+        """Create the users and their empty counters, and return their ids."""
+        User = get_user_model()
+        prefix = f'{options["email_prefix"]}-'
+        existing = User.objects.filter(email__startswith=prefix)
+        with transaction.atomic():
+            if existing.exists():
+                if not options['replace']:
+                    raise CommandError(f'Users named "{prefix}*" already exist, pass --replace to delete them.')
+                existing.delete()
+
+            # Hash once rather than per user, every user shares the password.
+            password = make_password(options['password'])
+            User.objects.bulk_create(
+                (User(email=f'{prefix}{i}@example.com', name=f'User {i}', password=password) for i in range(options['users'])),
+                batch_size=options['batch_size'],
+            )
+            user_ids = list(existing.order_by('id').values_list('id', flat=True))
+            TaskStats.objects.bulk_create((TaskStats(user_id=user_id) for user_id in user_ids), batch_size=options['batch_size'])
+        return user_ids
+
+    def make_task(self, user_id, number, options):
+        """Return the field values of a random task."""
+        rng = self.rng
+        task = {'user': user_id, 'title': f'{" ".join(rng.choices(WORDS, k=rng.randint(2, 5))).capitalize()} #{number}'}
+        if rng.random() < options['due_rate']:
+            task['date_due'] = self.now + timedelta(days=rng.uniform(*options['due_days']))
+        if rng.random() < options['completion_rate']:
+            task['is_completed'] = True
+            task['date_completed'] = self.now - timedelta(days=rng.uniform(0, 30))
+        if options['description_length'] and rng.random() < options['description_rate']:
+            length = max(1, int(rng.expovariate(1 / options['description_length'])))
+            task['description'] = ' '.join(rng.choices(WORDS, k=length // 6 + 1))[:length]
+        return task
+
+    def write(self, batch, method):
+        """Write a batch of tasks with their counters and return how many were written."""
+        counts = Counter((task['user'], task.get('is_completed', False)) for task in batch)
+        with transaction.atomic():
+            if method == 'copy':
+                copy_tasks(batch, description='')
+            else:
+                Task.objects.bulk_create(Task(user_id=task.pop('user'), **task) for task in batch)
+            for user_id in {user_id for user_id, _ in counts}:
+                TaskStats.objects.adjust(
+                    user_id,
+                    open_count=counts[user_id, False],
+                    completed_count=counts[user_id, True],
+                )
+        return len(batch)
@@ -0,0 +1,53 @@
+"""
+Django command to import tasks from NDJSON or CSV.
+"""
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from task.importer import FORMATS, TaskImporter, guess_format
+
+
+class Command(BaseCommand):
+    """Django command to bulk load tasks for a user."""
+    help = 'Import tasks for a user from an NDJSON or CSV file, reporting rows that fail validation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or "-" to read from stdin.')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the tasks.')
+        parser.add_argument('--format', choices=FORMATS, dest='input_format', help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows validated and written per transaction.')
+        parser.add_argument('--method', choices=['auto', 'orm', 'copy'], default='auto', help='How rows are written.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist.')
+
+        path = options['path']
+        input_format = options['input_format'] or guess_format(path)
+        if input_format is None:
+            raise CommandError('Could not tell the format from the file name, pass --format.')
+        try:
+            importer = TaskImporter(user, batch_size=options['batch_size'], method=options['method'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        start = time.monotonic()
+        if path == '-':
+            result = importer.run(sys.stdin.buffer, input_format)
+        else:
+            with open(path, 'rb') as stream:
+                result = importer.run(stream, input_format)
+        elapsed = time.monotonic() - start
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error["line"]}: {error["errors"]}')
+        rate = result.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} tasks ({result.failed} failed) in {elapsed:.2f}s, {rate:.0f} rows/s.'
+        ))
@@ -0,0 +1,67 @@
+"""
+Django command to rebuild the per-user task counters and report drift.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import TaskStats
+
+COUNTERS = ('open_count', 'completed_count')
+
+
+class Command(BaseCommand):
+    """Django command to compare 'TaskStats' with the tasks and fix any drift."""
+    help = 'Rebuild the per-user task counters from the tasks, reporting every user whose counters drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of a single user to reconcile.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users reconciled per transaction.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f'User "{options["user"]}" does not exist.')
+
+        user_ids = list(users.values_list('id', flat=True))
+        drifted = 0
+        for start in range(0, len(user_ids), options['batch_size']):
+            drifted += self.reconcile(user_ids[start:start + options['batch_size']], options['dry_run'])
+
+        action = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(f'Checked {len(user_ids)} users, {action} drift for {drifted}.')
+
+    def reconcile(self, user_ids, dry_run):
+        """Reconcile a batch of users and return how many had drifted.
+
+        The counters are locked while the tasks are counted, so concurrent task writes wait
+        and then apply their change on top of the rebuilt value.
+        """
+        with transaction.atomic():
+            stored = {stats.user_id: stats for stats in TaskStats.objects.select_for_update().filter(user_id__in=user_ids)}
+            actual = TaskStats.objects.count(user_ids)
+            missing, changed = [], []
+            for user_id in user_ids:
+                stats = stored.get(user_id)
+                if stats is None:
+                    self.stdout.write(f'User {user_id}: missing counters, expected {self.describe(actual[user_id])}')
+                    missing.append(TaskStats(user_id=user_id, **actual[user_id]))
+                    continue
+                current = {name: getattr(stats, name) for name in COUNTERS}
+                if current != actual[user_id]:
+                    self.stdout.write(f'User {user_id}: {self.describe(current)}, expected {self.describe(actual[user_id])}')
+                    for name in COUNTERS:
+                        setattr(stats, name, actual[user_id][name])
+                    changed.append(stats)
+
+            if not dry_run:
+                TaskStats.objects.bulk_create(missing)
+                TaskStats.objects.bulk_update(changed, COUNTERS)
+        return len(missing) + len(changed)
+
+    def describe(self, counts):
+        return ', '.join(f'{name}={counts[name]}' for name in COUNTERS)
@@ -1,27 +1,75 @@
 """
 Django command to wait for the database to be available.
 """
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import OperationalError
 
+from core.db import pending_migrations
+
+
+def backoff(interval, max_interval):
+    """Yield exponentially growing delays, each jittered down by up to half.
+
+    The jitter keeps many containers started at once from retrying in lockstep.
+    """
+    while True:
+        yield random.uniform(interval / 2, interval)
+        interval = min(interval * 2, max_interval)
+
 
 class Command(BaseCommand):
     """Django command to wait for the database."""
 
+    help = 'Wait for the database to accept connections, and optionally for its migrations to be applied.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0.1, help='Seconds to wait after the first failed check.')
+        parser.add_argument('--max-interval', type=float, default=5, help='Longest wait between two checks.')
+        parser.add_argument('--timeout', type=float, help='Fail after this many seconds. Waits forever by default.')
+        parser.add_argument('--migrations', action='store_true', help='Also wait until every migration is applied.')
+
     def handle(self, *args, **options):
         """Entrypoint for command."""
+        self.delays = backoff(options['interval'], options['max_interval'])
+        self.timeout = options['timeout']
+        self.deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable. Waiting 1 second...')
-                time.sleep(1)
+        while not self.database_is_up():
+            self.wait('Database unavailable')
+
+        if options['migrations']:
+            self.stdout.write('Waiting for migrations...')
+            while pending := self.get_pending_migrations():
+                self.wait(f'{len(pending)} migrations pending')
 
         self.stdout.write(self.style.SUCCESS('Database ready!'))
+
+    def database_is_up(self):
+        try:
+            self.check(databases=['default'])
+        except (Psycopg2OpError, OperationalError):
+            return False
+        return True
+
+    def get_pending_migrations(self):
+        try:
+            return pending_migrations()
+        except OperationalError:
+            return ['unknown']
+
+    def wait(self, reason):
+        """Sleep for the next delay, or fail when the timeout is reached first."""
+        delay = next(self.delays)
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(f'{reason} after {self.timeout:g} seconds, giving up.')
+            delay = min(delay, remaining)
+        self.stdout.write(f'{reason}. Waiting {delay:.2f} seconds...')
+        time.sleep(delay)
@@ -0,0 +1,191 @@
+"""
+Middleware for the APIs.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request being served. Context variables are copied into the threads that
+# 'sync_to_async' runs code in, so queries are counted in whichever thread runs them.
+current_profile = ContextVar('current_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs more queries than its view's budget allows."""
+
+
+class RequestProfile:
+    """Query count, SQL time and render time of a request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_start = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time a query, as a database 'execute_wrapper'."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+    def start_render(self):
+        self.render_start = time.perf_counter()
+
+    def end_render(self, response):
+        self.render_time = time.perf_counter() - self.render_start
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.start
+
+
+def profile_queries(execute, sql, params, many, context):
+    """Time a query for the current request's profile, as a database 'execute_wrapper'."""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def install_query_profiler(connection, **kwargs):
+    """Add 'profile_queries' to a connection's execute wrappers, once."""
+    if profile_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_queries)
+
+
+def get_query_budget(view_func, method):
+    """Return the query budget of a request to a view, or None when it has none.
+
+    A view sets 'query_budget' to a number of queries, or to a dict of budgets by action
+    for viewsets, or by handler method name ('get', 'patch', ...) for other views.
+    """
+    budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        method = 'get' if method == 'HEAD' else method.lower()
+        actions = getattr(view_func, 'actions', None)
+        budget = budget.get(actions.get(method) if actions else method)
+    return budget
+
+
+def add_to_query_budget(request, queries):
+    """Allow a request 'queries' more queries than its view's budget, for a rare and costlier path."""
+    request = getattr(request, '_request', request)
+    if getattr(request, 'query_budget', None) is not None:
+        request.query_budget += queries
+
+
+class RequestProfilingMiddleware:
+    """Measure the queries, SQL time, render time and response size of every request.
+
+    The measurements are sent as a 'Server-Timing' header and logged as a JSON line to the
+    'core.middleware' logger at INFO. Requests running more queries than their view's
+    'query_budget' are logged as warnings, or fail with 'QueryBudgetExceeded' when
+    'ENFORCE_BUDGETS' is on, as it is in tests, see 'core.test_runner'.
+
+    Queries are counted in whichever thread runs them, including the async views' thread
+    pool. Under ASGI the middleware runs on the event loop, so it never sends requests
+    through the single thread Django keeps for sync code.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not self.config.get('ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        # Connections opened later, by any thread, report to the request being served.
+        connection_created.connect(install_query_profiler, dispatch_uid='core.middleware.install_query_profiler')
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, as 'MiddlewareMixin' does, so Django awaits it.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            # Run the hooks on the event loop too, rather than in the thread shared by sync code.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    @property
+    def config(self):
+        return getattr(settings, 'REQUEST_PROFILING', {})
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_profiler(connection)
+        profile = request.profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        profile = request.profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        """Add the 'Server-Timing' header, log the profile and check the query budget."""
+        profile = request.profile
+        config = self.config
+        if config.get('SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.sql_time * 1000:.2f};desc="{profile.queries} queries"',
+                f'render;dur={profile.render_time * 1000:.2f}',
+                f'total;dur={profile.total_time * 1000:.2f}',
+            ])
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': request.resolver_match.view_name if request.resolver_match else None,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'query_budget': getattr(request, 'query_budget', None),
+            'sql_ms': round(profile.sql_time * 1000, 2),
+            'render_ms': round(profile.render_time * 1000, 2),
+            'total_ms': round(profile.total_time * 1000, 2),
+            'size': None if response.streaming else len(response.content),
+        }
+        logger.info(json.dumps(record))
+
+        budget = record['query_budget']
+        if budget is not None and profile.queries > budget:
+            message = f'{request.method} {record["view"]} ran {profile.queries} queries, over its budget of {budget}.'
+            if config.get('ENFORCE_BUDGETS', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, time it as serialization.
+        request.profile.start_render()
+        response.add_post_render_callback(request.profile.end_render)
+        return response
+
+    async def aprocess_view(self, *args):
+        return type(self).process_view(self, *args)
+
+    async def aprocess_template_response(self, *args):
+        return type(self).process_template_response(self, *args)
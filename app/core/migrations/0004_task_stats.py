@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def create_task_stats(apps, schema_editor):
+    """Create the counters of existing users from their tasks."""
+    db_alias = schema_editor.connection.alias
+    User = apps.get_model('core', 'User')
+    Task = apps.get_model('core', 'Task')
+    TaskStats = apps.get_model('core', 'TaskStats')
+    counts = (
+        Task.objects.using(db_alias)
+        .filter(date_deleted__isnull=True)
+        .values('user_id')
+        .annotate(
+            open_count=Count('id', filter=Q(is_completed=False)),
+            completed_count=Count('id', filter=Q(is_completed=True)),
+        )
+        .order_by()
+    )
+    counts = {row.pop('user_id'): row for row in counts}
+    TaskStats.objects.using(db_alias).bulk_create(
+        (TaskStats(user_id=user_id, **counts.get(user_id, {})) for user_id in User.objects.using(db_alias).values_list('id', flat=True)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to='core.user')),
+                ('open_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_task_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep 'SEARCH_CONFIG' in 'task/search.py' in step with the configuration used here.
+CREATE_SEARCH_TRIGGER = """
+CREATE FUNCTION core_task_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_task_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON core_task
+    FOR EACH ROW EXECUTE FUNCTION core_task_search_vector_update();
+
+UPDATE core_task SET title = title;
+
+CREATE INDEX task_search_idx ON core_task USING gin (search_vector);
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP INDEX task_search_idx;
+DROP TRIGGER core_task_search_vector_trigger ON core_task;
+DROP FUNCTION core_task_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    """Keep 'search_vector' up to date on every write, including bulk inserts and 'COPY'."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_TRIGGER)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_task_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
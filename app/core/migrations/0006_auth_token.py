@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:34
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_tokens(apps, schema_editor):
+    """Copy the tokens of 'rest_framework.authtoken', valid for one more 'AUTH_TOKEN_TTL'."""
+    connection = schema_editor.connection
+    if 'authtoken_token' not in connection.introspection.table_names():
+        return
+    expires = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO core_authtoken (key, user_id, created, expires) SELECT key, user_id, created, %s FROM authtoken_token',
+            [expires],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField(db_index=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='auth_token', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_archived_task'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['user', 'date_created', 'id'], name='archived_task_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['user', 'date_completed', 'id'], name='archived_task_user_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'date_created', 'id'], name='task_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'date_completed', 'id'], name='task_user_done_idx'),
+        ),
+    ]
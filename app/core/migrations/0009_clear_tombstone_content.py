@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:05
+
+from django.db import migrations
+
+
+def clear_tombstone_content(apps, schema_editor):
+    """Clear the title and description of tasks deleted before 'Task.soft_delete' did, keeping 'updated_at'."""
+    Task = apps.get_model('core', 'Task')
+    Task.objects.filter(date_deleted__isnull=False).update(title='', description='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_tombstone_content, migrations.RunPython.noop),
+    ]
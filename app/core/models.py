@@ -1,8 +1,17 @@
 """
 Database models.
 """
+import binascii
+import os
+from collections import Counter, defaultdict
+from datetime import timedelta
+
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F, Q
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -54,8 +63,59 @@ class User(AbstractBaseUser, PermissionsMixin):
         super().save(*args, **kwargs)
 
 
-class Task(models.Model):
-    """Task object."""
+# Sent with 'user_ids' and 'using' once tasks are deleted from the database by 'Task.delete' or
+# 'TaskQuerySet.delete'. Unlike 'post_delete', having receivers does not stop the tasks of a
+# deleted user from being deleted with a single statement.
+tasks_deleted = Signal()
+
+
+class TaskQuerySet(models.QuerySet):
+    """Tasks, deleted with 'tasks_deleted' rather than a 'post_delete' signal per task."""
+
+    def delete(self):
+        """Delete the tasks and remove them from their users' counters, in one transaction."""
+        using = self._db or router.db_for_write(self.model, **self._hints)
+        with transaction.atomic(using=using):
+            counts = list(
+                self.using(using)
+                .values('user_id')
+                .annotate(
+                    open_count=Count('id', filter=Q(date_deleted__isnull=True, is_completed=False)),
+                    completed_count=Count('id', filter=Q(date_deleted__isnull=True, is_completed=True)),
+                )
+                .order_by()
+            )
+            deleted = super().delete()
+            for row in counts:
+                TaskStats.objects.db_manager(using).adjust(
+                    row['user_id'],
+                    open_count=-row['open_count'],
+                    completed_count=-row['completed_count'],
+                )
+            tasks_deleted.send(sender=self.model, user_ids={row['user_id'] for row in counts}, using=using)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class AllTaskManager(models.Manager):
+    """Manages every task, including deleted ones."""
+
+    def get_queryset(self):
+        # The search vector is only used in queries, there is no need to fetch it.
+        return super().get_queryset().defer('search_vector')
+
+
+class TaskManager(AllTaskManager):
+    """Manages tasks that have not been deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(date_deleted__isnull=True)
+
+
+class AbstractTask(models.Model):
+    """Columns shared by 'Task' and 'ArchivedTask', so tasks can be moved between their tables."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -66,17 +126,276 @@ class Task(models.Model):
     date_created = models.DateTimeField(auto_now_add=True)
     date_completed = models.DateTimeField(null=True, blank=True)
     date_due = models.DateTimeField(null=True, blank=True)
+    date_deleted = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     is_completed = models.BooleanField(default=False)
 
+    # Weighted 'title' and 'description' lexemes, computed by a database trigger on PostgreSQL,
+    # see migration '0005_task_search', and kept as is when archived. Always null on other databases.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.title
+
+
+class Task(AbstractTask):
+    """Task object.
+
+    Deleting a task through the API only sets 'date_deleted', leaving a tombstone so
+    clients syncing with 'updated_at' watermarks learn about the deletion.
+    """
+    objects = TaskManager.from_queryset(TaskQuerySet)()
+    all_objects = AllTaskManager.from_queryset(TaskQuerySet)()
+
+    class Meta:
+        # Every task query is scoped to a user and ordered by '(date_due, id)', or by another of the
+        # 'task.filters.TaskFilters.ordering_fields', see 'TaskViewSet.get_queryset'.
+        indexes = [
+            models.Index(fields=['user', 'date_due', 'id'], name='task_user_due_idx'),
+            models.Index(fields=['user', 'date_created', 'id'], name='task_user_created_idx'),
+            models.Index(fields=['user', 'date_completed', 'id'], name='task_user_done_idx'),
+            models.Index(fields=['user', 'is_completed', 'date_due', 'id'], name='task_user_completed_due_idx'),
+            models.Index(
+                fields=['user', 'date_due', 'id'],
+                name='task_user_open_due_idx',
+                condition=models.Q(is_completed=False),
+            ),
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which 'TaskStats' counter the stored row is in, so 'save' can tell when it moves.
+        if not instance.get_deferred_fields() & {'is_completed', 'date_deleted'}:
+            instance._stored_stats_counter = instance.stats_counter
+        return instance
+
+    @property
+    def stats_counter(self):
+        """Return the 'TaskStats' counter this task is counted in, or None once it is deleted."""
+        if self.date_deleted is not None:
+            return None
+        return 'completed_count' if self.is_completed else 'open_count'
+
     def clean(self):
         """Custom validation logic."""
         pass
 
     def save(self, *args, **kwargs):
-        """Custom save logic."""
+        """Custom save logic.
+
+        Moves the task between its user's 'TaskStats' counters, in the same transaction, when
+        it is created, completed, reopened or deleted. The counter the row is in is read again
+        under a row lock before it is moved, so concurrent saves of the same task, which all
+        loaded it in its old counter, move it once.
+        """
         # self.full_clean()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'is_completed', 'date_deleted'}.intersection(update_fields):
+            super().save(*args, **kwargs)
+            return
+        new_counter = self.stats_counter
+        unmoved = hasattr(self, '_stored_stats_counter') and self._stored_stats_counter == new_counter
+        if unmoved and not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        using = kwargs.get('using') or router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using):
+            if self._state.adding:
+                old_counter = None
+            else:
+                stored = Task.all_objects.using(using).select_for_update().only('is_completed', 'date_deleted').get(pk=self.pk)
+                old_counter = stored.stats_counter
+            super().save(*args, **kwargs)
+            if old_counter != new_counter:
+                TaskStats.objects.db_manager(using).move(self.user_id, old_counter, new_counter)
+        self._stored_stats_counter = new_counter
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the task's row and remove it from its user's counters, in one transaction.
+
+        Tasks deleted along with their user go through neither this nor 'TaskQuerySet.delete',
+        their counters being deleted too.
+        """
+        using = using or router.db_for_write(Task, instance=self)
+        counter = getattr(self, '_stored_stats_counter', self.stats_counter)
+        with transaction.atomic(using=using):
+            deleted = super().delete(using=using, keep_parents=keep_parents)
+            TaskStats.objects.db_manager(using).move(self.user_id, counter, None)
+            tasks_deleted.send(sender=Task, user_ids={self.user_id}, using=using)
+        return deleted
+
+    def soft_delete(self):
+        """Mark the task as deleted, keeping the row as a tombstone without its content.
+
+        Sync clients only need the id and 'updated_at' of a tombstone, so the title and
+        description are cleared rather than kept for as long as the row.
+        """
+        self.date_deleted = timezone.now()
+        self.title = ''
+        self.description = ''
+        self.save(update_fields=['date_deleted', 'title', 'description', 'updated_at'])
+
+
+class ArchivedTask(AbstractTask):
+    """Completed task moved out of 'Task' by the 'archive_tasks' command, see 'task.archive'.
+
+    Keeps the task's id and every column, including its search vector. Archived tasks are
+    still counted as completed in 'TaskStats', and are moved back to 'Task' before they are
+    changed.
+    """
+    objects = AllTaskManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date_due', 'id'], name='archived_task_user_due_idx'),
+            models.Index(fields=['user', 'date_created', 'id'], name='archived_task_user_created_idx'),
+            models.Index(fields=['user', 'date_completed', 'id'], name='archived_task_user_done_idx'),
+        ]
+
+
+class TaskStatsManager(models.Manager):
+    """Manages the per-user task counters."""
+
+    def adjust(self, user_id, **deltas):
+        """Add deltas to a user's counters, e.g. 'adjust(user_id, open_count=-1, completed_count=1)'."""
+        updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        if updates:
+            self.filter(user_id=user_id).update(**updates)
+
+    def move(self, user_id, old_counter, new_counter):
+        """Move one task from one counter to another, where None means the task is not counted."""
+        deltas = Counter()
+        if old_counter is not None:
+            deltas[old_counter] -= 1
+        if new_counter is not None:
+            deltas[new_counter] += 1
+        self.adjust(user_id, **deltas)
+
+    def add_tasks(self, tasks):
+        """Count tasks that were inserted without 'Task.save', such as by 'bulk_create'."""
+        self.move_tasks(tasks, [None] * len(tasks))
+
+    def move_tasks(self, tasks, old_counters):
+        """Move tasks that were updated without 'Task.save', given the counter each was in before."""
+        deltas = defaultdict(Counter)
+        for task, old_counter in zip(tasks, old_counters):
+            new_counter = task.stats_counter
+            if old_counter is not None:
+                deltas[task.user_id][old_counter] -= 1
+            if new_counter is not None:
+                deltas[task.user_id][new_counter] += 1
+            task._stored_stats_counter = new_counter
+        for user_id, user_deltas in deltas.items():
+            self.adjust(user_id, **user_deltas)
+
+    def count(self, user_ids):
+        """Return the counters computed from the tasks of the given users, as {user id: {counter: value}}."""
+        counts = {user_id: {'open_count': 0, 'completed_count': 0} for user_id in user_ids}
+        rows = (
+            Task.objects.using(self.db)
+            .filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(
+                open_count=Count('id', filter=Q(is_completed=False)),
+                completed_count=Count('id', filter=Q(is_completed=True)),
+            )
+            .order_by()
+        )
+        for row in rows:
+            counts[row.pop('user_id')] = row
+        archived = (
+            ArchivedTask.objects.using(self.db)
+            .filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in archived:
+            counts[row['user_id']]['completed_count'] += row['count']
+        return counts
+
+
+class TaskStats(models.Model):
+    """Counts of a user's open and completed tasks.
+
+    The counters are updated in the same transaction as every task write, so reading them
+    never aggregates over the tasks. Archived tasks stay counted as completed. Writes that bypass 'Task.save' (bulk inserts and
+    updates, 'QuerySet.update') must adjust them explicitly. 'reconcile_task_stats' rebuilds
+    them from the tasks and reports any drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_stats',
+    )
+    open_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+    objects = TaskStatsManager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.open_count} open, {self.completed_count} completed'
+
+
+class AuthTokenManager(models.Manager):
+    """Manager for 'AuthToken'."""
+
+    def issue(self, user):
+        """Return the user's token, or a new one when it has none or it has expired.
+
+        A live token is reused, so most logins only read it.
+        """
+        token = self.filter(user=user).first()
+        if token is not None and not token.is_expired():
+            return token
+        try:
+            with transaction.atomic(using=self.db):
+                if token is not None:
+                    token.delete()
+                return self.create(user=user)
+        except IntegrityError:
+            # Issued by a concurrent login.
+            return self.get(user=user)
+
+
+class AuthToken(models.Model):
+    """API token of a user, valid until 'expires'.
+
+    Replaces 'rest_framework.authtoken.models.Token'. Expired tokens are refused by
+    'CachedTokenAuthentication' and deleted by the 'purge_auth_tokens' command.
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_token',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        if self.expires is None:
+            self.expires = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def generate_key(cls):
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    def is_expired(self, now=None):
+        return self.expires <= (now or timezone.now())
+
     def __str__(self):
-        return self.title
+        return self.key
@@ -0,0 +1,140 @@
+"""
+Database routers.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary, 0 when it has replayed everything it received
+# or is not a replica at all (such as a local stand-in), NULL before it replayed anything.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+# Replica the current request reads from, None for the primary.
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+def get_config():
+    return getattr(settings, 'READ_REPLICAS', {})
+
+
+class ReplicaSet:
+    """The read replicas in 'READ_REPLICAS["ALIASES"]' and their health.
+
+    A replica is healthy when it answers and lags at most 'MAX_LAG' seconds behind the
+    primary. Each process checks a replica at most every 'CHECK_INTERVAL' seconds.
+    """
+
+    def __init__(self):
+        self._checks = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """Return the alias of a random healthy replica, or None when none is."""
+        healthy = [alias for alias in get_config().get('ALIASES', []) if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checks.get(alias)
+        if checked is not None and checked[0] > now:
+            return checked[1]
+
+        healthy = self.check(alias)
+        with self._lock:
+            self._checks[alias] = (now + get_config().get('CHECK_INTERVAL', 5), healthy)
+        return healthy
+
+    def check(self, alias):
+        """Return whether a replica answers and is within 'MAX_LAG'."""
+        connection = connections[alias]
+        try:
+            lag = self.get_lag(connection)
+        except DatabaseError as exc:
+            logger.warning('Replica %s is unavailable: %s', alias, exc)
+            connection.close()
+            return False
+        max_lag = get_config().get('MAX_LAG', 5)
+        if lag is None or lag > max_lag:
+            logger.warning('Replica %s lags %s seconds, over %s.', alias, lag, max_lag)
+            return False
+        return True
+
+    def get_lag(self, connection):
+        """Return the lag of a replica in seconds, or None when it is unknown."""
+        if connection.vendor != 'postgresql':
+            return 0
+        # Use the driver's cursor, so the check is not counted as one of the request's queries.
+        with connection.wrap_database_errors:
+            connection.ensure_connection()
+            with connection.connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0]
+        return None if lag is None else float(lag)
+
+    def reset(self):
+        """Forget the health of every replica."""
+        with self._lock:
+            self._checks.clear()
+
+
+replicas = ReplicaSet()
+
+
+def pin_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Send the user's reads to the primary for 'PIN_SECONDS', so they read their own writes."""
+    config = get_config()
+    if config.get('ALIASES'):
+        caches[config.get('CACHE_ALIAS', 'default')].set(pin_key(user), True, config.get('PIN_SECONDS', 10))
+
+
+def route_reads_to_replica(user):
+    """Send the reads of the current request to a healthy replica, and return a token for 'replica_alias.reset'.
+
+    Reads stay on the primary while the user is pinned to it, and when no replica is healthy.
+    """
+    config = get_config()
+    alias = None
+    if config.get('ALIASES') and not caches[config.get('CACHE_ALIAS', 'default')].get(pin_key(user)):
+        alias = replicas.choose()
+    return replica_alias.set(alias)
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request, and everything else to the primary.
+
+    Only the reads made between 'route_reads_to_replica' and resetting 'replica_alias' go to a
+    replica. Writes always go to the primary, also for objects read from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_config().get('ALIASES', []):
+            return False
+        return None
@@ -0,0 +1,58 @@
+"""
+Signal handlers for the core models.
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.authentication import token_cache
+from core.db import close_unusable_connections
+from core.models import AuthToken, Task, TaskStats, tasks_deleted
+from task.cache import task_list_cache
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a token as soon as it is deleted."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached lookups for a user's tokens so changes (e.g. deactivation) apply immediately."""
+    if created:
+        return
+    token_cache.delete(*AuthToken.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_task_stats(sender, instance, created, **kwargs):
+    """Start every user with zeroed task counters, so task writes only need to update them."""
+    if created:
+        TaskStats.objects.db_manager(kwargs['using']).create(user=instance)
+
+
+@receiver(post_save, sender=Task)
+def invalidate_task_lists(sender, instance, using, **kwargs):
+    """Drop the cached lists of a task's user when it is saved, e.g. from the admin."""
+    task_list_cache.invalidate(instance.user_id, using)
+
+
+@receiver(tasks_deleted, sender=Task)
+def invalidate_deleted_task_lists(sender, user_ids, using, **kwargs):
+    """Drop the cached lists of the users whose tasks were deleted from the database."""
+    for user_id in user_ids:
+        task_list_cache.invalidate(user_id, using)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_deleted_user_task_lists(sender, instance, using, **kwargs):
+    """Drop a deleted user's cached lists once, as their tasks are deleted without 'tasks_deleted'."""
+    task_list_cache.invalidate(instance.pk, using)
+
+
+@receiver(request_started)
+def check_database_connections(sender, **kwargs):
+    """Replace dropped persistent connections before the request uses them."""
+    close_unusable_connections()
@@ -0,0 +1,33 @@
+"""
+Test runner for the project.
+"""
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner that fails any request over its view's query budget, see 'core.middleware'.
+
+    Rate limits are off, tests that check them turn them on with 'override_settings'.
+
+    Connections are not persistent in tests, as those opened by the async views' worker
+    threads could not be closed from the test thread and would hold the test database open.
+    """
+
+    def setup_databases(self, **kwargs):
+        for connection in connections.all():
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+        return super().setup_databases(**kwargs)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._old_request_profiling = settings.REQUEST_PROFILING
+        settings.REQUEST_PROFILING = {**settings.REQUEST_PROFILING, 'ENABLED': True, 'ENFORCE_BUDGETS': True}
+        self._old_api_throttle = settings.API_THROTTLE
+        settings.API_THROTTLE = {**settings.API_THROTTLE, 'ENABLED': False}
+
+    def teardown_test_environment(self, **kwargs):
+        settings.REQUEST_PROFILING = self._old_request_profiling
+        settings.API_THROTTLE = self._old_api_throttle
+        super().teardown_test_environment(**kwargs)
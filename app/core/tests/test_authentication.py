@@ -0,0 +1,161 @@
+"""
+Test the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, TokenCache, token_cache
+from core.models import AuthToken
+
+
+def authenticate(token):
+    """Authenticate a request carrying the given token key."""
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token}')
+    return CachedTokenAuthentication().authenticate(Request(request))
+
+
+class TestCachedTokenAuthentication(TestCase):
+    """Test token lookups are cached and invalidated."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.token = AuthToken.objects.create(user=self.user)
+
+    def test_lookup_is_cached(self):
+        """Test only the first authentication queries the database."""
+        with self.assertNumQueries(1):
+            user, token = authenticate(self.token.key)
+        with self.assertNumQueries(0):
+            cached_user, cached_token = authenticate(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token, self.token)
+        self.assertIsNot(cached_user, user)
+
+    def test_expired_token_is_rejected(self):
+        """Test an expired token is refused by the same query that looks it up."""
+        AuthToken.objects.filter(pk=self.token.pk).update(expires=timezone.now())
+
+        with self.assertNumQueries(1), self.assertRaisesMessage(AuthenticationFailed, 'Token has expired.'):
+            authenticate(self.token.key)
+
+    def test_cached_token_expires(self):
+        """Test a cached token is refused once it expires."""
+        authenticate(self.token.key)
+
+        with patch('core.models.timezone.now', return_value=self.token.expires), self.assertNumQueries(0):
+            with self.assertRaisesMessage(AuthenticationFailed, 'Token has expired.'):
+                authenticate(self.token.key)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected."""
+        with self.assertRaises(AuthenticationFailed):
+            authenticate('unknown')
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test the database is queried again once the entry times out."""
+        patched_monotonic.return_value = 1000
+        authenticate(self.token.key)
+
+        patched_monotonic.return_value = 1059
+        with self.assertNumQueries(0):
+            authenticate(self.token.key)
+
+        patched_monotonic.return_value = 1061
+        with self.assertNumQueries(1):
+            authenticate(self.token.key)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache holds at most 'MAX_SIZE' entries."""
+        tokens = [self.token] + [
+            AuthToken.objects.create(user=get_user_model().objects.create_user(email=f'user{i}@example.com'))
+            for i in range(2)
+        ]
+        with override_settings(TOKEN_AUTH_CACHE={'TIMEOUT': 60, 'MAX_SIZE': 2}):
+            for token in tokens:
+                authenticate(token.key)
+
+            with self.assertNumQueries(0):
+                authenticate(tokens[2].key)
+            with self.assertNumQueries(1):
+                authenticate(tokens[0].key)
+
+    def test_deleted_token_is_rejected(self):
+        """Test deleting a token invalidates the cached lookup."""
+        authenticate(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            authenticate(self.token.key)
+
+    def test_deactivated_user_is_rejected(self):
+        """Test deactivating a user invalidates the cached lookup."""
+        authenticate(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            authenticate(self.token.key)
+
+    def test_updated_user_is_reloaded(self):
+        """Test updating a user invalidates the cached lookup."""
+        authenticate(self.token.key)
+        self.user.name = 'New Name'
+        self.user.save()
+
+        user, _ = authenticate(self.token.key)
+        self.assertEqual(user.name, 'New Name')
+
+    @override_settings(TOKEN_AUTH_CACHE={'TIMEOUT': 60, 'MAX_SIZE': 100, 'CACHE_ALIAS': 'default'})
+    def test_shared_cache(self):
+        """Test lookups are shared through the Django cache and invalidated there too."""
+        authenticate(self.token.key)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = authenticate(self.token.key)
+        self.assertEqual(user, self.user)
+
+        self.token.delete()
+        token_cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            authenticate(self.token.key)
+
+    @override_settings(TOKEN_AUTH_CACHE={'TIMEOUT': 60, 'MAX_SIZE': 100, 'CACHE_ALIAS': 'default'})
+    def test_shared_cache_invalidates_other_processes(self):
+        """Test a lookup invalidated by another process is not served from the local cache."""
+        authenticate(self.token.key)
+        other_process = TokenCache()
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+
+        other_process.delete(self.token.key)
+
+        with self.assertRaisesMessage(AuthenticationFailed, 'User inactive or deleted.'):
+            authenticate(self.token.key)
+
+    @override_settings(TOKEN_AUTH_CACHE={'TIMEOUT': 60, 'MAX_SIZE': 100, 'CACHE_ALIAS': 'default'})
+    def test_shared_cache_omits_password(self):
+        """Test users are shared without their password hash, which is read again only when used."""
+        authenticate(self.token.key)
+        _, (shared_user, _) = caches['default'].get(token_cache.key_prefix + self.token.key)
+        self.assertNotIn('password', shared_user.__dict__)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = authenticate(self.token.key)
+        user.name = 'New Name'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('securepassword909'))
+        self.assertTrue(get_user_model().objects.get(pk=self.user.pk).check_password('securepassword909'))
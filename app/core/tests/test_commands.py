@@ -1,13 +1,19 @@
 """
 Test custom django management commands.
 """
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import ArchivedTask, AuthToken, Task, TaskStats
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -41,3 +47,217 @@ class TestCommands(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backs_off(self, patched_sleep, patched_check):
+        """Test the wait between checks starts below a second, doubles up to '--max-interval' and is jittered."""
+        patched_check.side_effect = [OperationalError] * 6 + [True]
+
+        call_command('wait_for_db', '--interval', '0.1', '--max-interval', '2', stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        for delay, interval in zip(delays, [0.1, 0.2, 0.4, 0.8, 1.6, 2]):
+            self.assertGreaterEqual(delay, interval / 2)
+            self.assertLessEqual(delay, interval)
+
+    @patch('time.sleep')
+    @patch('time.monotonic')
+    def test_wait_for_db_timeout(self, patched_monotonic, patched_sleep, patched_check):
+        """Test the command fails once '--timeout' seconds passed, without sleeping past it."""
+        patched_check.side_effect = OperationalError
+        patched_monotonic.side_effect = [100, 100, 109.95, 110]
+
+        with self.assertRaisesMessage(CommandError, 'Database unavailable after 10 seconds'):
+            call_command('wait_for_db', '--timeout', '10', stdout=StringIO())
+
+        self.assertEqual(patched_sleep.call_count, 2)
+        self.assertAlmostEqual(patched_sleep.call_args.args[0], 0.05)
+
+    @patch('time.sleep')
+    @patch('core.management.commands.wait_for_db.pending_migrations')
+    def test_wait_for_db_migrations(self, patched_pending_migrations, patched_sleep, patched_check):
+        """Test '--migrations' waits until no migration is pending."""
+        patched_pending_migrations.side_effect = [['0006_auth_token'], OperationalError, []]
+
+        call_command('wait_for_db', '--migrations', stdout=StringIO())
+
+        self.assertEqual(patched_pending_migrations.call_count, 3)
+        self.assertEqual(patched_sleep.call_count, 2)
+
+
+class TestReconcileTaskStats(TestCase):
+    """Test the 'reconcile_task_stats' command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='securepassword909')
+        Task.objects.create(user=self.user, title='Open')
+        Task.objects.create(user=self.user, title='Done', is_completed=True)
+
+    def reconcile(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('reconcile_task_stats', *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_drift(self):
+        """Test consistent counters are reported as such and left alone."""
+        output = self.reconcile()
+
+        self.assertIn('Checked 1 users, fixed drift for 0.', output)
+
+    def test_drift_is_fixed(self):
+        """Test drifted and missing counters are reported and rebuilt."""
+        other_user = get_user_model().objects.create_user(email='other@example.com')
+        TaskStats.objects.filter(user=self.user).update(open_count=5, completed_count=-1)
+        TaskStats.objects.filter(user=other_user).delete()
+
+        output = self.reconcile()
+
+        self.assertIn(f'User {self.user.id}: open_count=5, completed_count=-1, expected open_count=1, completed_count=1', output)
+        self.assertIn(f'User {other_user.id}: missing counters', output)
+        self.assertIn('Checked 2 users, fixed drift for 2.', output)
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_count, stats.completed_count), (1, 1))
+        self.assertTrue(TaskStats.objects.filter(user=other_user).exists())
+
+    def test_dry_run(self):
+        """Test '--dry-run' only reports drift."""
+        TaskStats.objects.filter(user=self.user).update(open_count=5)
+
+        output = self.reconcile('--dry-run', '--user', self.user.email)
+
+        self.assertIn('Checked 1 users, found drift for 1.', output)
+        self.assertEqual(TaskStats.objects.get(user=self.user).open_count, 5)
+
+
+class TestGenerateData(TestCase):
+    """Test the 'generate_data' command."""
+
+    def generate(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('generate_data', '--users', '3', '--tasks', '20', '--batch-size', '25', *args, stdout=out)
+        return out.getvalue()
+
+    def test_generate(self):
+        """Test users are created with the shared password, their tasks and matching counters."""
+        output = self.generate('--password', 'sharedpassword')
+
+        self.assertIn('Generated 3 users and 60 tasks', output)
+        users = get_user_model().objects.filter(email__startswith='generated-').order_by('id')
+        self.assertEqual([user.email for user in users], [f'generated-{i}@example.com' for i in range(3)])
+        self.assertTrue(users[0].check_password('sharedpassword'))
+        self.assertEqual(users[0].password, users[2].password)
+        self.assertEqual(TaskStats.objects.count(users.values_list('id', flat=True)), {
+            stats.user_id: {'open_count': stats.open_count, 'completed_count': stats.completed_count}
+            for stats in TaskStats.objects.filter(user__in=users)
+        })
+        for user in users:
+            self.assertEqual(Task.objects.filter(user=user).count(), 20)
+
+    def test_distributions(self):
+        """Test the completion, due date and description rates are applied."""
+        self.generate('--completion-rate', '1', '--due-rate', '0', '--description-rate', '0')
+
+        self.assertFalse(Task.objects.filter(is_completed=False).exists())
+        self.assertFalse(Task.objects.filter(date_completed__isnull=True).exists())
+        self.assertFalse(Task.objects.filter(date_due__isnull=False).exists())
+        self.assertFalse(Task.objects.exclude(description='').exists())
+
+        self.generate('--replace', '--completion-rate', '0', '--due-rate', '1', '--due-days', '1', '2', '--description-rate', '1')
+
+        self.assertFalse(Task.objects.filter(is_completed=True).exists())
+        self.assertFalse(Task.objects.filter(date_due__isnull=True).exists())
+        self.assertFalse(Task.objects.filter(description='').exists())
+
+    def test_seed(self):
+        """Test the same seed generates the same tasks."""
+        self.generate('--seed', '7')
+        first = list(Task.objects.order_by('id').values_list('title', 'description', 'is_completed'))
+
+        self.generate('--seed', '7', '--replace')
+
+        self.assertEqual(list(Task.objects.order_by('id').values_list('title', 'description', 'is_completed')), first)
+
+    def test_existing_users(self):
+        """Test existing users with the prefix are only replaced with '--replace'."""
+        self.generate()
+
+        with self.assertRaisesMessage(CommandError, 'Users named "generated-*" already exist'):
+            self.generate()
+
+        self.generate('--replace', '--users', '1')
+
+        self.assertEqual(get_user_model().objects.filter(email__startswith='generated-').count(), 1)
+        self.assertEqual(Task.objects.count(), 20)
+
+
+class TestPurgeAuthTokens(TestCase):
+    """Test the 'purge_auth_tokens' command."""
+
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            user = get_user_model().objects.create_user(email=f'user{i}@example.com')
+            AuthToken.objects.create(user=user, expires=now - timedelta(days=1) if i < 3 else None)
+
+    def purge(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('purge_auth_tokens', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_expired_tokens_are_deleted(self):
+        """Test expired tokens are deleted in batches and live ones are kept."""
+        output = self.purge()
+
+        self.assertIn('Deleted 3 expired tokens in 2 batches.', output)
+        self.assertEqual(AuthToken.objects.count(), 2)
+        self.assertFalse(any(token.is_expired() for token in AuthToken.objects.all()))
+
+    def test_max_batches(self):
+        """Test '--max-batches' stops after that many batches."""
+        output = self.purge('--max-batches', '1')
+
+        self.assertIn('Deleted 2 expired tokens in 1 batches.', output)
+        self.assertEqual(AuthToken.objects.count(), 3)
+
+
+@override_settings(TASK_ARCHIVE={'AFTER_DAYS': 90})
+class TestArchiveTasks(TestCase):
+    """Test the 'archive_tasks' command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='securepassword909')
+        now = timezone.now()
+        old = now - timedelta(days=100)
+        self.old_ids = [
+            Task.objects.create(user=self.user, title=f'Old {i}', is_completed=True, date_completed=old).id
+            for i in range(5)
+        ]
+        Task.objects.create(user=self.user, title='Open')
+        Task.objects.create(user=self.user, title='Recent', is_completed=True, date_completed=now)
+        Task.objects.create(user=self.user, title='Due later', is_completed=True, date_completed=old, date_due=now)
+        Task.objects.create(user=self.user, title='Deleted', is_completed=True, date_completed=old, date_deleted=now)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_tasks', *args, stdout=out)
+        return out.getvalue()
+
+    def test_archive_old_completed_tasks(self):
+        """Test only tasks completed and due before the cutoff are moved, keeping their ids and counters."""
+        output = self.archive()
+
+        self.assertIn('Archived 5 tasks in 1 batches.', output)
+        self.assertEqual(sorted(ArchivedTask.objects.values_list('id', flat=True)), self.old_ids)
+        self.assertEqual(sorted(Task.all_objects.values_list('title', flat=True)), ['Deleted', 'Due later', 'Open', 'Recent'])
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_count, stats.completed_count), (1, 7))
+
+    def test_resumable_batches(self):
+        """Test archiving stops after '--max-batches' and a later run picks up the rest."""
+        self.assertIn('Archived 4 tasks in 2 batches.', self.archive('--batch-size', '2', '--max-batches', '2'))
+
+        self.assertIn('Archived 1 tasks in 1 batches.', self.archive('--batch-size', '2'))
+        self.assertEqual(ArchivedTask.objects.count(), 5)
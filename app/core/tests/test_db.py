@@ -0,0 +1,73 @@
+"""
+Test the database connection helpers.
+"""
+from unittest.mock import MagicMock, patch
+
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase
+
+from core import db
+from core.db import close_unusable_connections, pending_migrations
+
+
+def make_connection(usable=True, health_checks=True, connected=True, in_atomic_block=False):
+    connection = MagicMock(in_atomic_block=in_atomic_block, settings_dict={'CONN_HEALTH_CHECKS': health_checks})
+    connection.connection = object() if connected else None
+    connection.is_usable.return_value = usable
+    return connection
+
+
+@patch('core.db.connections')
+class TestCloseUnusableConnections(SimpleTestCase):
+    """Test dropped persistent connections are closed before they are reused."""
+
+    def test_dropped_connection_is_closed(self, patched_connections):
+        """Test a connection failing its health check is closed."""
+        dropped, healthy = make_connection(usable=False), make_connection()
+        patched_connections.all.return_value = [dropped, healthy]
+
+        close_unusable_connections()
+
+        dropped.close.assert_called_once_with()
+        healthy.close.assert_not_called()
+
+    def test_skipped_connections(self, patched_connections):
+        """Test connections are not checked without health checks, when closed or inside a transaction."""
+        connections = [
+            make_connection(usable=False, health_checks=False),
+            make_connection(usable=False, connected=False),
+            make_connection(usable=False, in_atomic_block=True),
+        ]
+        patched_connections.all.return_value = connections
+
+        close_unusable_connections()
+
+        for connection in connections:
+            connection.is_usable.assert_not_called()
+            connection.close.assert_not_called()
+
+
+class TestPendingMigrations(TestCase):
+    """Test the pending migrations check."""
+
+    def setUp(self):
+        db._migrated.clear()
+        self.addCleanup(db._migrated.clear)
+
+    def test_migrated_database_is_not_asked_again(self):
+        """Test no migrations are loaded once all were found applied."""
+        self.assertEqual(pending_migrations(), [])
+
+        with patch.object(MigrationExecutor, 'migration_plan') as patched_migration_plan:
+            self.assertEqual(pending_migrations(), [])
+
+        patched_migration_plan.assert_not_called()
+
+    def test_pending_migrations(self):
+        """Test unapplied migrations are returned, and asked for again."""
+        migration = MagicMock()
+        with patch.object(MigrationExecutor, 'migration_plan', return_value=[(migration, False)]) as patched_migration_plan:
+            self.assertEqual(pending_migrations(), [migration])
+            self.assertEqual(pending_migrations(), [migration])
+
+        self.assertEqual(patched_migration_plan.call_count, 2)
@@ -0,0 +1,73 @@
+"""
+Test the tunable password hashers.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.authentication import login_throttle
+
+TOKEN_URL = reverse('user:token')
+
+PBKDF2_HASHERS = ['core.hashers.PBKDF2PasswordHasher', 'core.hashers.Argon2PasswordHasher']
+ARGON2_HASHERS = ['core.hashers.Argon2PasswordHasher', 'core.hashers.PBKDF2PasswordHasher']
+# Cheap work factors, so tests stay fast.
+PBKDF2_CONFIG = {'PBKDF2_ITERATIONS': 1000}
+ARGON2_CONFIG = {'ARGON2_TIME_COST': 1, 'ARGON2_MEMORY_COST': 1024, 'ARGON2_PARALLELISM': 1}
+
+
+class TestPasswordHashers(TestCase):
+    """Test the hasher and work factor are set by 'PASSWORD_HASHING' and upgraded on login."""
+
+    def setUp(self):
+        login_throttle.cache.clear()
+        self.addCleanup(login_throttle.cache.clear)
+        self.client = APIClient()
+
+    def create_user(self):
+        return get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+
+    def login(self):
+        return self.client.post(TOKEN_URL, {'email': 'user@example.com', 'password': 'securepassword909'})
+
+    @override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_HASHING=PBKDF2_CONFIG)
+    def test_pbkdf2_iterations(self):
+        """Test new PBKDF2 hashes use the configured iterations."""
+        self.assertEqual(make_password('securepassword909').split('$')[:2], ['pbkdf2_sha256', '1000'])
+
+    @override_settings(PASSWORD_HASHERS=ARGON2_HASHERS, PASSWORD_HASHING=ARGON2_CONFIG)
+    def test_argon2_parameters(self):
+        """Test new Argon2 hashes use the configured parameters."""
+        self.assertIn('$m=1024,t=1,p=1$', make_password('securepassword909'))
+
+    def test_rehash_on_login_when_work_factor_changes(self):
+        """Test a password stored with other iterations is rehashed on a successful login."""
+        with override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_HASHING=PBKDF2_CONFIG):
+            user = self.create_user()
+
+        with override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_HASHING={'PBKDF2_ITERATIONS': 2000}):
+            res = self.login()
+
+        self.assertEqual(res.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(user.password.split('$')[1], '2000')
+
+    def test_rehash_on_login_when_hasher_changes(self):
+        """Test a password stored with another hasher is rehashed on a successful login, and only then."""
+        with override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_HASHING=PBKDF2_CONFIG):
+            user = self.create_user()
+
+        with override_settings(PASSWORD_HASHERS=ARGON2_HASHERS, PASSWORD_HASHING=ARGON2_CONFIG):
+            self.client.post(TOKEN_URL, {'email': 'user@example.com', 'password': 'wrongpassword'})
+            user.refresh_from_db()
+            self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+
+            res = self.login()
+
+        self.assertEqual(res.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'argon2')
+        with override_settings(PASSWORD_HASHERS=ARGON2_HASHERS, PASSWORD_HASHING=ARGON2_CONFIG):
+            self.assertTrue(user.check_password('securepassword909'))
@@ -0,0 +1,84 @@
+"""
+Test the request profiling middleware.
+"""
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.middleware import QueryBudgetExceeded
+from core.models import AuthToken, Task
+from task.views import TaskViewSet
+from user.views import ManageUserView
+
+TASK_URL = reverse('task:task-list')
+ME_URL = reverse('user:me')
+
+
+class TestRequestProfilingMiddleware(TestCase):
+    """Test requests are profiled and held to their query budgets."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {AuthToken.objects.create(user=self.user).key}')
+        Task.objects.create(user=self.user, title='Walk the dog')
+
+    def test_server_timing_header(self):
+        """Test the query count and timings are sent in a 'Server-Timing' header."""
+        res = self.client.get(TASK_URL)
+
+        metrics = [metric.split(';')[0] for metric in res['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['db', 'render', 'total'])
+        self.assertIn('desc="3 queries"', res['Server-Timing'])
+
+    def test_log_line(self):
+        """Test each request is logged as a JSON line."""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            res = self.client.get(TASK_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'task:task-list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 3)
+        self.assertEqual(record['query_budget'], TaskViewSet.query_budget['list'])
+        self.assertEqual(record['size'], len(res.content))
+        for key in ('sql_ms', 'render_ms', 'total_ms'):
+            self.assertGreaterEqual(record[key], 0)
+
+    def test_token_authenticated_requests_are_within_budget(self):
+        """Test the budgets leave room for the token lookup of an uncached token."""
+        self.client.get(TASK_URL)
+        self.client.get(reverse('task:task-detail', args=[Task.objects.get().id]))
+        self.client.get(reverse('task:task-stats'))
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+    @patch.object(TaskViewSet, 'query_budget', {'list': 1})
+    def test_budget_is_enforced(self):
+        """Test a request over its view's budget fails when budgets are enforced."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'GET task:task-list ran 3 queries, over its budget of 1.'):
+            self.client.get(TASK_URL)
+
+    @patch.object(ManageUserView, 'query_budget', {'get': 0})
+    def test_budget_is_logged_when_not_enforced(self):
+        """Test a request over its view's budget only logs a warning when budgets are not enforced."""
+        with override_settings(REQUEST_PROFILING={'ENABLED': True, 'ENFORCE_BUDGETS': False}):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('GET user:me ran 1 queries, over its budget of 0.', logs.output[0])
+
+    def test_disabled(self):
+        """Test nothing is measured when profiling is disabled."""
+        with override_settings(REQUEST_PROFILING={'ENABLED': False}):
+            res = self.client.get(TASK_URL)
+
+        self.assertNotIn('Server-Timing', res)
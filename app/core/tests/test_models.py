@@ -65,3 +65,93 @@ class TestTaskModel(TestCase):
             title='Walk the dog',
         )
         self.assertEqual(str(task), task.title)
+
+
+class TestTaskStats(TestCase):
+    """Test the task counters follow task writes."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='securepassword909')
+
+    def assertCounts(self, open_count, completed_count):
+        """Assert the user's counters, and that they match the tasks."""
+        stats = models.TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_count, stats.completed_count), (open_count, completed_count))
+        self.assertEqual(models.TaskStats.objects.count([self.user.id])[self.user.id], {
+            'open_count': open_count,
+            'completed_count': completed_count,
+        })
+
+    def test_new_user_has_counters(self):
+        """Test creating a user creates zeroed counters."""
+        self.assertCounts(0, 0)
+
+    def test_counters_follow_saves(self):
+        """Test creating, completing, reopening and deleting a task updates the counters."""
+        task = models.Task.objects.create(user=self.user, title='Walk the dog')
+        models.Task.objects.create(user=self.user, title='Feed the cat', is_completed=True)
+        self.assertCounts(1, 1)
+
+        task.is_completed = True
+        task.save()
+        self.assertCounts(0, 2)
+
+        task = models.Task.objects.get(id=task.id)
+        task.is_completed = False
+        task.save()
+        self.assertCounts(1, 1)
+
+        task.soft_delete()
+        self.assertCounts(0, 1)
+
+    def test_concurrent_completions_count_once(self):
+        """Test saving a task completed since it was loaded does not move it again."""
+        task = models.Task.objects.create(user=self.user, title='Walk the dog')
+        first, second = models.Task.objects.get(id=task.id), models.Task.objects.get(id=task.id)
+
+        for loaded in (first, second):
+            loaded.is_completed = True
+            loaded.save()
+
+        self.assertCounts(0, 1)
+
+    def test_unchanged_counter_is_not_written(self):
+        """Test saves that do not move the task between counters do not touch them."""
+        task = models.Task.objects.create(user=self.user, title='Walk the dog')
+        task.title = 'Walk the dogs'
+
+        with self.assertNumQueries(1):
+            task.save()
+
+    def test_hard_delete(self):
+        """Test deleting task rows removes them from the counters."""
+        models.Task.objects.create(user=self.user, title='Walk the dog')
+        models.Task.objects.create(user=self.user, title='Feed the cat', is_completed=True).delete()
+        self.assertCounts(1, 0)
+
+        models.Task.objects.filter(user=self.user).delete()
+        self.assertCounts(0, 0)
+
+    def test_deleting_soft_deleted_task(self):
+        """Test deleting the row of a soft deleted task does not count it twice."""
+        task = models.Task.objects.create(user=self.user, title='Walk the dog')
+        task.soft_delete()
+        models.Task.all_objects.get(id=task.id).delete()
+        self.assertCounts(0, 0)
+
+    def test_deleting_user(self):
+        """Test users with tasks can be deleted along with their counters."""
+        models.Task.objects.create(user=self.user, title='Walk the dog')
+        self.user.delete()
+
+        self.assertFalse(models.TaskStats.objects.exists())
+
+    def test_deleting_user_deletes_tasks_in_one_statement(self):
+        """Test the queries to delete a user do not grow with their number of tasks."""
+        models.Task.objects.bulk_create(models.Task(user=self.user, title=f'Task {i}') for i in range(200))
+
+        # One query per related table, the tokens being fetched to drop them from the token cache.
+        with self.assertNumQueries(8):
+            self.user.delete()
+
+        self.assertFalse(models.Task.all_objects.exists())
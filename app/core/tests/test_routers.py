@@ -0,0 +1,88 @@
+"""
+Test the read replica router.
+"""
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import Task
+from core.routers import ReplicaRouter, ReplicaSet, replica_alias
+
+REPLICAS = {'ALIASES': ['replica_0', 'replica_1'], 'MAX_LAG': 5, 'CHECK_INTERVAL': 5}
+
+
+class TestReplicaRouter(TestCase):
+    """Test only reads routed to a replica leave the primary."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        token = replica_alias.set('replica_0')
+        self.addCleanup(replica_alias.reset, token)
+
+    def test_reads_use_the_chosen_replica(self):
+        """Test reads go to the replica chosen for the request."""
+        self.assertEqual(self.router.db_for_read(Task), 'replica_0')
+
+        replica_alias.set(None)
+
+        self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_writes_use_the_primary(self):
+        """Test writes go to the primary, also for objects read from a replica."""
+        task = Task(user=get_user_model().objects.create_user(email='user@example.com'))
+        task._state.db = 'replica_0'
+
+        self.assertEqual(self.router.db_for_write(Task, instance=task), 'default')
+
+    @override_settings(READ_REPLICAS=REPLICAS)
+    def test_replicas_are_not_migrated(self):
+        """Test migrations only run on the primary."""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(READ_REPLICAS=REPLICAS)
+@patch('core.routers.connections', new=MagicMock())
+@patch.object(ReplicaSet, 'get_lag', return_value=0)
+class TestReplicaSet(SimpleTestCase):
+    """Test replicas are only chosen while they answer and keep up with the primary."""
+
+    def setUp(self):
+        self.replicas = ReplicaSet()
+
+    def test_choose_healthy_replica(self, patched_get_lag):
+        """Test a healthy replica is chosen."""
+        self.assertIn(self.replicas.choose(), REPLICAS['ALIASES'])
+
+    def test_lagging_replica_is_skipped(self, patched_get_lag):
+        """Test replicas over 'MAX_LAG', or whose lag is unknown, are not chosen."""
+        patched_get_lag.side_effect = [6, None]
+
+        with self.assertLogs('core.routers', 'WARNING'):
+            self.assertIsNone(self.replicas.choose())
+
+    def test_unavailable_replica_is_skipped(self, patched_get_lag):
+        """Test a replica that cannot be queried is not chosen, and its connection is closed."""
+        patched_get_lag.side_effect = [OperationalError('connection refused'), 0]
+
+        with self.assertLogs('core.routers', 'WARNING'):
+            self.assertEqual(self.replicas.choose(), 'replica_1')
+
+        patched_get_lag.call_args_list[0].args[0].close.assert_called_once_with()
+
+    @patch('core.routers.time.monotonic')
+    def test_health_is_cached(self, patched_monotonic, patched_get_lag):
+        """Test each replica is checked at most once per 'CHECK_INTERVAL'."""
+        patched_monotonic.return_value = 100
+        self.replicas.choose()
+        patched_monotonic.return_value = 104
+        self.replicas.choose()
+
+        self.assertEqual(patched_get_lag.call_count, 2)
+
+        patched_monotonic.return_value = 106
+        self.replicas.choose()
+
+        self.assertEqual(patched_get_lag.call_count, 4)
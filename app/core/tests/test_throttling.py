@@ -0,0 +1,166 @@
+"""
+Test the API rate limits.
+"""
+import unittest
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import MemoryBucketStore, RedisBucketStore, get_store
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+TASK_URL = reverse('task:task-list')
+BULK_URL = reverse('task:task-bulk-create')
+TOKEN_URL = reverse('user:token')
+
+THROTTLE = {
+    'ENABLED': True,
+    'REDIS_URL': None,
+    'MAX_SIZE': 1000,
+    'SCOPES': {'read': (1, 2), 'bulk': (1, 1), 'login': (1, 1)},
+}
+
+
+class BucketStoreTests:
+    """Token bucket behaviour shared by every store."""
+
+    def test_burst_then_rate(self):
+        """Test a full bucket allows 'burst' requests at once, then refills at 'rate' a second."""
+        self.assertEqual([self.store.take('key', 2, 3, 100) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.store.take('key', 2, 3, 100), 0.5)
+
+        self.assertEqual(self.store.take('key', 2, 3, 100.5), 0)
+        self.assertAlmostEqual(self.store.take('key', 2, 3, 100.75), 0.25)
+
+    def test_refill_is_capped_at_burst(self):
+        """Test an idle bucket never holds more than 'burst' tokens."""
+        self.store.take('key', 1, 2, 100)
+
+        self.assertEqual([self.store.take('key', 1, 2, 1000) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(self.store.take('key', 1, 2, 1000), 1)
+
+    def test_buckets_are_independent(self):
+        """Test emptying one bucket leaves the others full."""
+        self.store.take('key', 1, 1, 100)
+
+        self.assertGreater(self.store.take('key', 1, 1, 100), 0)
+        self.assertEqual(self.store.take('other', 1, 1, 100), 0)
+
+
+class TestMemoryBucketStore(BucketStoreTests, SimpleTestCase):
+    """Test the in-process store."""
+
+    def setUp(self):
+        self.store = MemoryBucketStore(max_size=10)
+
+    def test_least_recently_used_buckets_are_dropped(self):
+        """Test the store keeps at most 'max_size' buckets."""
+        for i in range(11):
+            self.store.take(f'key-{i}', 1, 1, 100)
+
+        self.assertEqual(len(self.store._buckets), 10)
+        self.assertEqual(self.store.take('key-0', 1, 1, 100), 0)
+
+
+@unittest.skipIf(fakeredis is None, 'The Redis stand-in "fakeredis[lua]" is not installed.')
+class TestRedisBucketStore(BucketStoreTests, SimpleTestCase):
+    """Test the Redis store against a stand-in server."""
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        with patch('redis.Redis.from_url', return_value=fakeredis.FakeRedis(server=self.server)):
+            self.store = RedisBucketStore('redis://localhost:6379/0')
+
+    def test_idle_buckets_expire(self):
+        """Test a bucket expires once it would be full again."""
+        self.store.take('key', 2, 3, 100)
+
+        self.assertTrue(400 < self.store.client.pttl('key') <= 501)
+
+    def test_shared_between_processes(self):
+        """Test every store on the same server takes from the same buckets."""
+        with patch('redis.Redis.from_url', return_value=fakeredis.FakeRedis(server=self.server)):
+            other = RedisBucketStore('redis://localhost:6379/0')
+        self.store.take('key', 1, 1, 100)
+
+        self.assertGreater(other.take('key', 1, 1, 100), 0)
+
+    def test_unavailable_server_lets_requests_through(self):
+        """Test requests are allowed, with a warning, while Redis cannot be reached."""
+        self.server.connected = False
+
+        with self.assertLogs('core.throttling', 'WARNING'):
+            self.assertEqual(self.store.take('key', 1, 1, 100), 0)
+
+        self.server.connected = True
+        self.assertEqual(self.store.take('key', 1, 1, 100), 0)
+        self.assertGreater(self.store.take('key', 1, 1, 100), 0)
+
+    @override_settings(API_THROTTLE={**THROTTLE, 'REDIS_URL': 'redis://localhost:6379/0'})
+    def test_unavailable_server_does_not_fail_the_api(self):
+        """Test API requests succeed while Redis cannot be reached."""
+        self.server.connected = False
+        client = APIClient()
+        client.force_authenticate(get_user_model()(id=1, email='user@example.com'))
+
+        with patch('core.throttling.get_store', return_value=self.store), self.assertLogs('core.throttling', 'WARNING'):
+            res = client.get(reverse('user:me'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(API_THROTTLE=THROTTLE)
+class TestThrottledAPI(TestCase):
+    """Test the rate limits of the API endpoints."""
+
+    def setUp(self):
+        get_store.cache_clear()
+        self.addCleanup(get_store.cache_clear)
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requests_over_the_limit_are_refused(self):
+        """Test requests beyond the burst answer 429 with the seconds to wait."""
+        responses = [self.client.get(TASK_URL) for _ in range(3)]
+
+        self.assertEqual([res.status_code for res in responses], [200, 200, 429])
+        self.assertEqual(responses[2]['Retry-After'], '1')
+
+    def test_scopes_and_users_are_limited_separately(self):
+        """Test each scope and each user has its own bucket."""
+        self.client.get(TASK_URL)
+        self.client.get(TASK_URL)
+
+        self.assertEqual(self.client.post(BULK_URL, [{'title': 'Task'}], format='json').status_code, status.HTTP_201_CREATED)
+        other_client = APIClient()
+        other_client.force_authenticate(get_user_model().objects.create_user(email='other@example.com'))
+        self.assertEqual(other_client.get(TASK_URL).status_code, status.HTTP_200_OK)
+
+    def test_logins_are_limited_per_address(self):
+        """Test anonymous logins are limited by client address."""
+        client = APIClient()
+        payload = {'email': 'user@example.com', 'password': 'securepassword909'}
+
+        self.assertEqual(client.post(TOKEN_URL, payload).status_code, status.HTTP_200_OK)
+        self.assertEqual(client.post(TOKEN_URL, payload).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_unscoped_actions_are_not_limited(self):
+        """Test actions without a scope in 'SCOPES' are never refused."""
+        for _ in range(3):
+            self.assertEqual(self.client.post(TASK_URL, {'title': 'Task'}).status_code, status.HTTP_201_CREATED)
+
+    @override_settings(API_THROTTLE={**THROTTLE, 'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is limited when 'ENABLED' is off."""
+        for _ in range(3):
+            self.assertEqual(self.client.get(TASK_URL).status_code, status.HTTP_200_OK)
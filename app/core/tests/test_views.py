@@ -0,0 +1,60 @@
+"""
+Test the health check views.
+"""
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+LIVE_URL = reverse('health-live')
+READY_URL = reverse('health-ready')
+
+
+class TestHealthViews(TestCase):
+    """Test the liveness and readiness endpoints."""
+
+    def test_liveness(self):
+        """Test liveness answers without querying the database."""
+        with self.assertNumQueries(0):
+            response = self.client.get(LIVE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """Test readiness answers 200 when the database answers and is migrated."""
+        response = self.client.get(READY_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    @patch('core.views.check_database', side_effect=OperationalError('could not connect to server at "db.internal", port 5432'))
+    def test_database_unavailable(self, patched_check_database):
+        """Test readiness answers 503 when the database does not answer, logging the error rather than disclosing it."""
+        with self.assertLogs('core.views', 'ERROR') as logs:
+            response = self.client.get(READY_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'detail': 'database unavailable'})
+        self.assertIn('db.internal', logs.output[0])
+
+    @patch('core.views.pending_migrations', return_value=['0006_auth_token'])
+    def test_migrations_pending(self, patched_pending_migrations):
+        """Test readiness answers 503 while migrations are pending, unless 'HEALTH_CHECK_MIGRATIONS' is off."""
+        response = self.client.get(READY_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['detail'], '1 migrations pending.')
+
+        with override_settings(HEALTH_CHECK_MIGRATIONS=False):
+            response = self.client.get(READY_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_only_safe_methods(self):
+        """Test the probes refuse writes."""
+        response = self.client.post(READY_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
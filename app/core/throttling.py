@@ -0,0 +1,145 @@
+"""
+Rate limiting for the APIs.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Takes a token from the bucket in KEYS[1], refilled at ARGV[1] tokens a second up to ARGV[2], at
+# time ARGV[3]. Returns the seconds to wait before a token is available, 0 when one was taken. The
+# bucket expires once it would be full again, so idle clients cost no memory.
+TAKE_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'time')
+local tokens, last = tonumber(bucket[1]), tonumber(bucket[2])
+if tokens == nil then
+    tokens, last = burst, now
+end
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'time', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1)
+return tostring(wait)
+"""
+
+
+def get_config():
+    return getattr(settings, 'API_THROTTLE', {})
+
+
+class MemoryBucketStore:
+    """Token buckets kept in this process, for a single node.
+
+    At most 'max_size' buckets are kept, the least recently used are dropped first, which
+    only ever lets a client through sooner.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        """Take a token from a bucket and return 0, or the seconds to wait when it is empty."""
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0, now - last) * rate)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBucketStore:
+    """Token buckets kept in Redis, or any server speaking its protocol, shared by every node.
+
+    Each check is a single atomic script call on one key. The time comes from the node
+    making the request, so keep the nodes' clocks in sync. While the server cannot be
+    reached, requests are let through with a warning rather than failing the API.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('API_THROTTLE["REDIS_URL"] requires the "redis" package.')
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+        self.errors = redis.RedisError
+
+    def take(self, key, rate, burst, now):
+        """Take a token from a bucket and return 0, or the seconds to wait when it is empty."""
+        try:
+            return float(self.script(keys=[key], args=[rate, burst, repr(now)]))
+        except self.errors as exc:
+            logger.warning('Rate limiting skipped, Redis is unavailable: %s', exc)
+            return 0
+
+
+@functools.lru_cache()
+def get_store(redis_url, max_size):
+    """Return the bucket store, in Redis when 'API_THROTTLE["REDIS_URL"]' is set, else in this process."""
+    if redis_url:
+        return RedisBucketStore(redis_url)
+    return MemoryBucketStore(max_size)
+
+
+def get_scope(view, method):
+    """Return the throttle scope of a request to a view, or None when it is not throttled.
+
+    A view sets 'throttle_scope' to a scope, or to a dict of scopes by action for viewsets,
+    or by handler method name ('get', 'post', ...) for other views, as for 'query_budget'.
+    """
+    scope = getattr(view, 'throttle_scope', None)
+    if isinstance(scope, dict):
+        method = 'get' if method == 'HEAD' else method.lower()
+        scope = scope.get(getattr(view, 'action', None) or method)
+    return scope
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each user, or each client address for anonymous requests, with a token bucket per scope.
+
+    'API_THROTTLE["SCOPES"]' maps each scope to its (rate per second, burst): a client may
+    send 'burst' requests at once, then 'rate' requests a second. Users have a single
+    token, so limiting the user limits the token too.
+    """
+    key_prefix = 'throttle:'
+
+    def allow_request(self, request, view):
+        config = get_config()
+        scope = get_scope(view, request.method)
+        if not config.get('ENABLED', True) or scope not in config.get('SCOPES', {}):
+            return True
+        rate, burst = config['SCOPES'][scope]
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        store = get_store(config.get('REDIS_URL'), config.get('MAX_SIZE', 100000))
+        self.wait_seconds = store.take(f'{self.key_prefix}{scope}:{ident}', rate, burst, time.time())
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return math.ceil(self.wait_seconds)
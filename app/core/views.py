@@ -0,0 +1,34 @@
+"""
+Health check views for the project.
+"""
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.db import check_database, pending_migrations
+
+logger = logging.getLogger(__name__)
+
+
+@require_safe
+def liveness(request):
+    """Answer while the process serves requests, without touching the database."""
+    return JsonResponse({'status': 'ok'})
+
+
+@require_safe
+def readiness(request):
+    """Answer 200 when the database answers, and has every migration applied when 'HEALTH_CHECK_MIGRATIONS' is on, else 503."""
+    try:
+        check_database()
+        pending = pending_migrations() if settings.HEALTH_CHECK_MIGRATIONS else []
+    except DatabaseError:
+        # The error can name the database host, port and user, so it is only logged.
+        logger.exception('Readiness check failed.')
+        return JsonResponse({'status': 'unavailable', 'detail': 'database unavailable'}, status=503)
+    if pending:
+        return JsonResponse({'status': 'unavailable', 'detail': f'{len(pending)} migrations pending.'}, status=503)
+    return JsonResponse({'status': 'ok'})
@@ -0,0 +1,151 @@
+"""
+Archival of old completed tasks.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import ArchivedTask, Task
+from task.cache import task_list_cache
+from task.pagination import DEFAULT_ORDERING, list_order_key, order_list
+
+
+def get_cutoff(now=None):
+    """Return the time before which completed tasks are archived, 'TASK_ARCHIVE["AFTER_DAYS"]' ago."""
+    days = getattr(settings, 'TASK_ARCHIVE', {}).get('AFTER_DAYS', 90)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archivable_tasks(cutoff):
+    """Return the tasks to archive: completed before the cutoff, and not due after it.
+
+    Every archived task is due before the cutoff or not at all, so a due date range only
+    needs the archive when it starts before the cutoff, see 'archive_is_reachable'.
+    """
+    return Task.objects.filter(is_completed=True, date_completed__lt=cutoff).filter(
+        Q(date_due__isnull=True) | Q(date_due__lt=cutoff),
+    )
+
+
+def move_tasks(source, target, ids, using=DEFAULT_DB_ALIAS):
+    """Move the rows with the given ids from one task table to the other, keeping their ids.
+
+    Rows are copied and deleted with one statement each, so neither 'Task.save' nor the
+    'post_delete' signal runs, and the 'TaskStats' counters are left alone.
+    """
+    if not ids:
+        return 0
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in Task._meta.concrete_fields)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic(using=using, savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote_name(target._meta.db_table)} ({columns}) '
+            f'SELECT {columns} FROM {quote_name(source._meta.db_table)} WHERE id IN ({placeholders})',
+            ids,
+        )
+        cursor.execute(f'DELETE FROM {quote_name(source._meta.db_table)} WHERE id IN ({placeholders})', ids)
+        return cursor.rowcount
+
+
+def archive_batch(cutoff, batch_size, using=DEFAULT_DB_ALIAS):
+    """Archive up to 'batch_size' tasks completed before the cutoff and return how many were moved.
+
+    The batch is locked while it is moved, and rows locked by a concurrent write are left
+    for a later batch, so the API is never blocked behind the archival. The cached lists of
+    the batch's users are dropped, as their unfiltered lists no longer show these tasks.
+    """
+    with transaction.atomic(using=using):
+        rows = list(
+            archivable_tasks(cutoff).using(using)
+            .select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', 'user_id')[:batch_size]
+        )
+        for user_id in {user_id for _, user_id in rows}:
+            task_list_cache.invalidate(user_id, using)
+        return move_tasks(Task, ArchivedTask, [task_id for task_id, _ in rows], using)
+
+
+def restore_tasks(user, ids):
+    """Move the user's archived tasks with the given ids back to 'Task', and return how many were moved."""
+    archived = ArchivedTask.objects.filter(user=user, id__in=ids)
+    if not archived.exists():
+        return 0
+    with transaction.atomic():
+        ids = list(archived.select_for_update().values_list('id', flat=True))
+        return move_tasks(ArchivedTask, Task, ids)
+
+
+def archive_may_match(filters, now=None):
+    """Return whether the parsed task list filters, a 'task.filters.TaskFilters', can match archived tasks at all.
+
+    Only completed tasks are archived, so the archive cannot match filters that only match
+    open tasks, nor a range starting after the cutoff: archived tasks were created and
+    completed before it, and are due before it or not at all. Exports read the archive
+    whenever it may match, see 'archive_is_reachable' for lists.
+    """
+    values = filters.values
+    if values.get('is_completed') is False or values.get('overdue') is True:
+        return False
+    cutoff = get_cutoff(now)
+    ranges = [values[field] for field in filters.range_fields if field in values]
+    return all(start is None or start < cutoff for start, _ in ranges)
+
+
+def archive_is_reachable(filters, now=None):
+    """Return whether a task list with the parsed filters, a 'task.filters.TaskFilters', reads archived tasks.
+
+    Lists read the archive for 'is_completed=true' or a date range, when it may match them,
+    see 'archive_may_match'. Any other list only reads 'Task'.
+    """
+    values = filters.values
+    if values.get('is_completed') is not True and not any(field in values for field in filters.range_fields):
+        return False
+    return archive_may_match(filters, now)
+
+
+class CombinedQuerySet:
+    """Tasks from querysets over 'Task' and 'ArchivedTask', iterated as one list.
+
+    Each queryset is in the list order for 'ordering', see 'task.pagination.order_list', and
+    iterating merges them in that order. Ids are kept when tasks are archived, so they stay
+    unique across both. 'TaskKeysetPagination' pages through each queryset and merges the
+    pages.
+    """
+
+    def __init__(self, *querysets, ordering=DEFAULT_ORDERING):
+        self.ordering = ordering
+        self.querysets = [order_list(queryset, ordering) for queryset in querysets]
+
+    @property
+    def query(self):
+        return self.querysets[0].query
+
+    @property
+    def db(self):
+        return self.querysets[0].db
+
+    @property
+    def ranked(self):
+        return 'rank' in self.query.annotations
+
+    def values(self, *fields):
+        return CombinedQuerySet(*(queryset.values(*fields) for queryset in self.querysets), ordering=self.ordering)
+
+    def merge(self, iterables):
+        """Merge iterables of tasks, each in the list order, into one."""
+        ranked, ordering = self.ranked, self.ordering
+        return heapq.merge(
+            *iterables,
+            key=lambda item: list_order_key(item, ranked, ordering),
+            reverse=ordering.startswith('-') and not ranked,
+        )
+
+    def __iter__(self):
+        return self.merge(self.querysets)
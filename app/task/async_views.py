@@ -0,0 +1,50 @@
+"""
+Async views for the task API.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from core.db import close_unusable_connections
+
+from task.views import TaskViewSet
+
+
+def database_sync_to_async(func):
+    """Return an async wrapper running 'func' in the thread pool, with its own database connection.
+
+    Django 3.2 has no async ORM, and under ASGI every sync view shares a single thread so
+    database work runs one request at a time. Running it in the pool instead lets up to
+    'ASGI_THREADS' requests query concurrently, while slow clients only hold the event loop.
+    Old and dropped connections are closed around each call, as 'request_started' and
+    'request_finished' do for the request thread.
+    """
+    def inner(*args, **kwargs):
+        close_old_connections()
+        close_unusable_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+def async_view(view):
+    """Return an async view running a DRF view, and rendering its response, in the thread pool."""
+    def run(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    run_in_pool = database_sync_to_async(run)
+
+    async def async_wrapper(request, *args, **kwargs):
+        return await run_in_pool(request, *args, **kwargs)
+
+    # DRF authenticates with tokens, so like 'APIView.as_view' the view is exempt from CSRF checks.
+    async_wrapper.csrf_exempt = True
+    return async_wrapper
+
+
+task_list = async_view(TaskViewSet.as_view({'get': 'list', 'post': 'create'}))
+task_detail = async_view(TaskViewSet.as_view({'get': 'retrieve'}))
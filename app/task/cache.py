@@ -0,0 +1,87 @@
+"""
+Per-user cache of task list responses.
+"""
+import hashlib
+import secrets
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+# Query params whose value is matched case-insensitively by the list filters.
+CASE_INSENSITIVE_PARAMS = {'is_completed', 'overdue'}
+
+
+class TaskListCache:
+    """Task list responses cached per user, under a version changed by every write to the user's tasks.
+
+    Changing the version makes all of the user's cached lists unreachable at once. Lookups
+    read the version before the tasks are read, and writes change it once they commit, so
+    a list read before a write is only ever stored under an outdated version. Versions are
+    random, so a version evicted from the cache is never reused.
+    """
+    key_prefix = 'task-list:'
+
+    @property
+    def config(self):
+        return getattr(settings, 'TASK_LIST_CACHE', {})
+
+    @property
+    def enabled(self):
+        return self.config.get('ENABLED', False)
+
+    @property
+    def cache(self):
+        return caches[self.config.get('CACHE_ALIAS', 'default')]
+
+    def version_key(self, user_id):
+        return f'{self.key_prefix}{user_id}:version'
+
+    def get_version(self, user_id):
+        """Return the user's current version, starting a new one when there is none."""
+        key = self.version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            version = secrets.token_hex(8)
+            if not self.cache.add(key, version, None):
+                version = self.cache.get(key, version)
+        return version
+
+    def make_key(self, request):
+        """Return the cache key of a list request: its user's version, host, media type and normalized query params."""
+        params = sorted(
+            (name, value.lower() if name in CASE_INSENSITIVE_PARAMS else value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+        digest = hashlib.sha1(
+            '\n'.join([request.get_host(), request.accepted_media_type, urlencode(params)]).encode(),
+        ).hexdigest()
+        return f'{self.key_prefix}{request.user.pk}:{self.get_version(request.user.pk)}:{digest}'
+
+    def get(self, key, now=None):
+        """Return the cached (etag, last modified, data) of a list, or None, also once it expired."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        etag, last_modified, data, expires = entry
+        if expires is not None and (now or timezone.now()) > expires:
+            return None
+        return etag, last_modified, data
+
+    def set(self, key, etag, last_modified, data, expires=None):
+        """Cache a list, until 'expires' when its filters depend on the time, see 'TaskFilters.changes_at'."""
+        self.cache.set(key, (etag, last_modified, data, expires), self.config.get('TIMEOUT', 300))
+
+    def invalidate(self, user_id, using=None):
+        """Drop all of the user's cached lists once the current transaction commits."""
+        if self.enabled:
+            transaction.on_commit(
+                lambda: self.cache.set(self.version_key(user_id), secrets.token_hex(8), None),
+                using=using,
+            )
+
+
+task_list_cache = TaskListCache()
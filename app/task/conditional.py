@@ -0,0 +1,49 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the task API.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Return a weak ETag for the given validator parts.
+
+    The tag is derived from what the response was built from, not from its bytes, so it is weak.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def last_modified_timestamp(last_modified):
+    """Return 'last_modified' as an HTTP timestamp, or None if it cannot be used as a validator yet.
+
+    'Last-Modified' only has a resolution of one second, so a change later in the same second
+    would go unnoticed by a client sending 'If-Modified-Since'. Until that second has passed,
+    clients have to rely on the ETag.
+    """
+    if last_modified is None or timezone.now() - last_modified < timedelta(seconds=1):
+        return None
+    return int(last_modified.timestamp())
+
+
+def conditional_response(request, etag, last_modified):
+    """Return a '304 Not Modified' response if the client's validators match, otherwise None."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """Add the validators and per-user caching headers to a response."""
+    response['ETag'] = etag
+    timestamp = last_modified_timestamp(last_modified)
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,77 @@
+"""
+Streaming export of tasks as NDJSON or a JSON array.
+"""
+import json
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renderer for newline delimited JSON.
+
+    Export responses are streamed by 'iter_tasks', so this only renders the other responses
+    (such as errors) that are negotiated for the 'ndjson' format, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dump(data) + b'\n'
+
+
+def dump(data):
+    """Return compact JSON bytes for serialized data, encoded like the API's JSON responses."""
+    return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def iter_tasks(queryset, serializer, output='ndjson', chunk_size=None):
+    """Yield the serialized tasks of a queryset as NDJSON lines or as the pieces of a JSON array.
+
+    Tasks are fetched 'chunk_size' at a time, see 'iter_chunked'. 'serializer' is a single
+    (not 'many') serializer instance reused for every row.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'TASK_EXPORT_CHUNK_SIZE', 2000)
+    rows = (dump(serializer.to_representation(task)) for task in iter_chunked(queryset, chunk_size))
+
+    if output == 'ndjson':
+        for row in rows:
+            yield row + b'\n'
+        return
+
+    yield b'['
+    for index, row in enumerate(rows):
+        yield row if index == 0 else b',' + row
+    yield b']'
+
+
+def iter_chunked(queryset, chunk_size):
+    """Yield the objects of a queryset, fetching 'chunk_size' rows per round trip.
+
+    'iterator()' uses a server-side cursor on PostgreSQL, so memory use stays constant however
+    many rows there are. When server-side cursors are disabled, as behind PgBouncer in
+    transaction pooling mode, 'iterator()' would load every row at once, so only the ordered
+    primary keys are read up front and the objects are fetched a chunk of keys at a time.
+    A 'CombinedQuerySet' of live and archived tasks is fetched from each table in turn, and
+    the tasks are merged in the list order.
+    """
+    querysets = getattr(queryset, 'querysets', None)
+    if querysets is not None:
+        yield from queryset.merge(iter_chunked(part, chunk_size) for part in querysets)
+        return
+
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    pks = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        objects = {obj.pk: obj for obj in queryset.filter(pk__in=chunk).order_by()}
+        yield from (objects[pk] for pk in chunk if pk in objects)
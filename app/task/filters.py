@@ -0,0 +1,173 @@
+"""
+Filtering and ordering of the task list.
+"""
+from datetime import datetime, time
+
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from task.pagination import DEFAULT_ORDERING, order_list
+from task.search import search_tasks
+
+
+def parse_boolean(value):
+    """Return the boolean of a 'true' or 'false' query param, in any case."""
+    value = value.lower()
+    if value not in ('true', 'false'):
+        raise ValueError('Expected "true" or "false".')
+    return value == 'true'
+
+
+def parse_moment(value):
+    """Return the aware datetime of a date or datetime query param, dates being at midnight."""
+    try:
+        moment = parse_datetime(value) or parse_date(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError('Expected a date or a datetime.')
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class BooleanFilter:
+    """Keep the tasks matching a condition for 'true', or the other tasks for 'false'.
+
+    The conditions are built from the time of the request, for those that depend on it.
+    Those filters also give 'changes_at', an aggregate of the first time after the request
+    at which a task may stop or start matching without being written.
+    """
+
+    def __init__(self, param, when_true, when_false, changes_at=None):
+        self.param = param
+        self.when_true = when_true
+        self.when_false = when_false
+        self.changes_at = changes_at
+
+    @property
+    def params(self):
+        return [self.param]
+
+    def parse(self, query_params):
+        try:
+            return parse_boolean(query_params[self.param])
+        except ValueError as exc:
+            raise ValidationError({self.param: [str(exc)]})
+
+    def apply(self, queryset, value, now):
+        return queryset.filter((self.when_true if value else self.when_false)(now))
+
+
+class RangeFilter:
+    """Keep the tasks whose field is within a '(start, end)' range, both ends included.
+
+    Either end may be left out, and tasks with a null field never match.
+    """
+
+    def __init__(self, field, start_param, end_param):
+        self.field = field
+        self.start_param = start_param
+        self.end_param = end_param
+
+    @property
+    def params(self):
+        return [self.start_param, self.end_param]
+
+    def parse(self, query_params):
+        value, errors = [], {}
+        for param in self.params:
+            try:
+                value.append(parse_moment(query_params[param]) if param in query_params else None)
+            except ValueError as exc:
+                errors[param] = [str(exc)]
+        if errors:
+            raise ValidationError(errors)
+        return tuple(value)
+
+    def apply(self, queryset, value, now):
+        start, end = value
+        if start is not None:
+            queryset = queryset.filter(**{f'{self.field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{self.field}__lte': end})
+        return queryset
+
+
+class TaskFilters:
+    """The task list query params, parsed and validated once per request.
+
+    Each filter in 'filters' is named after the query param it reads, or after the field of
+    a date range, and 'ordering' picks one of 'ordering_fields', prefixed with '-' for the
+    reverse order. Every task table has a '(user, field, id)' index for each ordering field,
+    so every combination of filters and ordering is served by an index scan without a sort,
+    see 'task.tests.test_query_plans'. Search results are ordered by rank instead.
+    """
+    filters = {
+        'is_completed': BooleanFilter(
+            'is_completed',
+            lambda now: Q(is_completed=True),
+            lambda now: Q(is_completed=False),
+        ),
+        'overdue': BooleanFilter(
+            'overdue',
+            lambda now: Q(is_completed=False, date_due__lt=now),
+            lambda now: Q(is_completed=True) | Q(date_due__gte=now) | Q(date_due__isnull=True),
+            # The next open task to fall due.
+            changes_at=lambda now: Min('date_due', filter=Q(is_completed=False, date_due__gte=now)),
+        ),
+        'date_due': RangeFilter('date_due', 'start_date', 'end_date'),
+        'date_created': RangeFilter('date_created', 'created_after', 'created_before'),
+        'date_completed': RangeFilter('date_completed', 'completed_after', 'completed_before'),
+    }
+    ordering_fields = ['date_due', 'date_created', 'date_completed']
+    ordering_param = 'ordering'
+    search_param = 'search'
+
+    def __init__(self, query_params, now=None):
+        """Parse the query params, raising ValidationError with every invalid one."""
+        self.now = now or timezone.now()
+        self.values = {}
+        errors = {}
+        for name, task_filter in self.filters.items():
+            if not any(param in query_params for param in task_filter.params):
+                continue
+            try:
+                self.values[name] = task_filter.parse(query_params)
+            except ValidationError as exc:
+                errors.update(exc.detail)
+
+        self.search = query_params.get(self.search_param)
+        self.ordering = query_params.get(self.ordering_param, DEFAULT_ORDERING)
+        if self.ordering.removeprefix('-') not in self.ordering_fields:
+            choices = ', '.join(self.ordering_fields)
+            errors[self.ordering_param] = [f'Expected one of {choices}, or one of them prefixed with "-".']
+        elif self.search and self.ordering_param in query_params:
+            errors[self.ordering_param] = ['Search results are ordered by rank.']
+        if errors:
+            raise ValidationError(errors)
+
+    def changes_at(self):
+        """Return the aggregates of the times the time dependent filters in use next change, by name."""
+        return {
+            f'{name}_changes_at': self.filters[name].changes_at(self.now)
+            for name in self.values
+            if getattr(self.filters[name], 'changes_at', None)
+        }
+
+    @property
+    def range_fields(self):
+        return [name for name, task_filter in self.filters.items() if isinstance(task_filter, RangeFilter)]
+
+    def filter(self, queryset):
+        """Filter and order a queryset of live or archived tasks."""
+        for name, value in self.values.items():
+            queryset = self.filters[name].apply(queryset, value, self.now)
+        queryset = order_list(queryset, self.ordering)
+        if self.search:
+            queryset = search_tasks(queryset, self.search)
+        return queryset
@@ -0,0 +1,218 @@
+"""
+Bulk import of tasks from NDJSON or CSV.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import Task, TaskStats
+from task.cache import task_list_cache
+from task.serializers import TaskDetailSerializer
+
+FORMATS = ('ndjson', 'csv')
+
+
+def decode_lines(stream):
+    """Yield text lines from an iterable of binary lines, such as an open file or upload.
+
+    Each line is decoded on its own, so a line that is not valid UTF-8 is reported by
+    'invalid_utf8' without ending the import. Its invalid bytes are kept as lone surrogates.
+    """
+    for index, line in enumerate(stream):
+        text = line.decode('utf-8', 'surrogateescape')
+        yield text.removeprefix('\ufeff') if index == 0 else text
+
+
+def invalid_utf8(text):
+    """Return whether text from 'decode_lines' came from bytes that are not valid UTF-8."""
+    try:
+        text.encode('utf-8')
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def parse_ndjson(stream):
+    """Yield (line number, record, error) for each line of a binary NDJSON stream."""
+    for line_number, line in enumerate(decode_lines(stream), start=1):
+        if not line.strip():
+            continue
+        if invalid_utf8(line):
+            yield line_number, None, {'non_field_errors': ['Invalid UTF-8.']}
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield line_number, record, None
+
+
+def parse_csv(stream):
+    """Yield (line number, record, error) for each row of a binary CSV stream with a header row.
+
+    Empty cells are left out of the record, so optional columns fall back to their defaults.
+    Rows the csv module rejects, such as those with a field over its size limit, are reported
+    with the last line of the row. A header row it rejects ends the import, as no row can be read.
+    """
+    reader = csv.reader(decode_lines(stream))
+    try:
+        header = next(reader, [])
+    except csv.Error as exc:
+        yield reader.line_num, None, {'non_field_errors': [f'Invalid CSV header: {exc}']}
+        return
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield reader.line_num, None, {'non_field_errors': [f'Invalid CSV: {exc}']}
+            continue
+        if not row:
+            continue
+        if any(invalid_utf8(value) for value in row):
+            yield reader.line_num, None, {'non_field_errors': ['Invalid UTF-8.']}
+            continue
+        yield reader.line_num, {key: value for key, value in zip(header, row) if key and value != ''}, None
+
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+def guess_format(filename):
+    """Return the import format for a file name, or None if its extension is not recognised."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return None
+
+
+class ImportResult:
+    """Summary of an import."""
+
+    def __init__(self, max_errors):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+def copy_tasks(tasks, using='default', **values):
+    """Write tasks, dicts of field name to value, with a single PostgreSQL 'COPY ... FROM STDIN'.
+
+    Rows are built straight from the values rather than through model instances, which is
+    most of the cost of 'bulk_create'. The values must be of the types psycopg2 would send,
+    whose 'str()' is what PostgreSQL expects in CSV. 'values' are used for fields missing
+    from a task, before the field defaults.
+    """
+    connection = connections[using]
+    fields = [field for field in Task._meta.concrete_fields if not field.primary_key]
+    now = timezone.now()
+    defaults = {}
+    for field in fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            defaults[field.name] = now
+        elif field.has_default():
+            defaults[field.name] = field.get_default()
+        else:
+            defaults[field.name] = None
+    defaults.update(values)
+    names = [field.name for field in fields]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    writer.writerows([attrs.get(name, defaults[name]) for name in names] for attrs in tasks)
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    # Every value is quoted, so quoted empty strings are turned back into NULL for nullable columns.
+    force_null = ', '.join(quote_name(field.column) for field in fields if field.null)
+    options = 'FORMAT csv' + (f', FORCE_NULL ({force_null})' if force_null else '')
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {quote_name(Task._meta.db_table)} ({columns}) FROM STDIN WITH ({options})', buffer)
+
+
+class TaskImporter:
+    """Validate and insert tasks for a user in batches.
+
+    Every record is validated with the same rules as 'TaskDetailSerializer'. Invalid
+    records are reported with their line number and skipped, while valid ones are written
+    one batch per transaction, with PostgreSQL 'COPY' or 'bulk_create'.
+    """
+
+    def __init__(self, user, batch_size=None, method='auto', max_errors=None, using='default'):
+        config = getattr(settings, 'TASK_IMPORT', {})
+        self.user = user
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 5000)
+        self.max_errors = config.get('MAX_ERRORS', 100) if max_errors is None else max_errors
+        self.using = using
+        if method == 'auto':
+            method = 'copy' if connections[using].vendor == 'postgresql' else 'orm'
+        if method == 'copy' and connections[using].vendor != 'postgresql':
+            raise ValueError('The "copy" method requires PostgreSQL.')
+        self.method = method
+        self.serializer = TaskDetailSerializer()
+
+    def run(self, stream, input_format):
+        """Import every record of a binary stream in the given format and return an 'ImportResult'."""
+        result = ImportResult(self.max_errors)
+        records = PARSERS[input_format](stream)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return result
+            self.import_batch(batch, result)
+
+    def import_batch(self, batch, result):
+        """Validate a batch of parsed records and write the valid ones."""
+        tasks = []
+        for line_number, record, error in batch:
+            if error is not None:
+                result.add_error(line_number, error)
+                continue
+            try:
+                attrs = self.serializer.run_validation(record)
+            except ValidationError as exc:
+                result.add_error(line_number, exc.detail)
+                continue
+            tasks.append(attrs)
+
+        if tasks:
+            completed = sum(1 for attrs in tasks if attrs.get('is_completed'))
+            with transaction.atomic(using=self.using):
+                if self.method == 'copy':
+                    self.copy(tasks)
+                else:
+                    Task.objects.using(self.using).bulk_create(Task(user=self.user, **attrs) for attrs in tasks)
+                TaskStats.objects.db_manager(self.using).adjust(
+                    self.user.pk,
+                    open_count=len(tasks) - completed,
+                    completed_count=completed,
+                )
+                task_list_cache.invalidate(self.user.pk, self.using)
+            result.created += len(tasks)
+
+    def copy(self, tasks):
+        """Write validated task attributes with a single PostgreSQL 'COPY ... FROM STDIN'."""
+        copy_tasks(tasks, using=self.using, user=self.user.pk)
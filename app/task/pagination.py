@@ -0,0 +1,308 @@
+"""
+Pagination for the task API.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, Q
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(payload):
+    """Return an opaque, url safe token for a JSON serializable payload."""
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the payload of a token created by 'encode_cursor', raising ValueError when malformed."""
+    padding = '=' * (-len(token) % 4)
+    try:
+        payload = json.loads(urlsafe_b64decode(token + padding))
+    except (TypeError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(str(exc))
+    if not isinstance(payload, dict):
+        raise ValueError('Cursor payload must be an object.')
+    return payload
+
+
+def seek_filter(queryset, field_name, operator, value, pk):
+    """Return a '(field, id) <operator> (value, pk)' row comparison, which the database can seek on."""
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    field = queryset.model._meta.get_field(field_name)
+    table = quote_name(queryset.model._meta.db_table)
+    sql = f'({table}.{quote_name(field.column)}, {table}.{quote_name("id")}) {operator} (%s, %s)'
+    params = (field.get_db_prep_value(value, connection), pk)
+    return RawSQL(sql, params, output_field=BooleanField())
+
+
+# Order of the task list when the client does not pick one.
+DEFAULT_ORDERING = 'date_due'
+
+
+def order_list(queryset, ordering=DEFAULT_ORDERING):
+    """Return a queryset in the list order: by 'ordering' then 'id', or by '(-rank, id)' for ranked search results.
+
+    'ordering' is a field name, ascending with nulls last, or the name prefixed with '-' for
+    the exact reverse, with nulls first. Both are scans of a '(user, field, id)' index.
+    """
+    if 'rank' in queryset.query.annotations:
+        return queryset.order_by('-rank', 'id')
+    field = ordering.lstrip('-')
+    if ordering.startswith('-'):
+        return queryset.order_by(F(field).desc(nulls_first=True), '-id')
+    return queryset.order_by(F(field).asc(nulls_last=True), 'id')
+
+
+def list_order_key(item, ranked=False, ordering=DEFAULT_ORDERING):
+    """Return the sort key of a task or a 'values()' row in the ascending list order.
+
+    That is '(field, id)' with nulls last, or '(-rank, id)' for ranked search results. For a
+    descending 'ordering', sort by the key in reverse.
+    """
+    def get(name):
+        return item[name] if isinstance(item, dict) else getattr(item, name)
+
+    if ranked:
+        return -get('rank'), get('id')
+    value = get(ordering.lstrip('-'))
+    return value is None, value or 0, get('id')
+
+
+class TaskKeysetPagination(BasePagination):
+    """Keyset (seek) pagination over the '(field, id)' list ordering, '(date_due, id)' by default.
+
+    Each page is fetched with a 'WHERE (field, id) > (last_value, last_id)' row
+    comparison instead of an OFFSET, so every page is an index range scan regardless of
+    how deep into the list the client is. Tasks with a null value are ordered last, matching
+    the default btree ordering on PostgreSQL, and first in the descending order, which is
+    its exact reverse and is paged through like going backwards in the ascending one. The
+    view picks the ordering with 'get_ordering'.
+
+    Search results annotated with a 'rank' are paginated over '(-rank, id)' instead, with
+    the same cursors. The rank is computed per row, so those pages are filtered rather
+    than seeked.
+
+    A 'CombinedQuerySet' of live and archived tasks is paged through one queryset at a
+    time, and the pages are merged, see 'task.archive'.
+
+    Pagination is opt-in: it only applies when the client sends a 'cursor' or a
+    'page_size' query parameter, otherwise the list endpoint is returned unpaginated.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = DEFAULT_ORDERING
+    rank_field = 'rank'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self):
+        config = getattr(settings, 'TASK_PAGINATION', {})
+        self.page_size = config.get('PAGE_SIZE', 100)
+        self.max_page_size = config.get('MAX_PAGE_SIZE', 1000)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results, or None if pagination is not requested."""
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if hasattr(view, 'get_ordering'):
+            self.ordering = view.get_ordering()
+        self.ranked = self.is_ranked(queryset)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+
+        querysets = getattr(queryset, 'querysets', [queryset])
+        results = []
+        for part in querysets:
+            results.extend(self.get_page(part))
+        if len(querysets) > 1:
+            # Pages are fetched in the order they are walked, which is reversed for descending orderings.
+            descending = self.ordering.startswith('-') and not self.ranked
+            results.sort(key=lambda item: list_order_key(item, self.ranked, self.ordering), reverse=self.reverse != descending)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        if self.reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_page(self, queryset):
+        """Return up to 'page_size' + 1 results of a queryset after the cursor, in page order."""
+        results = []
+        for page_queryset in self.get_page_querysets(queryset, self.cursor):
+            results.extend(page_queryset[:self.page_size + 1 - len(results)])
+            if len(results) > self.page_size:
+                break
+        return results
+
+    def get_page_querysets(self, queryset, cursor):
+        """Return the querysets that make up a page, in order.
+
+        Each queryset is a single ordered index range scan. Rows with a null value are
+        fetched by a separate query because a row comparison never matches NULL, and
+        combining both with OR would force the database to sort. That query is left out
+        for fields that are never null.
+        """
+        if self.is_ranked(queryset):
+            return self.get_ranked_page_querysets(queryset, cursor)
+
+        if cursor is None:
+            return [order_list(queryset, self.ordering)]
+
+        field = self.ordering.lstrip('-')
+        nullable = queryset.model._meta.get_field(field).null
+        value, pk = cursor['value'], cursor['id']
+        # Walking the descending order forwards is walking the ascending order backwards.
+        if cursor['reverse'] == self.ordering.startswith('-'):
+            undated = [queryset.filter(**{f'{field}__isnull': True}).order_by('id')] if nullable else []
+            if value is None:
+                return [undated[0].filter(id__gt=pk)] if nullable else []
+            return [queryset.filter(seek_filter(queryset, field, '>', value, pk)).order_by(field, 'id'), *undated]
+
+        dated = queryset.filter(**{f'{field}__isnull': False}).order_by(f'-{field}', '-id')
+        if value is None:
+            if not nullable:
+                return [dated]
+            return [
+                queryset.filter(**{f'{field}__isnull': True, 'id__lt': pk}).order_by('-id'),
+                dated,
+            ]
+        return [dated.filter(seek_filter(queryset, field, '<', value, pk))]
+
+    def get_ranked_page_querysets(self, queryset, cursor):
+        """Return the querysets that make up a page of ranked results, best match first."""
+        rank = self.rank_field
+        if cursor is None:
+            return [queryset.order_by(f'-{rank}', 'id')]
+        value, pk = cursor['value'], cursor['id']
+        if not cursor['reverse']:
+            after = Q(**{f'{rank}__lt': value}) | Q(**{rank: value, 'id__gt': pk})
+            return [queryset.filter(after).order_by(f'-{rank}', 'id')]
+        before = Q(**{f'{rank}__gt': value}) | Q(**{rank: value, 'id__lt': pk})
+        return [queryset.filter(before).order_by(rank, '-id')]
+
+    def is_ranked(self, queryset):
+        """Return whether a queryset holds ranked search results."""
+        return self.rank_field in queryset.query.annotations
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at 'max_page_size'."""
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return min(self.page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the cursor sent by the client, or None for the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if token is None:
+            return None
+        try:
+            payload = decode_cursor(token)
+            value = payload['v']
+            if self.ranked:
+                value = float(value)
+            elif value is not None:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError('Invalid cursor position.')
+            return {
+                'value': value,
+                'id': int(payload['i']),
+                'reverse': bool(payload.get('r', False)),
+            }
+        except (KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        """Return the url for the page after (or before, when reversed) 'item'."""
+        value = self.get_position(item)
+        payload = {
+            'v': value.isoformat() if isinstance(value, datetime) else value,
+            'i': item['id'] if isinstance(item, dict) else item.id,
+        }
+        if reverse:
+            payload['r'] = 1
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor(payload))
+
+    def get_position(self, item):
+        """Return the value of the ordering field for a model instance or a 'values()' row."""
+        field = self.rank_field if self.ranked else self.ordering.lstrip('-')
+        if isinstance(item, dict):
+            return item[field]
+        return getattr(item, field)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Paging backwards ran off the start of the list, restart from the first page.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor returned in "next" or "previous".',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (at most {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
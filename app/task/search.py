@@ -0,0 +1,51 @@
+"""
+Full-text search of tasks.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+# Text search configuration of the 'search_vector' trigger, see migration 'core.0005_task_search'.
+SEARCH_CONFIG = 'english'
+
+# Tokens are runs of letters and digits, which leaves out every tsquery operator.
+TERM_PATTERN = re.compile(r'[^\W_]+')
+
+
+def search_terms(text):
+    """Return the search terms in the text of a search box."""
+    return TERM_PATTERN.findall(text)
+
+
+def search_query(terms):
+    """Return a query matching tasks that contain every term, each as a word prefix."""
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_tasks(queryset, text):
+    """Filter tasks to those matching every term of a search, best match first.
+
+    On PostgreSQL matches come from the 'search_vector' GIN index, intersected with the
+    user's tasks from the '(user, date_due, id)' index, and are ranked with the title
+    weighted over the description, annotated as 'rank'. Other databases fall back to
+    unranked substring matching.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    if connections[queryset.db].vendor != 'postgresql':
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    query = search_query(terms)
+    return (
+        queryset.filter(search_vector=query)
+        # 'ts_rank' returns a 'real'. As a double it survives the round trip through a pagination cursor exactly.
+        .annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+        .order_by('-rank', 'id')
+    )
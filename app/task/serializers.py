@@ -1,11 +1,48 @@
 """
 Serializers for the user API view.
 """
+from django.db import transaction
 from django.utils import timezone
 
-from core.models import Task
+from core.models import Task, TaskStats
 
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """Serializer for creating and updating many tasks at once."""
+
+    def create(self, validated_data):
+        """Create and return tasks with a single bulk insert."""
+        tasks = [Task(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create(tasks)
+            TaskStats.objects.add_tasks(tasks)
+        return tasks
+
+    def update(self, instance, validated_data):
+        """Update and return tasks with a single bulk update.
+
+        'instance' is the list of tasks to update, in the same order as 'validated_data'.
+        """
+        fields = set()
+        now = timezone.now()
+        old_counters = []
+        for task, attrs in zip(instance, validated_data):
+            attrs = self.child.apply_completion(task, attrs)
+            old_counters.append(task.stats_counter)
+            for attr, value in attrs.items():
+                setattr(task, attr, value)
+            # 'bulk_update' does not run 'auto_now', so stamp the sync watermark column here.
+            task.updated_at = now
+            fields.update(attrs)
+        if fields:
+            fields.add('updated_at')
+            with transaction.atomic():
+                Task.objects.bulk_update(instance, fields)
+                TaskStats.objects.move_tasks(instance, old_counters)
+        return instance
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -15,23 +52,96 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = ['id', 'title', 'date_created', 'date_due', 'date_completed', 'is_completed']
         read_only_fields = ['id', 'date_created', 'date_completed']
+        list_serializer_class = TaskListSerializer
 
-    def update(self, instance, validated_data):
-        """Update and return task."""
+    def __init__(self, *args, fields=None, **kwargs):
+        """Render only the named 'fields' when given, see 'TaskViewSet.get_projection'."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                del self.fields[name]
+
+    def apply_completion(self, instance, validated_data):
+        """Return validated data with 'date_completed' set when 'is_completed' changes.
+
+        Completing a task stamps 'date_completed' with the current time, and reopening it clears it.
+        """
         is_completed = validated_data.pop('is_completed', instance.is_completed)
         if is_completed is True and instance.is_completed is False:
             validated_data['date_completed'] = timezone.now()
-            instance.is_completed = True
+            validated_data['is_completed'] = True
         if is_completed is False and instance.is_completed is True:
             validated_data['date_completed'] = None
-            instance.is_completed = False
+            validated_data['is_completed'] = False
+        return validated_data
+
+    def update(self, instance, validated_data):
+        """Update and return task."""
+        validated_data = self.apply_completion(instance, validated_data)
         task = super().update(instance, validated_data)
         return task
 
 
+class RowSerializer:
+    """Fast equivalent of a model serializer for rows fetched with 'values()'.
+
+    Skips the per-object field machinery of 'ModelSerializer' by converting each row with a
+    precompiled list of (name, source, converter) tuples. The output is identical to the
+    serializer it is built from, as long as every field reads a plain model column.
+    """
+
+    def __init__(self, serializer_class, **kwargs):
+        serializer = serializer_class(**kwargs)
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise ValueError(f'Field "{name}" does not read a single model column.')
+            self.fields.append((name, field.source, self.get_converter(field)))
+        self.sources = [source for _, source, _ in self.fields]
+
+    @staticmethod
+    def get_converter(field):
+        """Return the function converting a non-null column value to its representation."""
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if isinstance(field, serializers.DateTimeField) and output_format and output_format.lower() == ISO_8601:
+            field_timezone = getattr(field, 'timezone', field.default_timezone())
+            if field_timezone is not None:
+                # Same as 'DateTimeField.to_representation' for the aware datetimes the database returns.
+                def convert(value):
+                    value = value.astimezone(field_timezone).isoformat()
+                    if value.endswith('+00:00'):
+                        value = value[:-6] + 'Z'
+                    return value
+                return convert
+        return field.to_representation
+
+    def to_representation(self, row):
+        """Return the representation of a 'values()' row."""
+        return {
+            name: None if row[source] is None else convert(row[source])
+            for name, source, convert in self.fields
+        }
+
+    def many(self, rows):
+        """Return the representations of an iterable of 'values()' rows."""
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
 class TaskDetailSerializer(TaskSerializer):
     """Serializer for task detail view."""
 
     class Meta(TaskSerializer.Meta):
         fields = TaskSerializer.Meta.fields + ['description', 'date_completed', 'is_completed']
         read_only_fields = TaskSerializer.Meta.read_only_fields + []
+
+
+class TaskIdsSerializer(serializers.Serializer):
+    """Serializer for selecting tasks by id for a bulk operation."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+    )
@@ -0,0 +1,45 @@
+"""
+Per-user task statistics.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import Task, TaskStats
+
+
+def end_of_week(now):
+    """Return midnight at the end of the current week (Monday to Sunday) in the current timezone."""
+    today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=7 - today.weekday())
+
+
+def due_queryset(user, now):
+    """Return the user's open tasks due before the end of the week."""
+    return Task.objects.filter(user=user, is_completed=False, date_due__lt=end_of_week(now))
+
+
+def get_stats(user, now=None):
+    """Return the open, completed, overdue and due this week task counts of a user.
+
+    Open and completed come from the 'TaskStats' counters. Overdue and due this week
+    depend on the current time, so they are counted from the open tasks due before the end
+    of the week, a range of the 'task_user_open_due_idx' index rather than every task.
+    """
+    now = now or timezone.now()
+    try:
+        stats = TaskStats.objects.get(user=user)
+    except TaskStats.DoesNotExist:
+        stats = TaskStats(user=user, **TaskStats.objects.count([user.pk])[user.pk])
+
+    due = due_queryset(user, now).aggregate(
+        overdue=Count('id', filter=Q(date_due__lt=now)),
+        due_this_week=Count('id', filter=Q(date_due__gte=now)),
+    )
+    return {
+        'open': stats.open_count,
+        'completed': stats.completed_count,
+        'overdue': due['overdue'],
+        'due_this_week': due['due_this_week'],
+    }
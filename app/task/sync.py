@@ -0,0 +1,51 @@
+"""
+Delta sync of the tasks changed since a watermark.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from task.pagination import decode_cursor, encode_cursor, seek_filter
+
+
+def encode_watermark(task):
+    """Return the opaque watermark positioned just after a task."""
+    return encode_cursor({'t': task.updated_at.isoformat(), 'i': task.id})
+
+
+def decode_watermark(token):
+    """Return the (updated_at, id) position of a watermark, raising ValueError when malformed."""
+    payload = decode_cursor(token)
+    try:
+        updated_at = parse_datetime(payload['t'])
+        pk = int(payload['i'])
+    except (KeyError, TypeError) as exc:
+        raise ValueError(str(exc))
+    if updated_at is None:
+        raise ValueError('Invalid watermark position.')
+    return updated_at, pk
+
+
+def get_changes(queryset, watermark, limit):
+    """Return up to 'limit' tasks changed after the watermark, oldest change first, and whether more remain."""
+    tasks = list(changes_queryset(queryset, watermark)[:limit + 1])
+    return tasks[:limit], len(tasks) > limit
+
+
+def changes_queryset(queryset, watermark):
+    """Return the queryset of tasks changed after the watermark, in the order they changed.
+
+    The queryset must include deleted tasks so their tombstones are returned. Changes made in
+    the last 'TASK_SYNC["SETTLE_SECONDS"]' are held back: 'updated_at' is stamped before the
+    transaction commits, so a slow transaction could otherwise commit a change behind a
+    watermark that was already handed out.
+    """
+    settle_seconds = getattr(settings, 'TASK_SYNC', {}).get('SETTLE_SECONDS', 1)
+    if settle_seconds:
+        queryset = queryset.filter(updated_at__lt=timezone.now() - timedelta(seconds=settle_seconds))
+    if watermark is not None:
+        updated_at, pk = watermark
+        queryset = queryset.filter(seek_filter(queryset, 'updated_at', '>', updated_at, pk))
+    return queryset.order_by('updated_at', 'id')
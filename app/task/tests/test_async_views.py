@@ -0,0 +1,131 @@
+"""
+Test the async task API views.
+"""
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import AuthToken, Task
+from task.views import TaskViewSet
+
+ASYNC_TASK_URL = reverse('task:async-task-list')
+TASK_URL = reverse('task:task-list')
+
+
+def async_detail_url(task_id):
+    """Create and return an async task detail URL."""
+    return reverse('task:async-task-detail', args=[task_id])
+
+
+class TestAsyncTaskAPI(TransactionTestCase):
+    """Test the async views through the ASGI handler.
+
+    The views query the database from pool threads, which only see committed data, so these
+    tests run outside of a transaction.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.token = AuthToken.objects.create(user=self.user)
+        self.client = AsyncClient()
+        # 'AsyncClient' sends extra keyword arguments as headers.
+        self.headers = {'authorization': f'Token {self.token.key}'}
+
+    async def test_auth_required(self):
+        """Test authentication is required."""
+        res = await self.client.get(ASYNC_TASK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_list_matches_sync_view(self):
+        """Test the async list returns the same tasks as the sync view."""
+        other_user = await sync_to_async(get_user_model().objects.create_user)(email='other@example.com')
+        await sync_to_async(Task.objects.create)(user=self.user, title='Mine')
+        await sync_to_async(Task.objects.create)(user=other_user, title='Not mine')
+
+        res = await self.client.get(ASYNC_TASK_URL, **self.headers)
+        sync_res = await sync_to_async(self.sync_get)(TASK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, sync_res.content)
+        self.assertEqual([task['title'] for task in res.json()], ['Mine'])
+
+    async def test_list_is_paginated(self):
+        """Test the list accepts the same pagination params."""
+        for i in range(3):
+            await sync_to_async(Task.objects.create)(user=self.user, title=f'Task {i}')
+
+        res = await self.client.get(f'{ASYNC_TASK_URL}?page_size=2', **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 2)
+        self.assertIsNotNone(res.json()['next'])
+
+    async def test_create_task(self):
+        """Test creating a task."""
+        res = await self.client.post(ASYNC_TASK_URL, json.dumps({'title': 'New task'}), content_type='application/json', **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        task = await sync_to_async(Task.objects.get)(id=res.json()['id'])
+        self.assertEqual(task.title, 'New task')
+        self.assertEqual(task.user_id, self.user.id)
+
+    async def test_create_invalid_task(self):
+        """Test validation errors are returned."""
+        res = await self.client.post(ASYNC_TASK_URL, json.dumps({}), content_type='application/json', **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', res.json())
+
+    async def test_retrieve_task(self):
+        """Test retrieving a task, and that other users' tasks are not found."""
+        task = await sync_to_async(Task.objects.create)(user=self.user, title='Mine')
+        other_user = await sync_to_async(get_user_model().objects.create_user)(email='other@example.com')
+        other_task = await sync_to_async(Task.objects.create)(user=other_user, title='Not mine')
+
+        res = await self.client.get(async_detail_url(task.id), **self.headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['title'], 'Mine')
+
+        res = await self.client.get(async_detail_url(other_task.id), **self.headers)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_method_not_allowed(self):
+        """Test only the list, create and retrieve actions are served."""
+        res = await self.client.delete(ASYNC_TASK_URL, **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True})
+    async def test_requests_run_concurrently(self):
+        """Test slow requests overlap with request profiling on, and their queries are still counted."""
+        def slow_list(view, request, *args, **kwargs):
+            time.sleep(0.5)
+            return Response([])
+
+        with patch.object(TaskViewSet, 'list', slow_list):
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(AsyncClient().get(ASYNC_TASK_URL, **self.headers) for _ in range(4)))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual([res.status_code for res in responses], [status.HTTP_200_OK] * 4)
+        self.assertLess(elapsed, 1.5)
+        self.assertIn('desc="1 queries"', responses[0]['Server-Timing'])
+
+    def sync_get(self, url):
+        """GET a url from the sync view with the test user's token."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client.get(url)
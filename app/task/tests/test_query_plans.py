@@ -0,0 +1,181 @@
+"""
+Test the task list queries are served by indexes.
+"""
+import itertools
+import unittest
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import ArchivedTask, Task
+from task.filters import TaskFilters
+from task.importer import copy_tasks
+from task.pagination import TaskKeysetPagination
+from task.stats import due_queryset
+from task.sync import changes_queryset
+from task.views import TaskViewSet
+
+# Users seeded with 2000 tasks and 200 archived tasks each. Each user is a small share of the
+# tables, as in production, so the planner's default choice for a user's query is an index.
+USERS = 50
+
+# Plan nodes that mean the database read the whole table or sorted rows instead of using an index.
+FORBIDDEN_NODES = {'Seq Scan', 'Sort', 'Incremental Sort'}
+
+BOOLEAN_PARAMS = [{}, {'is_completed': 'true'}, {'is_completed': 'false'}, {'overdue': 'true'}, {'overdue': 'false'}]
+
+ORDERING_PARAMS = [{}] + [{'ordering': f'{prefix}{field}'} for field in TaskFilters.ordering_fields for prefix in ('', '-')]
+
+
+def plan_nodes(plan):
+    """Yield every node of an 'EXPLAIN (FORMAT JSON)' plan."""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(queryset):
+    """Return the root node of the query plan for a queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        # Sorting a user's few thousand tasks is often cheaper than reading them in index order, so
+        # sorts are penalised to check an index gives the list order. Sequential scans are not: the
+        # seeded tables are large enough that the planner only picks one when no index fits.
+        cursor.execute('SET LOCAL enable_sort = off')
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        return cursor.fetchone()[0][0]['Plan']
+
+
+def list_querysets(user, params):
+    """Return the querysets 'TaskViewSet' reads for a list request with the given query params.
+
+    That is the live tasks, and the archived tasks when the filters may match them.
+    """
+    request = Request(APIRequestFactory().get('/api/task/', params))
+    request.user = user
+    view = TaskViewSet(request=request, format_kwarg=None, action='list')
+    queryset = view.get_queryset()
+    return getattr(queryset, 'querysets', [queryset])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL.')
+class TestTaskQueryPlans(TestCase):
+    """Test every supported task filter and ordering combination avoids sequential scans and sorts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'user{i}@example.com') for i in range(USERS)
+        )
+        copy_tasks(
+            {
+                'user': user.pk,
+                'title': f'Task {i}',
+                'date_due': None if i % 10 == 0 else now + timedelta(hours=i - 500),
+                'is_completed': i % 3 == 0,
+                'date_completed': now - timedelta(hours=i) if i % 3 == 0 else None,
+            }
+            # Interleaved, as users write tasks over time, so no user's rows are stored together.
+            for i in range(2000)
+            for user in cls.users
+        )
+        ArchivedTask.objects.bulk_create(
+            ArchivedTask(user=user, title=f'Archived {i}', date_due=now - timedelta(days=i), is_completed=True, date_completed=now)
+            for i in range(200)
+            for user in cls.users
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_task')
+            cursor.execute('ANALYZE core_archivedtask')
+        cls.now = now
+
+    def filter_combinations(self, orderings=ORDERING_PARAMS, every_range=True):
+        """Yield every supported combination of list filters, with each ordering.
+
+        Without 'every_range', the date ranges are either all left out or all set.
+        """
+        recent, old = (self.now - timedelta(days=2)).isoformat(), (self.now - timedelta(days=365)).isoformat()
+        due_ranges = [
+            {},
+            {'start_date': recent, 'end_date': (self.now + timedelta(days=2)).isoformat()},
+            {'start_date': old, 'end_date': self.now.isoformat()},
+            {'start_date': recent},
+            {'end_date': recent},
+        ]
+        created_ranges = [{}, {'created_after': old}, {'created_after': old, 'created_before': recent}]
+        completed_ranges = [{}, {'completed_before': recent}, {'completed_after': old, 'completed_before': recent}]
+        date_ranges = list(itertools.product(due_ranges, created_ranges, completed_ranges))
+        if not every_range:
+            date_ranges = [date_ranges[0], date_ranges[-1]]
+        for params in itertools.product(BOOLEAN_PARAMS, date_ranges, orderings):
+            params = [params[0], *params[1], params[2]]
+            yield {key: value for param in params for key, value in param.items()}
+
+    def assertIndexPlan(self, queryset, params):
+        """Assert the plan for a queryset contains no sequential scan or sort."""
+        plan = explain(queryset)
+        node_types = [node['Node Type'] for node in plan_nodes(plan)]
+        self.assertFalse(
+            FORBIDDEN_NODES.intersection(node_types),
+            f'Query for {params} is not served by an index: {node_types}\n{queryset.query}',
+        )
+
+    def test_list_query_plans(self):
+        """Test the unpaginated list query for each filter and ordering combination."""
+        user = self.users[2]
+        for params in self.filter_combinations():
+            with self.subTest(params=params):
+                for queryset in list_querysets(user, params):
+                    self.assertIndexPlan(queryset, params)
+
+    def test_paginated_query_plans(self):
+        """Test the first page and a cursor page, in both directions, for each ordering and the filters.
+
+        The seek conditions only depend on the ordering, so the date ranges are only checked
+        all left out and all set.
+        """
+        user = self.users[2]
+        paginator = TaskKeysetPagination()
+        cursors = [
+            None,
+            {'value': self.now, 'id': 100, 'reverse': False},
+            {'value': self.now, 'id': 100, 'reverse': True},
+            {'value': None, 'id': 100, 'reverse': False},
+            {'value': None, 'id': 100, 'reverse': True},
+        ]
+        for params, cursor in itertools.product(self.filter_combinations(every_range=False), cursors):
+            with self.subTest(params=params, cursor=cursor):
+                paginator.ordering = TaskFilters(params).ordering
+                for list_queryset in list_querysets(user, params):
+                    for queryset in paginator.get_page_querysets(list_queryset, cursor):
+                        self.assertIndexPlan(queryset[:paginator.page_size + 1], params)
+
+    def test_sync_query_plans(self):
+        """Test the delta sync query with and without a watermark."""
+        queryset = Task.all_objects.filter(user=self.users[2])
+        for watermark in [None, (self.now, 100)]:
+            with self.subTest(watermark=watermark):
+                self.assertIndexPlan(changes_queryset(queryset, watermark)[:501], {'since': watermark})
+
+    def test_stats_query_plan(self):
+        """Test the overdue and due this week counts only read the open tasks due before the end of the week."""
+        self.assertIndexPlan(due_queryset(self.users[2], self.now), {'stats': True})
+
+    def test_search_query_plan(self):
+        """Test searching reads the user's matching tasks through an index.
+
+        At this table size the user's index is cheaper than the search index, which is only
+        picked for larger accounts, so the test does not pin which index is used.
+        """
+        user = self.users[2]
+        for params in self.filter_combinations(orderings=[{}]):
+            with self.subTest(params=params):
+                for queryset in list_querysets(user, {**params, 'search': 'quarter'}):
+                    plan = explain(queryset)
+                    self.assertNotIn('Seq Scan', [node['Node Type'] for node in plan_nodes(plan)])
@@ -1,15 +1,43 @@
 """
 Test task API.
 """
+import csv
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import timedelta
+from io import BytesIO, StringIO
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from core.models import Task
+from core.models import ArchivedTask, Task, TaskStats
+from core.routers import replicas
+from task.archive import archive_is_reachable, archive_may_match
+from task.cache import task_list_cache
+from task.filters import TaskFilters
+from task.importer import TaskImporter
 from task.serializers import TaskDetailSerializer, TaskSerializer
 
 TASK_URL = reverse('task:task-list')
+BULK_URL = reverse('task:task-bulk-create')
+BULK_COMPLETE_URL = reverse('task:task-bulk-complete')
+BULK_UNCOMPLETE_URL = reverse('task:task-bulk-uncomplete')
+SYNC_URL = reverse('task:task-sync')
+EXPORT_URL = reverse('task:task-export')
+IMPORT_URL = reverse('task:task-import-tasks')
+STATS_URL = reverse('task:task-stats')
 
 
 def create_task(user, **params):
@@ -96,3 +124,1264 @@ class TestPrivateTaskAPI(TestCase):
         for k, v in payload.items():
             self.assertEqual(getattr(task, k), v)
         self.assertEqual(task.user, self.user)
+
+
+class TestTaskPagination(TestCase):
+    """Test keyset pagination of the task list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # Several tasks share a due date and some have none, to exercise the tie breaker on 'id'.
+        for days in [3, 1, 2, 1, 1, None, 5, None, 4, 2]:
+            create_task(user=self.user, date_due=None if days is None else now + timedelta(days=days))
+        self.expected_ids = [
+            task.id for task in sorted(
+                Task.objects.filter(user=self.user),
+                key=lambda task: (task.date_due is None, task.date_due or now, task.id),
+            )
+        ]
+
+    def test_list_is_unpaginated_by_default(self):
+        """Test the list is returned as a plain list without pagination parameters."""
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), len(self.expected_ids))
+
+    def test_walk_pages_forward_and_back(self):
+        """Test following 'next' visits every task once in order, and 'previous' walks back."""
+        pages = []
+        res = self.client.get(TASK_URL, {'page_size': 3})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([task['id'] for task in res.data['results']])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual([task_id for page in pages for task_id in page], self.expected_ids)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+
+        for page in reversed(pages[:-1]):
+            res = self.client.get(res.data['previous'])
+            self.assertEqual([task['id'] for task in res.data['results']], page)
+        self.assertIsNone(res.data['previous'])
+
+    def test_page_size_is_capped(self):
+        """Test the page size cannot exceed the configured maximum."""
+        with self.settings(TASK_PAGINATION={'PAGE_SIZE': 2, 'MAX_PAGE_SIZE': 4}):
+            res = self.client.get(TASK_URL, {'page_size': 50})
+            self.assertEqual(len(res.data['results']), 4)
+
+            res = self.client.get(TASK_URL, {'page_size': 'all'})
+            self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns a 404."""
+        res = self.client.get(TASK_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestBulkTaskAPI(TestCase):
+    """Test the bulk task endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating many tasks in one request."""
+        payload = [{'title': f'Task {i}', 'description': f'Description {i}'} for i in range(5)]
+
+        # Savepoint, insert, counters update and release.
+        with self.assertNumQueries(4):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tasks = Task.objects.filter(user=self.user).order_by('title')
+        self.assertEqual([(task.title, task.description) for task in tasks], [(p['title'], p['description']) for p in payload])
+
+    def test_bulk_create_validates_every_item(self):
+        """Test no tasks are created when any item is invalid."""
+        payload = [{'title': 'Valid'}, {'description': 'Missing a title'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_create_limited_in_size(self):
+        """Test bulk requests larger than the limit are rejected."""
+        with self.settings(TASK_BULK_MAX_ITEMS=2):
+            res = self.client.post(BULK_URL, [{'title': 'Task'}] * 3, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update(self):
+        """Test updating many tasks in one request sets 'date_completed' like a single update."""
+        task1 = create_task(user=self.user, title='First')
+        task2 = create_task(user=self.user, title='Second')
+        payload = [
+            {'id': task1.id, 'title': 'First updated'},
+            {'id': task2.id, 'is_completed': True},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        task1.refresh_from_db()
+        task2.refresh_from_db()
+        self.assertEqual(task1.title, 'First updated')
+        self.assertFalse(task1.is_completed)
+        self.assertIsNone(task1.date_completed)
+        self.assertEqual(task2.title, 'Second')
+        self.assertTrue(task2.is_completed)
+        self.assertIsNotNone(task2.date_completed)
+        self.assertEqual([task['id'] for task in res.data], [task1.id, task2.id])
+
+    def test_bulk_update_other_users_task(self):
+        """Test tasks of other users cannot be updated."""
+        other_user = get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        task = create_task(user=other_user, title='Theirs')
+
+        res = self.client.patch(BULK_URL, [{'id': task.id, 'title': 'Mine'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        task.refresh_from_db()
+        self.assertEqual(task.title, 'Theirs')
+
+    def test_bulk_complete_by_ids(self):
+        """Test completing tasks by id only touches the selected open tasks."""
+        done_at = timezone.now() - timedelta(days=1)
+        done = create_task(user=self.user, is_completed=True, date_completed=done_at)
+        selected = create_task(user=self.user)
+        unselected = create_task(user=self.user)
+
+        # Savepoint, update, counters update and release.
+        with self.assertNumQueries(4):
+            res = self.client.post(BULK_COMPLETE_URL, {'ids': [done.id, selected.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 1})
+        done.refresh_from_db()
+        selected.refresh_from_db()
+        unselected.refresh_from_db()
+        self.assertEqual(done.date_completed, done_at)
+        self.assertTrue(selected.is_completed)
+        self.assertIsNotNone(selected.date_completed)
+        self.assertFalse(unselected.is_completed)
+
+    def test_bulk_complete_by_filter(self):
+        """Test completing every task matching the list filters."""
+        now = timezone.now()
+        in_range = create_task(user=self.user, date_due=now + timedelta(days=1))
+        out_of_range = create_task(user=self.user, date_due=now + timedelta(days=10))
+        other_user = get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        other_task = create_task(user=other_user, date_due=now + timedelta(days=1))
+        params = {'start_date': now.isoformat(), 'end_date': (now + timedelta(days=2)).isoformat()}
+
+        res = self.client.post(f'{BULK_COMPLETE_URL}?{urlencode(params)}', {}, format='json')
+
+        self.assertEqual(res.data, {'updated': 1})
+        self.assertTrue(Task.objects.get(id=in_range.id).is_completed)
+        self.assertFalse(Task.objects.get(id=out_of_range.id).is_completed)
+        self.assertFalse(Task.objects.get(id=other_task.id).is_completed)
+
+    def test_bulk_uncomplete(self):
+        """Test reopening tasks clears 'date_completed'."""
+        task = create_task(user=self.user, is_completed=True, date_completed=timezone.now())
+
+        res = self.client.post(BULK_UNCOMPLETE_URL, {'ids': [task.id]}, format='json')
+
+        self.assertEqual(res.data, {'updated': 1})
+        task.refresh_from_db()
+        self.assertFalse(task.is_completed)
+        self.assertIsNone(task.date_completed)
+
+
+@override_settings(TASK_SYNC={'PAGE_SIZE': 500, 'MAX_PAGE_SIZE': 5000, 'SETTLE_SECONDS': 0})
+class TestTaskSync(TestCase):
+    """Test the delta sync endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+
+    def test_initial_sync_returns_every_task(self):
+        """Test a sync without a watermark returns all of the user's tasks."""
+        tasks = [create_task(user=self.user, title=f'Task {i}') for i in range(3)]
+        other_user = get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        create_task(user=other_user)
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], TaskDetailSerializer(tasks, many=True).data)
+        self.assertEqual(res.data['deleted'], [])
+        self.assertFalse(res.data['has_more'])
+        self.assertIsNotNone(res.data['watermark'])
+
+    def test_sync_returns_changes_since_watermark(self):
+        """Test only tasks changed after the watermark are returned, including deletions."""
+        unchanged = create_task(user=self.user, title='Unchanged')
+        updated = create_task(user=self.user, title='Updated')
+        deleted = create_task(user=self.user, title='Deleted')
+        watermark = self.client.get(SYNC_URL).data['watermark']
+
+        self.client.patch(detail_url(updated.id), {'title': 'Updated again'})
+        self.client.delete(detail_url(deleted.id))
+        created = create_task(user=self.user, title='Created')
+
+        res = self.client.get(SYNC_URL, {'since': watermark})
+
+        self.assertEqual([task['title'] for task in res.data['results']], ['Updated again', 'Created'])
+        self.assertEqual(res.data['deleted'], [deleted.id])
+        self.assertNotIn(unchanged.id, [task['id'] for task in res.data['results']])
+
+        res = self.client.get(SYNC_URL, {'since': res.data['watermark']})
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(res.data['deleted'], [])
+        self.assertEqual(Task.objects.get(id=created.id).title, 'Created')
+
+    def test_sync_in_batches(self):
+        """Test 'limit' splits the changes into batches that follow on from each other."""
+        tasks = [create_task(user=self.user, title=f'Task {i}') for i in range(5)]
+
+        first = self.client.get(SYNC_URL, {'limit': 3}).data
+        second = self.client.get(SYNC_URL, {'limit': 3, 'since': first['watermark']}).data
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        synced = [task['id'] for task in first['results'] + second['results']]
+        self.assertEqual(synced, [task.id for task in tasks])
+
+    def test_bulk_complete_is_synced(self):
+        """Test tasks changed with a bulk update are picked up by sync."""
+        task = create_task(user=self.user)
+        watermark = self.client.get(SYNC_URL).data['watermark']
+
+        self.client.post(BULK_COMPLETE_URL, {'ids': [task.id]}, format='json')
+        res = self.client.get(SYNC_URL, {'since': watermark})
+
+        self.assertEqual([task['id'] for task in res.data['results']], [task.id])
+        self.assertTrue(res.data['results'][0]['is_completed'])
+
+    def test_invalid_watermark(self):
+        """Test a malformed watermark is rejected."""
+        res = self.client.get(SYNC_URL, {'since': 'garbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_leaves_tombstone(self):
+        """Test deleting a task hides it from the API but keeps the row, without its content."""
+        task = create_task(user=self.user)
+
+        res = self.client.delete(detail_url(task.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+        tombstone = Task.all_objects.get(id=task.id)
+        self.assertIsNotNone(tombstone.date_deleted)
+        self.assertEqual((tombstone.title, tombstone.description), ('', ''))
+        self.assertEqual(self.client.get(detail_url(task.id)).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestConditionalGet(TestCase):
+    """Test ETag and Last-Modified handling on the task list and detail."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        self.task = create_task(user=self.user)
+
+    def test_list_not_modified(self):
+        """Test the list answers 304 with a single query when the ETag matches."""
+        res = self.client.get(TASK_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TASK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_list_etag_changes(self):
+        """Test creating, updating and deleting tasks each change the list ETag."""
+        etags = [self.client.get(TASK_URL)['ETag']]
+        other = create_task(user=self.user)
+        etags.append(self.client.get(TASK_URL)['ETag'])
+        self.client.patch(detail_url(self.task.id), {'title': 'Changed'})
+        etags.append(self.client.get(TASK_URL)['ETag'])
+        self.client.delete(detail_url(other.id))
+        etags.append(self.client.get(TASK_URL)['ETag'])
+        etags.append(self.client.get(TASK_URL, {'is_completed': 'false'})['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+        res = self.client.get(TASK_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_not_affected_by_other_users(self):
+        """Test changes to another user's tasks do not change the ETag."""
+        etag = self.client.get(TASK_URL)['ETag']
+        other_user = get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        create_task(user=other_user)
+
+        res = self.client.get(TASK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_if_modified_since(self):
+        """Test the list answers 304 to 'If-Modified-Since' once the last change is old enough."""
+        Task.all_objects.filter(id=self.task.id).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        res = self.client.get(TASK_URL)
+        self.assertIn('Last-Modified', res)
+
+        res = self.client.get(TASK_URL, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recent_change_has_no_last_modified(self):
+        """Test 'Last-Modified' is left out while a change in the same second could still follow."""
+        res = self.client.get(TASK_URL)
+
+        self.assertNotIn('Last-Modified', res)
+
+    def test_detail_not_modified(self):
+        """Test the detail answers 304 until the task changes."""
+        url = detail_url(self.task.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Changed')
+        self.assertNotEqual(res['ETag'], etag)
+
+
+class TestTaskExport(TestCase):
+    """Test the streaming task export."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.tasks = [
+            create_task(user=self.user, title=f'Task {i}', date_due=now + timedelta(days=i), is_completed=i % 2 == 0)
+            for i in range(4)
+        ]
+        other_user = get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        create_task(user=other_user)
+
+    def expected(self, tasks):
+        """Return the tasks as the API would serialize them, decoded from JSON."""
+        return json.loads(JSONRenderer().render(TaskDetailSerializer(tasks, many=True).data))
+
+    def test_export_ndjson(self):
+        """Test the export streams one JSON object per line by default."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected(self.tasks))
+
+    def test_export_json_array(self):
+        """Test the export can be a single JSON array."""
+        res = self.client.get(EXPORT_URL, {'format': 'json'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), self.expected(self.tasks))
+
+    def test_export_empty_json_array(self):
+        """Test exporting no tasks still produces valid JSON."""
+        res = self.client.get(EXPORT_URL, {'format': 'json', 'is_completed': 'true', 'start_date': '2000-01-01', 'end_date': '2000-01-02'})
+
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), [])
+
+    def test_export_without_server_side_cursors(self):
+        """Test the export fetches chunks of tasks by key in order when server-side cursors are disabled."""
+        with patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            with override_settings(TASK_EXPORT_CHUNK_SIZE=3), CaptureQueriesContext(connection) as queries:
+                res = self.client.get(EXPORT_URL)
+                lines = b''.join(res.streaming_content).decode('utf-8').splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], self.expected(self.tasks))
+        # The keys of the live and of the (empty) archived tasks, then two chunks of live tasks.
+        self.assertEqual(len(queries), 4)
+
+    def test_export_applies_filters(self):
+        """Test the list filters also apply to the export."""
+        res = self.client.get(EXPORT_URL, {'is_completed': 'true'})
+
+        lines = b''.join(res.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected(self.tasks[::2]))
+
+    def test_export_command(self):
+        """Test the management command writes the same NDJSON."""
+        out = StringIO()
+
+        call_command('export_tasks', user=self.user.email, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected(self.tasks))
+
+    def test_export_command_all_users(self):
+        """Test exporting every user's tasks identifies the owner of each."""
+        out = StringIO()
+
+        call_command('export_tasks', '--all', '--format', 'json', stdout=out)
+
+        exported = json.loads(out.getvalue())
+        self.assertEqual(len(exported), Task.objects.count())
+        self.assertEqual({task['user'] for task in exported}, set(Task.objects.values_list('user', flat=True)))
+
+
+class TestTaskImport(TestCase):
+    """Test the bulk task import."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Test valid rows are imported and invalid rows are reported by line."""
+        content = b'\n'.join([
+            b'{"title": "First", "description": "Caf\xc3\xa9", "date_due": "2022-10-23T00:00:00Z"}',
+            b'{"description": "No title"}',
+            b'',
+            b'not json',
+            b'{"title": "Second", "is_completed": true}',
+        ])
+
+        res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile('tasks.ndjson', content)}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual([error['line'] for error in res.data['errors']], [2, 4])
+        self.assertIn('title', res.data['errors'][0]['errors'])
+        first = Task.objects.get(title='First')
+        self.assertEqual(first.user, self.user)
+        self.assertEqual(first.description, 'Café')
+        self.assertEqual(first.date_due.isoformat(), '2022-10-23T00:00:00+00:00')
+        self.assertTrue(Task.objects.get(title='Second').is_completed)
+
+    def test_import_csv(self):
+        """Test importing CSV, where empty cells use the field defaults."""
+        content = (
+            'title,description,date_due,is_completed\n'
+            'First,"Multi\nline",2022-10-23T00:00:00Z,false\n'
+            'Second,,,true\n'
+            ',Missing title,,\n'
+        ).encode('utf-8')
+
+        res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile('tasks.csv', content)}, format='multipart')
+
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual([error['line'] for error in res.data['errors']], [5])
+        self.assertEqual(Task.objects.get(title='First').description, 'Multi\nline')
+        second = Task.objects.get(title='Second')
+        self.assertEqual(second.description, '')
+        self.assertIsNone(second.date_due)
+        self.assertTrue(second.is_completed)
+
+    def test_import_invalid_utf8(self):
+        """Test lines that are not valid UTF-8 are reported without ending the import."""
+        ndjson = b'{"title": "First"}\n{"title": "Caf\xe9"}\n{"title": "Second"}\n'
+        csv_content = b'title,description\nFirst,\nCaf\xe9,\nSecond,\n'
+
+        for name, content, line in [('tasks.ndjson', ndjson, 2), ('tasks.csv', csv_content, 3)]:
+            with self.subTest(name):
+                Task.objects.all().delete()
+
+                res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.data['created'], 2)
+                self.assertEqual(res.data['errors'], [{'line': line, 'errors': {'non_field_errors': ['Invalid UTF-8.']}}])
+                self.assertCountEqual(Task.objects.values_list('title', flat=True), ['First', 'Second'])
+
+    def test_import_csv_field_over_limit(self):
+        """Test a row with a field over the csv module's size limit is reported without ending the import."""
+        content = f'title,description\nFirst,\nLong,{"x" * (csv.field_size_limit() + 1)}\nSecond,\n'.encode('utf-8')
+
+        res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile('tasks.csv', content)}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual([error['line'] for error in res.data['errors']], [3])
+        self.assertIn('field larger than field limit', res.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertCountEqual(Task.objects.values_list('title', flat=True), ['First', 'Second'])
+
+    def test_import_unknown_format(self):
+        """Test a file of unknown format is rejected."""
+        res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile('tasks.txt', b'')}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command(self):
+        """Test the management command imports in batches."""
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as source:
+            source.write(b''.join(b'{"title": "Task %d"}\n' % i for i in range(7)))
+            source.flush()
+
+            call_command('import_tasks', source.name, user=self.user.email, batch_size=3, method='orm', stdout=StringIO())
+
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 7)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY is only available on PostgreSQL.')
+    def test_import_with_copy(self):
+        """Test importing with COPY writes the same values as the ORM."""
+        content = b'\n'.join([
+            b'{"title": "Quoted \\"title\\", with comma", "description": ""}',
+            b'{"title": "Due", "description": "Line\\nbreak", "date_due": "2022-10-23T00:00:00Z", "is_completed": true}',
+        ])
+
+        result = TaskImporter(self.user, method='copy').run(BytesIO(content), 'ndjson')
+
+        self.assertEqual(result.created, 2)
+        quoted = Task.objects.get(title='Quoted "title", with comma')
+        self.assertEqual(quoted.description, '')
+        self.assertIsNone(quoted.date_due)
+        self.assertIsNone(quoted.date_completed)
+        self.assertIsNotNone(quoted.date_created)
+        self.assertIsNotNone(quoted.updated_at)
+        due = Task.objects.get(title='Due')
+        self.assertEqual(due.description, 'Line\nbreak')
+        self.assertEqual(due.date_due.isoformat(), '2022-10-23T00:00:00+00:00')
+        self.assertTrue(due.is_completed)
+
+
+class TestFastListSerialization(TestCase):
+    """Test the fast list serialization path matches 'TaskSerializer'."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        create_task(user=self.user, title='No due date')
+        create_task(user=self.user, title='Ünïcode "quoted"', date_due=now + timedelta(days=1))
+        create_task(user=self.user, title='Completed', date_due=now.replace(microsecond=0), is_completed=True, date_completed=now)
+
+    def get_content(self, fast, params=None):
+        """Return the raw list response body with the fast path on or off."""
+        with self.settings(TASK_FAST_LIST_SERIALIZATION=fast):
+            res = self.client.get(TASK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.content
+
+    def test_output_is_identical(self):
+        """Test both paths produce byte identical responses."""
+        self.assertEqual(self.get_content(fast=True), self.get_content(fast=False))
+
+    def test_paginated_output_is_identical(self):
+        """Test both paths produce byte identical pages."""
+        self.assertEqual(self.get_content(fast=True, params={'page_size': 2}), self.get_content(fast=False, params={'page_size': 2}))
+
+    def test_output_is_identical_in_other_timezone(self):
+        """Test datetimes are converted to the current timezone like 'DateTimeField' does."""
+        with timezone.override('America/New_York'):
+            self.assertEqual(self.get_content(fast=True), self.get_content(fast=False))
+
+
+class TestTaskStats(TestCase):
+    """Test the task statistics endpoint and that every write path keeps the counters in step."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+
+    def assertCountersMatchTasks(self):
+        """Assert the stored counters equal the counts computed from the tasks."""
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual(
+            {'open_count': stats.open_count, 'completed_count': stats.completed_count},
+            TaskStats.objects.count([self.user.id])[self.user.id],
+        )
+
+    def test_stats(self):
+        """Test the counts, and that other users' tasks are not included."""
+        now = timezone.now()
+        week_end = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        week_end += timedelta(days=7 - week_end.weekday())
+        create_task(user=self.user, date_due=now - timedelta(days=1))
+        create_task(user=self.user, date_due=now + (week_end - now) / 2)
+        create_task(user=self.user, date_due=week_end + timedelta(days=1))
+        create_task(user=self.user)
+        create_task(user=self.user, is_completed=True, date_due=now - timedelta(days=1))
+        create_task(user=self.user).soft_delete()
+        other_user = get_user_model().objects.create_user(email='other@example.com')
+        create_task(user=other_user, date_due=now - timedelta(days=1))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'open': 4, 'completed': 1, 'overdue': 1, 'due_this_week': 1})
+
+    def test_bulk_writes_update_counters(self):
+        """Test the bulk endpoints keep the counters in step with the tasks."""
+        self.client.post(BULK_URL, [{'title': 'One'}, {'title': 'Two', 'is_completed': True}, {'title': 'Three'}], format='json')
+        # SQLite does not return the ids of bulk inserted rows.
+        ids = [Task.objects.get(title=title).id for title in ('One', 'Two', 'Three')]
+        self.assertCountersMatchTasks()
+
+        self.client.patch(BULK_URL, [{'id': ids[0], 'is_completed': True}, {'id': ids[1], 'is_completed': False}], format='json')
+        self.assertCountersMatchTasks()
+
+        self.client.post(BULK_COMPLETE_URL, {}, format='json')
+        self.assertCountersMatchTasks()
+        self.assertEqual(self.client.get(STATS_URL).data['completed'], 3)
+
+        self.client.post(BULK_UNCOMPLETE_URL, {'ids': ids[:2]}, format='json')
+        self.assertCountersMatchTasks()
+
+        self.client.delete(detail_url(ids[2]))
+        self.assertCountersMatchTasks()
+        self.assertEqual(self.client.get(STATS_URL).data['open'], 2)
+
+    def test_import_updates_counters(self):
+        """Test imported tasks are counted."""
+        upload = SimpleUploadedFile('tasks.ndjson', b'{"title": "One"}\n{"title": "Two", "is_completed": true}\n')
+
+        self.client.post(IMPORT_URL, {'file': upload}, format='multipart')
+
+        self.assertCountersMatchTasks()
+        self.assertEqual(self.client.get(STATS_URL).data['completed'], 1)
+
+
+class TestTaskSearch(TestCase):
+    """Test full-text search of tasks."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+
+    def search(self, params):
+        """Return the titles of the tasks found for the given query params."""
+        res = self.client.get(TASK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results'] if 'results' in res.data else res.data
+        return [task['title'] for task in results]
+
+    def test_search_matches_prefixes_of_every_term(self):
+        """Test tasks match when every term is a word prefix in the title or description."""
+        create_task(user=self.user, title='Walk the dog', description='Around the park.')
+        create_task(user=self.user, title='Buy groceries', description='Dog food and milk.')
+        create_task(user=self.user, title='Water the plants', description='')
+
+        self.assertEqual(sorted(self.search({'search': 'dog'})), ['Buy groceries', 'Walk the dog'])
+        self.assertEqual(self.search({'search': 'wal par'}), ['Walk the dog'])
+        self.assertEqual(self.search({'search': 'dog, milk!'}), ['Buy groceries'])
+        self.assertEqual(self.search({'search': 'cat'}), [])
+        self.assertEqual(self.search({'search': '&|!'}), [])
+
+    def test_search_composes_with_filters(self):
+        """Test search only returns the user's tasks matching the other filters."""
+        now = timezone.now()
+        create_task(user=self.user, title='Report draft', date_due=now + timedelta(days=1))
+        create_task(user=self.user, title='Report final', date_due=now + timedelta(days=10))
+        create_task(user=self.user, title='Report review', date_due=now + timedelta(days=1), is_completed=True)
+        other_user = get_user_model().objects.create_user(email='other@example.com')
+        create_task(user=other_user, title='Report draft', date_due=now + timedelta(days=1))
+
+        titles = self.search({
+            'search': 'report',
+            'is_completed': 'false',
+            'start_date': now.isoformat(),
+            'end_date': (now + timedelta(days=2)).isoformat(),
+        })
+
+        self.assertEqual(titles, ['Report draft'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Search is only ranked on PostgreSQL.')
+    def test_search_is_ranked(self):
+        """Test title matches rank above description matches, and pages follow the ranking."""
+        create_task(user=self.user, title='Call the bank', description='')
+        create_task(user=self.user, title='Pay rent', description='Call the bank first.')
+        create_task(user=self.user, title='Bank holiday plans', description='Call the bank.')
+        create_task(user=self.user, title='Call mom', description='')
+
+        ranked = self.search({'search': 'bank'})
+        self.assertEqual(ranked[-1], 'Pay rent')
+
+        pages = []
+        res = self.client.get(TASK_URL, {'search': 'bank', 'page_size': 1})
+        while True:
+            pages.append([task['title'] for task in res.data['results']])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual([title for page in pages for title in page], ranked)
+
+        for page in reversed(pages[:-1]):
+            res = self.client.get(res.data['previous'])
+            self.assertEqual([task['title'] for task in res.data['results']], page)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'The search vector is only maintained on PostgreSQL.')
+    def test_search_vector_follows_writes(self):
+        """Test updated and imported tasks are found by their new text."""
+        task = create_task(user=self.user, title='Old title')
+        self.client.patch(detail_url(task.id), {'title': 'Renamed errand'})
+        TaskImporter(self.user, method='copy').run(BytesIO(b'{"title": "Imported errand"}\n'), 'ndjson')
+
+        self.assertEqual(sorted(self.search({'search': 'errand'})), ['Imported errand', 'Renamed errand'])
+        self.assertEqual(self.search({'search': 'old'}), [])
+
+
+@override_settings(READ_REPLICAS={'ALIASES': ['replica_0'], 'PIN_SECONDS': 10, 'CACHE_ALIAS': 'default'})
+@patch.object(replicas, 'choose', return_value=None)
+class TestReadReplicaRouting(TestCase):
+    """Test which task requests may read from a replica."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        self.task = create_task(user=self.user)
+
+    def test_reads_use_replica(self, patched_choose):
+        """Test the list, detail and stats ask for a replica."""
+        self.client.get(TASK_URL)
+        self.client.get(detail_url(self.task.id))
+        self.client.get(STATS_URL)
+
+        self.assertEqual(patched_choose.call_count, 3)
+
+    def test_write_pins_user_to_primary(self, patched_choose):
+        """Test a user's reads stay on the primary after they write."""
+        self.client.post(TASK_URL, {'title': 'New task'})
+
+        self.client.get(TASK_URL)
+
+        patched_choose.assert_not_called()
+        other_client = APIClient()
+        other_client.force_authenticate(get_user_model().objects.create_user(email='other@example.com'))
+        other_client.get(TASK_URL)
+        patched_choose.assert_called_once_with()
+
+    def test_failed_write_does_not_pin(self, patched_choose):
+        """Test a rejected write leaves the user's reads on replicas."""
+        self.client.post(TASK_URL, {'title': ''})
+
+        self.client.get(TASK_URL)
+
+        patched_choose.assert_called_once_with()
+
+
+@override_settings(TASK_ARCHIVE={'AFTER_DAYS': 90})
+class TestTaskArchive(TestCase):
+    """Test archived tasks through the task API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        old = now - timedelta(days=200)
+        self.open = create_task(self.user, title='Open', date_due=now + timedelta(days=1))
+        self.recent = create_task(self.user, title='Recent', is_completed=True, date_completed=now, date_due=now - timedelta(days=1))
+        self.archived = [
+            create_task(self.user, title='Archived due', is_completed=True, date_completed=old, date_due=old - timedelta(days=1)),
+            create_task(self.user, title='Archived undated', is_completed=True, date_completed=old),
+        ]
+        call_command('archive_tasks', stdout=StringIO())
+
+    def list_titles(self, **params):
+        res = self.client.get(TASK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results'] if 'results' in res.data else res.data
+        return [task['title'] for task in results]
+
+    def test_archived_tasks_only_listed_when_reachable(self):
+        """Test archived tasks are listed for completed tasks and old date ranges, in the list order."""
+        self.assertEqual(self.list_titles(), ['Recent', 'Open'])
+        self.assertEqual(self.list_titles(is_completed='false'), ['Open'])
+        self.assertEqual(self.list_titles(is_completed='true'), ['Archived due', 'Recent', 'Archived undated'])
+
+        start = (timezone.now() - timedelta(days=365)).isoformat()
+        end = timezone.now().isoformat()
+        self.assertEqual(self.list_titles(start_date=start, end_date=end), ['Archived due', 'Recent'])
+
+    def test_pages_merge_archived_tasks(self):
+        """Test paging one task at a time walks both tables in order, forwards and backwards."""
+        titles, url = [], f'{TASK_URL}?is_completed=true&page_size=1'
+        while url:
+            res = self.client.get(url)
+            titles.extend(task['title'] for task in res.data['results'])
+            previous, url = res.data['previous'], res.data['next']
+
+        self.assertEqual(titles, ['Archived due', 'Recent', 'Archived undated'])
+        res = self.client.get(previous)
+        self.assertEqual([task['title'] for task in res.data['results']], ['Recent'])
+
+    @override_settings(TASK_FAST_LIST_SERIALIZATION=True)
+    def test_fast_list_serialization(self):
+        """Test the fast list serialization also merges archived tasks."""
+        self.assertEqual(self.list_titles(is_completed='true'), ['Archived due', 'Recent', 'Archived undated'])
+
+    def test_export_includes_archived_tasks(self):
+        """Test exports of completed tasks include archived tasks."""
+        res = self.client.get(EXPORT_URL, {'is_completed': 'true'})
+        lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Archived due', 'Recent', 'Archived undated'])
+
+    def test_unfiltered_exports_include_archived_tasks(self):
+        """Test the export endpoint and command dump archived tasks without any filter."""
+        expected = ['Archived due', 'Recent', 'Open', 'Archived undated']
+        res = self.client.get(EXPORT_URL)
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], expected)
+        res = self.client.get(EXPORT_URL, {'is_completed': 'false'})
+        self.assertEqual([json.loads(line)['title'] for line in b''.join(res.streaming_content).splitlines()], ['Open'])
+
+        out = StringIO()
+        call_command('export_tasks', user=self.user.email, stdout=out)
+        self.assertEqual([json.loads(line)['title'] for line in out.getvalue().splitlines()], expected)
+
+        out = StringIO()
+        call_command('export_tasks', '--all', stdout=out)
+        exported = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(task['title'] for task in exported), sorted(expected))
+        self.assertEqual([task['id'] for task in exported], sorted(task['id'] for task in exported))
+
+    def test_retrieve_archived_task(self):
+        """Test an archived task is read from the archive, without restoring it."""
+        res = self.client.get(detail_url(self.archived[0].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Archived due')
+        self.assertTrue(ArchivedTask.objects.filter(id=self.archived[0].id).exists())
+
+    def test_update_restores_archived_task(self):
+        """Test changing an archived task moves it back to the live tasks first."""
+        task = self.archived[0]
+        res = self.client.patch(detail_url(task.id), {'is_completed': False})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(ArchivedTask.objects.filter(id=task.id).exists())
+        task = Task.objects.get(id=task.id)
+        self.assertFalse(task.is_completed)
+        self.assertEqual(task.date_created, self.archived[0].date_created)
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_count, stats.completed_count), (2, 2))
+
+    def test_delete_restores_archived_task(self):
+        """Test deleting an archived task leaves a tombstone, like any other task."""
+        res = self.client.delete(detail_url(self.archived[1].id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNotNone(Task.all_objects.get(id=self.archived[1].id).date_deleted)
+
+    def test_other_users_archived_task(self):
+        """Test another user's archived task can neither be read nor restored."""
+        other_client = APIClient()
+        other_client.force_authenticate(get_user_model().objects.create_user(email='other@example.com'))
+
+        self.assertEqual(other_client.get(detail_url(self.archived[0].id)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(other_client.delete(detail_url(self.archived[0].id)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(ArchivedTask.objects.filter(id=self.archived[0].id).exists())
+
+    def test_bulk_writes_restore_archived_tasks(self):
+        """Test bulk updates and reopening by id reach archived tasks."""
+        ids = [task.id for task in self.archived]
+        res = self.client.patch(BULK_URL, [{'id': ids[0], 'title': 'Renamed'}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.get(id=ids[0]).title, 'Renamed')
+
+        res = self.client.post(BULK_UNCOMPLETE_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.data, {'updated': 2})
+        self.assertFalse(ArchivedTask.objects.exists())
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_count, stats.completed_count), (3, 1))
+
+    def test_stats_count_archived_tasks(self):
+        """Test archived tasks stay counted as completed."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual((res.data['open'], res.data['completed']), (1, 3))
+        out = StringIO()
+        call_command('reconcile_task_stats', stdout=out)
+        self.assertIn('fixed drift for 0', out.getvalue())
+
+    def test_descending_order_merges_archived_tasks(self):
+        """Test archived tasks are merged in the reverse order too, whole and page by page."""
+        self.assertEqual(self.list_titles(is_completed='true', ordering='-date_due'), ['Archived undated', 'Recent', 'Archived due'])
+
+        titles, url = [], f'{TASK_URL}?is_completed=true&ordering=-date_completed&page_size=2'
+        while url:
+            res = self.client.get(url)
+            titles.extend(task['title'] for task in res.data['results'])
+            url = res.data['next']
+        self.assertEqual(titles[0], 'Recent')
+        self.assertEqual(sorted(titles[1:]), ['Archived due', 'Archived undated'])
+
+    def test_archive_is_reachable(self):
+        """Test which list filters read the archive."""
+        now = timezone.now()
+        self.assertFalse(archive_is_reachable(TaskFilters({}), now))
+        self.assertFalse(archive_is_reachable(TaskFilters({'search': 'old'}), now))
+        self.assertTrue(archive_is_reachable(TaskFilters({'is_completed': 'True'}), now))
+        self.assertFalse(archive_is_reachable(TaskFilters({'is_completed': 'false', 'start_date': '2000-01-01', 'end_date': '2001-01-01'}), now))
+        self.assertTrue(archive_is_reachable(TaskFilters({'start_date': '2000-01-01', 'end_date': '2001-01-01'}), now))
+        recent = (now - timedelta(days=10)).isoformat()
+        self.assertFalse(archive_is_reachable(TaskFilters({'start_date': recent, 'end_date': now.isoformat()}), now))
+
+    def test_archive_may_match(self):
+        """Test which export filters read the archive."""
+        now = timezone.now()
+        self.assertTrue(archive_may_match(TaskFilters({}), now))
+        self.assertTrue(archive_may_match(TaskFilters({'search': 'old'}), now))
+        self.assertFalse(archive_may_match(TaskFilters({'is_completed': 'false'}), now))
+        self.assertFalse(archive_may_match(TaskFilters({'overdue': 'true'}), now))
+        recent = (now - timedelta(days=10)).isoformat()
+        self.assertFalse(archive_may_match(TaskFilters({'start_date': recent}), now))
+
+
+@override_settings(TASK_LIST_CACHE={'ENABLED': True, 'TIMEOUT': 300, 'CACHE_ALIAS': 'task_list'})
+class TestTaskListCache(TestCase):
+    """Test task lists are cached per user until their tasks change."""
+
+    def setUp(self):
+        caches['task_list'].clear()
+        self.addCleanup(caches['task_list'].clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        self.task = create_task(self.user, title='First')
+
+    def list_titles(self, client=None, **params):
+        res = (client or self.client).get(TASK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [task['title'] for task in res.data]
+
+    def test_repeated_list_is_cached(self):
+        """Test the same list, with its query params in any order, is served without queries."""
+        res = self.client.get(f'{TASK_URL}?is_completed=false&search=first')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(f'{TASK_URL}?search=first&is_completed=False')
+
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_cached_list_not_modified(self):
+        """Test a cached list still answers '304 Not Modified' to its ETag."""
+        etag = self.client.get(TASK_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TASK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_are_cached_separately(self):
+        """Test lists with other filters are not served from each other's entries."""
+        create_task(self.user, title='Done', is_completed=True)
+
+        self.assertEqual(self.list_titles(is_completed='false'), ['First'])
+        self.assertEqual(self.list_titles(is_completed='true'), ['Done'])
+
+    def test_writes_invalidate(self):
+        """Test every kind of write through the API is seen by the next list."""
+        writes = [
+            lambda: self.client.post(TASK_URL, {'title': 'Second'}),
+            lambda: self.client.patch(detail_url(self.task.id), {'title': 'Renamed'}),
+            lambda: self.client.post(BULK_COMPLETE_URL, {'ids': [self.task.id]}, format='json'),
+            lambda: self.client.post(BULK_URL, [{'title': 'Third'}], format='json'),
+            lambda: self.client.delete(detail_url(self.task.id)),
+        ]
+        expected = [['First', 'Second'], ['Renamed', 'Second'], ['Second'], ['Second', 'Third'], ['Second', 'Third']]
+        for write, titles in zip(writes, expected):
+            self.list_titles(is_completed='false')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertLess(write().status_code, 400)
+
+            self.assertEqual(sorted(self.list_titles(is_completed='false')), titles)
+
+    def test_write_invalidates_once_committed(self):
+        """Test cached lists are kept until the write's transaction commits."""
+        self.list_titles()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_task(self.user, title='Second')
+        self.assertEqual(self.list_titles(), ['First'])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sorted(self.list_titles()), ['First', 'Second'])
+
+    def test_other_users_lists_are_kept(self):
+        """Test a write only drops the lists of the user who owns the tasks."""
+        other_client = APIClient()
+        other_client.force_authenticate(get_user_model().objects.create_user(email='other@example.com'))
+        other_client.get(TASK_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TASK_URL, {'title': 'Second'})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_titles(other_client), [])
+
+    def test_writes_outside_the_api_invalidate(self):
+        """Test imports and archival from the command line drop the cached lists."""
+        old = timezone.now() - timedelta(days=200)
+        create_task(self.user, title='Old', is_completed=True, date_completed=old, date_due=old)
+        self.assertEqual(sorted(self.list_titles()), ['First', 'Old'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_tasks', stdout=StringIO())
+        self.assertEqual(self.list_titles(), ['First'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskImporter(self.user).run(BytesIO(b'{"title": "Imported"}\n'), 'ndjson')
+        self.assertEqual(sorted(self.list_titles()), ['First', 'Imported'])
+
+    def test_deleting_task_rows_invalidates(self):
+        """Test deleting task rows, rather than soft deleting them, drops the cached lists."""
+        create_task(self.user, title='Second')
+        self.assertEqual(sorted(self.list_titles()), ['First', 'Second'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.get(title='First').delete()
+        self.assertEqual(self.list_titles(), ['Second'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(user=self.user).delete()
+        self.assertEqual(self.list_titles(), [])
+
+    def test_deleting_user_invalidates(self):
+        """Test deleting a user drops their cached lists."""
+        user_id = self.user.pk
+        version = task_list_cache.get_version(user_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertNotEqual(task_list_cache.get_version(user_id), version)
+
+    def test_backends(self):
+        """Test lists are cached and invalidated with the file and Redis backends."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backends = {
+            'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        }
+        try:
+            import django_redis  # noqa: F401
+            import fakeredis
+        except ImportError:
+            pass
+        else:
+            backends['redis'] = {
+                'BACKEND': 'django_redis.cache.RedisCache',
+                'LOCATION': 'redis://localhost:6379/1',
+                'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': fakeredis.FakeConnection, 'server': fakeredis.FakeServer()}},
+            }
+        default = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        for name, backend in backends.items():
+            with self.subTest(backend=name), override_settings(CACHES={'default': default, 'task_list': backend}):
+                titles = self.list_titles()
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.list_titles(), titles)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(TASK_URL, {'title': name})
+                self.assertIn(name, self.list_titles())
+
+
+class TestTaskProjection(TestCase):
+    """Test the 'fields' and 'exclude' query params narrow the output and the columns read."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.tasks = [create_task(self.user, title=f'Task {i}', date_due=now + timedelta(days=i)) for i in range(3)]
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        task_queries = [query['sql'] for query in queries.captured_queries if '"core_task"."title"' in query['sql']]
+        return res, task_queries
+
+    def test_list_fields(self):
+        """Test the list only renders and reads the requested fields."""
+        res, queries = self.get(TASK_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0], {'id': self.tasks[0].id, 'title': 'Task 0'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"date_created"', queries[0])
+
+    def test_detail_exclude(self):
+        """Test the detail leaves out excluded fields, without reading the description."""
+        res, queries = self.get(detail_url(self.tasks[0].id), {'exclude': 'description,date_created'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', res.data)
+        self.assertNotIn('date_created', res.data)
+        self.assertEqual(res.data['title'], 'Task 0')
+        self.assertNotIn('"description"', queries[0])
+
+    def test_fields_and_exclude(self):
+        """Test 'exclude' removes fields from those listed in 'fields'."""
+        res = self.client.get(detail_url(self.tasks[0].id), {'fields': 'id, title,description', 'exclude': 'description'})
+
+        self.assertEqual(res.data, {'id': self.tasks[0].id, 'title': 'Task 0'})
+
+    def test_unknown_field(self):
+        """Test unknown field names are refused."""
+        res = self.client.get(TASK_URL, {'fields': 'id,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('description', str(res.data['fields']))
+
+    def test_paginated_projection(self):
+        """Test pages keep their order and cursors when the ordering field is not rendered."""
+        for fast in [False, True]:
+            with self.subTest(fast=fast), self.settings(TASK_FAST_LIST_SERIALIZATION=fast):
+                titles, url = [], f'{TASK_URL}?fields=title&page_size=2'
+                while url:
+                    res = self.client.get(url)
+                    titles.extend(task['title'] for task in res.data['results'])
+                    url = res.data['next']
+
+                self.assertEqual(titles, ['Task 0', 'Task 1', 'Task 2'])
+                self.assertEqual(res.data['results'], [{'title': 'Task 2'}])
+
+    def test_export_fields(self):
+        """Test exports render only the requested fields."""
+        res = self.client.get(EXPORT_URL, {'fields': 'title'})
+        lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], [{'title': f'Task {i}'} for i in range(3)])
+
+    def test_writes_are_not_projected(self):
+        """Test write responses render every field."""
+        res = self.client.patch(f'{detail_url(self.tasks[0].id)}?fields=id', {'title': 'Renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('description', res.data)
+
+
+class TestTaskFiltering(TestCase):
+    """Test the task list filters and orderings."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='securepassword909')
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now()
+        self.overdue = create_task(self.user, title='Overdue', date_due=self.now - timedelta(days=1))
+        self.upcoming = create_task(self.user, title='Upcoming', date_due=self.now + timedelta(days=1))
+        self.undated = create_task(self.user, title='Undated')
+        self.done = create_task(
+            self.user, title='Done', date_due=self.now - timedelta(days=2), is_completed=True, date_completed=self.now - timedelta(days=3),
+        )
+        Task.objects.filter(id=self.done.id).update(date_created=self.now - timedelta(days=10))
+
+    def list_titles(self, **params):
+        res = self.client.get(TASK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return [task['title'] for task in res.data]
+
+    def test_open_ended_due_ranges(self):
+        """Test due date ranges with only a start or only an end."""
+        self.assertEqual(self.list_titles(start_date=self.now.isoformat()), ['Upcoming'])
+        self.assertEqual(self.list_titles(end_date=self.now.isoformat()), ['Done', 'Overdue'])
+        self.assertEqual(self.list_titles(start_date=(self.now - timedelta(days=1, seconds=1)).isoformat(), end_date=self.now.isoformat()), ['Overdue'])
+
+    def test_overdue(self):
+        """Test 'overdue' keeps the open tasks due in the past, or leaves them out."""
+        self.assertEqual(self.list_titles(overdue='true'), ['Overdue'])
+        self.assertEqual(sorted(self.list_titles(overdue='False')), ['Done', 'Undated', 'Upcoming'])
+
+    def test_created_and_completed_ranges(self):
+        """Test the creation and completion date ranges."""
+        self.assertEqual(self.list_titles(created_before=(self.now - timedelta(days=5)).date().isoformat()), ['Done'])
+        self.assertEqual(sorted(self.list_titles(created_after=(self.now - timedelta(days=5)).isoformat())), ['Overdue', 'Undated', 'Upcoming'])
+        self.assertEqual(self.list_titles(completed_after=(self.now - timedelta(days=4)).isoformat()), ['Done'])
+        self.assertEqual(self.list_titles(completed_before=(self.now - timedelta(days=4)).isoformat()), [])
+
+    def test_ordering(self):
+        """Test each ordering, nulls last ascending and first descending."""
+        self.assertEqual(self.list_titles(ordering='-date_due'), ['Undated', 'Upcoming', 'Overdue', 'Done'])
+        self.assertEqual(self.list_titles(ordering='date_created'), ['Done', 'Overdue', 'Upcoming', 'Undated'])
+        self.assertEqual(self.list_titles(ordering='-date_created'), ['Undated', 'Upcoming', 'Overdue', 'Done'])
+        self.assertEqual(self.list_titles(ordering='date_completed')[0], 'Done')
+        self.assertEqual(self.list_titles(ordering='-date_completed')[-1], 'Done')
+
+    def test_descending_pages(self):
+        """Test paging one task at a time through a descending order, forwards and backwards."""
+        titles, url = [], f'{TASK_URL}?ordering=-date_due&page_size=1'
+        while url:
+            res = self.client.get(url)
+            titles.extend(task['title'] for task in res.data['results'])
+            previous, url = res.data['previous'], res.data['next']
+
+        self.assertEqual(titles, ['Undated', 'Upcoming', 'Overdue', 'Done'])
+        res = self.client.get(previous)
+        self.assertEqual([task['title'] for task in res.data['results']], ['Overdue'])
+
+    def test_overdue_changes_with_time(self):
+        """Test an overdue list is not served from validators or the cache once a task falls due."""
+        res = self.client.get(TASK_URL, {'overdue': 'true'})
+        self.assertNotIn('Last-Modified', res)
+        etag = res['ETag']
+        later = self.now + timedelta(days=1, hours=1)
+
+        with patch('django.utils.timezone.now', return_value=later):
+            res = self.client.get(TASK_URL, {'overdue': 'true'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(task['title'] for task in res.data), ['Overdue', 'Upcoming'])
+
+    @override_settings(TASK_LIST_CACHE={'ENABLED': True, 'TIMEOUT': 300, 'CACHE_ALIAS': 'task_list'})
+    def test_cached_overdue_list_expires(self):
+        """Test a cached overdue list is dropped once the next open task falls due."""
+        caches['task_list'].clear()
+        self.addCleanup(caches['task_list'].clear)
+        self.assertEqual(self.list_titles(overdue='false'), ['Done', 'Upcoming', 'Undated'])
+
+        with patch('django.utils.timezone.now', return_value=self.now + timedelta(hours=1)), self.assertNumQueries(0):
+            self.list_titles(overdue='false')
+        with patch('django.utils.timezone.now', return_value=self.now + timedelta(days=1, hours=1)):
+            self.assertEqual(self.list_titles(overdue='false'), ['Done', 'Undated'])
+
+    def test_invalid_params(self):
+        """Test invalid filter values and orderings are refused, each with its own error."""
+        res = self.client.get(TASK_URL, {'is_completed': 'yes', 'end_date': '2021-02-30', 'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'is_completed', 'end_date', 'ordering'})
+
+    def test_ordering_with_search(self):
+        """Test search results can not be reordered."""
+        res = self.client.get(TASK_URL, {'search': 'done', 'ordering': 'date_created'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,7 +3,7 @@ URL mappings for the task app.
 """
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from task import views
+from task import async_views, views
 
 router = DefaultRouter()
 router.register('', views.TaskViewSet)
@@ -11,5 +11,8 @@ router.register('', views.TaskViewSet)
 app_name = 'task'
 
 urlpatterns = [
+    # Before the router, whose detail route would otherwise match 'async/'.
+    path('async/', async_views.task_list, name='async-task-list'),
+    path('async/<int:pk>/', async_views.task_detail, name='async-task-detail'),
     path('', include(router.urls)),
 ]
@@ -1,12 +1,35 @@
 """
 Views for task API.
 """
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import _positive_int
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 
-from core.models import Task
+from core.authentication import CachedTokenAuthentication
+from core.middleware import add_to_query_budget
+from core.models import ArchivedTask, Task, TaskStats
+from core.routers import pin_to_primary, replica_alias, route_reads_to_replica
 from task import serializers
+from task.archive import CombinedQuerySet, archive_is_reachable, archive_may_match, restore_tasks
+from task.cache import task_list_cache
+from task.conditional import conditional_response, make_etag, set_validators
+from task.export import NDJSONRenderer, iter_tasks
+from task.filters import TaskFilters
+from task.importer import FORMATS, TaskImporter, guess_format
+from task.pagination import TaskKeysetPagination
+from task.stats import get_stats
+from task.sync import decode_watermark, encode_watermark, get_changes
 
 
 class TaskViewSet(viewsets.ModelViewSet):
@@ -15,42 +38,421 @@ class TaskViewSet(viewsets.ModelViewSet):
     """
     serializer_class = serializers.TaskDetailSerializer
     queryset = Task.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskKeysetPagination
+    # Most queries each action may run, including the token lookup, see 'core.middleware'. Imports
+    # run a few queries per batch, and exports stream after the response, so neither has a budget.
+    query_budget = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 5,
+        'update': 6,
+        'partial_update': 6,
+        'destroy': 6,
+        'bulk_create': 5,
+        'bulk_update': 6,
+        'bulk_complete': 5,
+        'bulk_uncomplete': 5,
+        'sync': 2,
+        'stats': 3,
+    }
+    # Rate limit scope of each action, see 'core.throttling'.
+    throttle_scope = {
+        'list': 'read',
+        'retrieve': 'read',
+        'sync': 'read',
+        'stats': 'read',
+        'export': 'bulk',
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'destroy': 'write',
+        'import_tasks': 'bulk',
+        'bulk_create': 'bulk',
+        'bulk_update': 'bulk',
+        'bulk_complete': 'bulk',
+        'bulk_uncomplete': 'bulk',
+    }
+    # Actions whose reads may be served by a read replica, see 'core.routers'.
+    replica_actions = {'list', 'retrieve', 'stats'}
+    # Actions that also read archived tasks for 'is_completed=true' or a date range that may match
+    # them, and actions, full dumps of the user's tasks, that read them whenever they may match.
+    archive_actions = {'list'}
+    dump_actions = {'export'}
+    # Queries a write to an archived task adds to its action's budget: the lookup that missed,
+    # restoring the task (a check, a locking select, a copy, a delete and a savepoint) and the
+    # repeated lookup.
+    restore_query_budget = 8
+    # Actions whose output, and the columns they read, can be narrowed with the 'fields' and
+    # 'exclude' query params, see 'get_projection'.
+    projection_actions = {'list', 'retrieve', 'export'}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self.replica_token = route_reads_to_replica(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Stop reading from the replica, or after a successful write pin the user to the primary and drop their cached lists."""
+        replica_token = getattr(self, 'replica_token', None)
+        if replica_token is not None:
+            replica_alias.reset(replica_token)
+            self.replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user)
+            task_list_cache.invalidate(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
 
     def get_queryset(self):
-        """Retrieve tasks for authenticated user."""
-        self.queryset = self.queryset.filter(user=self.request.user).order_by('date_due')
+        """Retrieve tasks for authenticated user, filtered and ordered by the query params, see 'task.filters'.
+
+        Lists with 'is_completed=true' or a date range, and every export, also read 'ArchivedTask'
+        when their filters may match archived tasks, see 'task.archive'.
+        """
+        filters = self.get_filters()
+        queryset = self.project(filters.filter(self.queryset.filter(user=self.request.user)))
+        if self.action in self.dump_actions:
+            reads_archive = archive_may_match(filters)
+        else:
+            reads_archive = self.action in self.archive_actions and archive_is_reachable(filters)
+        if reads_archive:
+            # The archive is read with one more query.
+            add_to_query_budget(self.request, 1)
+            archived = self.project(filters.filter(ArchivedTask.objects.filter(user=self.request.user)))
+            return CombinedQuerySet(queryset, archived, ordering=filters.ordering)
+        return queryset
+
+    def get_filters(self):
+        """Return the request's 'TaskFilters', raising ValidationError for invalid query params."""
+        if not hasattr(self, '_filters'):
+            self._filters = TaskFilters(self.request.query_params)
+        return self._filters
+
+    def get_ordering(self):
+        """Return the list ordering, for 'TaskKeysetPagination'."""
+        return self.get_filters().ordering
 
-        query_params = self.request.query_params.dict()
-        print(query_params)
+    def get_projection(self):
+        """Return the names of the fields to render, from the comma separated 'fields' and 'exclude' query params.
 
-        # Filter by 'is_completed'.
-        if 'is_completed' in query_params:
-            if query_params['is_completed'].lower() == 'true':
-                self.queryset = self.queryset.filter(is_completed=True)
-            if query_params['is_completed'].lower() == 'false':
-                self.queryset = self.queryset.filter(is_completed=False)
+        Returns None when neither is sent, or for actions outside 'projection_actions'.
+        """
+        if self.action not in self.projection_actions:
+            return None
+        if not hasattr(self, '_projection'):
+            params = self.request.query_params
+            self._projection = None
+            if 'fields' in params or 'exclude' in params:
+                names = list(self.get_serializer_class()().fields)
+                fields = self.parse_field_names('fields', names) if 'fields' in params else names
+                exclude = self.parse_field_names('exclude', names) if 'exclude' in params else []
+                self._projection = [name for name in names if name in fields and name not in exclude]
+        return self._projection
 
-        # Filter by 'due_date'.
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        if start_date and end_date:
-            self.queryset = self.queryset.filter(date_due__range=[start_date, end_date])
+    def parse_field_names(self, param, names):
+        """Return the field names listed in a query param, raising ValidationError for unknown ones."""
+        requested = [name.strip() for name in self.request.query_params[param].split(',') if name.strip()]
+        unknown = [name for name in requested if name not in names]
+        if unknown:
+            raise ValidationError({param: [f'Unknown field "{name}", expected one of: {", ".join(names)}.' for name in unknown]})
+        return requested
 
-        return self.queryset
+    def get_projection_keys(self):
+        """Return the columns read even when their fields are not rendered, for the list order and cursors."""
+        return ['id', self.get_ordering().lstrip('-')]
+
+    def project(self, queryset):
+        """Only read the columns of the fields to render, and 'get_projection_keys'."""
+        fields = self.get_projection()
+        if fields is None:
+            return queryset
+        serializer = self.get_serializer_class()(fields=fields)
+        return queryset.only(*self.get_projection_keys(), *(field.source for field in serializer.fields.values()))
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, rendering only the fields picked by 'get_projection'."""
+        fields = self.get_projection()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
         # Use a different serializer for the list view.
         if self.action == 'list':
             return serializers.TaskSerializer
+        if self.action in ('bulk_complete', 'bulk_uncomplete'):
+            return serializers.TaskIdsSerializer
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """List tasks, answering '304 Not Modified' when none of the user's tasks changed.
+
+        The validators come from an aggregate over all of the user's tasks, tombstones
+        included, so any create, update or delete produces a new ETag. When
+        'TASK_LIST_CACHE["ENABLED"]' is on, responses and their validators are cached per
+        user, see 'task.cache', and served without reading the tasks.
+
+        Filters depending on the time, such as 'overdue', change their result without any
+        write. The aggregate also reads when they next change, which goes into the ETag and
+        expires the cached response, and those lists are sent without 'Last-Modified'.
+        """
+        filters = self.get_filters()
+        cache_key = task_list_cache.make_key(request) if task_list_cache.enabled else None
+        cached = cache_key and task_list_cache.get(cache_key)
+        if cached:
+            etag, last_modified, data = cached
+            response = conditional_response(request, etag, last_modified)
+            if response is not None:
+                return response
+            return set_validators(Response(data), etag, last_modified)
+
+        changes_at = filters.changes_at()
+        aggregate = Task.all_objects.filter(user=request.user).aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('id'),
+            **changes_at,
+        )
+        last_modified = aggregate['last_modified']
+        expires = min(filter(None, (aggregate[name] for name in changes_at)), default=None)
+        etag = make_etag(
+            'list',
+            request.user.pk,
+            last_modified and last_modified.isoformat(),
+            aggregate['count'],
+            expires and expires.isoformat(),
+            request.get_full_path(),
+            request.accepted_media_type,
+        )
+        if changes_at:
+            last_modified = None
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = set_validators(self.list_response(request, *args, **kwargs), etag, last_modified)
+        if cache_key and response.status_code == status.HTTP_200_OK:
+            task_list_cache.set(cache_key, etag, last_modified, response.data, expires)
+        return response
+
+    def list_response(self, request, *args, **kwargs):
+        """Return the list response, built by 'RowSerializer' when 'TASK_FAST_LIST_SERIALIZATION' is on."""
+        if not getattr(settings, 'TASK_FAST_LIST_SERIALIZATION', False):
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = serializers.RowSerializer(self.get_serializer_class(), fields=self.get_projection())
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keep annotations such as the search 'rank', which the paginator orders by.
+        sources = dict.fromkeys([*self.get_projection_keys(), *row_serializer.sources])
+        rows = queryset.values(*sources, *queryset.query.annotations)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.many(page))
+        return Response(row_serializer.many(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a task, answering '304 Not Modified' when it has not changed."""
+        try:
+            last_modified = self.get_queryset().filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag = make_etag(
+            'detail',
+            kwargs['pk'],
+            last_modified.isoformat(),
+            request.get_full_path(),
+            request.accepted_media_type,
+        )
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
+
+    def get_object(self):
+        """Return a task, falling back to the archive.
+
+        Archived tasks are read where they are, and moved back to 'Task' before they are changed.
+        """
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.method in SAFE_METHODS:
+                task = get_object_or_404(ArchivedTask.objects.filter(user=self.request.user), pk=self.kwargs['pk'])
+                self.check_object_permissions(self.request, task)
+                return task
+            if not self.restore(self.kwargs['pk']):
+                raise
+            return super().get_object()
+
+    def restore(self, *ids):
+        """Move the user's archived tasks with the given ids back to 'Task', and return how many were moved.
+
+        Restoring is rare, so its queries are added to the request's budget rather than to every action's.
+        """
+        try:
+            ids = [int(task_id) for task_id in ids]
+        except (TypeError, ValueError):
+            return 0
+        add_to_query_budget(self.request, self.restore_query_budget)
+        return restore_tasks(self.request.user, ids)
+
     def perform_create(self, serializer):
         """Create a new task."""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete a task, leaving a tombstone for sync clients."""
+        instance.soft_delete()
+
     def update(self, request, *args, **kwargs):
         return super().update(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, JSONRenderer])
+    def export(self, request):
+        """Stream every task matching the list filters.
+
+        The output is NDJSON by default, or a JSON array with '?format=json' or an
+        'Accept: application/json' header.
+        """
+        output = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            iter_tasks(self.get_queryset(), self.get_serializer(), output=output),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="tasks.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_tasks(self, request):
+        """Import tasks from an uploaded NDJSON or CSV 'file'.
+
+        Invalid rows are skipped and reported by line number, the rest are created.
+        """
+        upload = request.data.get('file')
+        if not upload:
+            raise ValidationError({'file': ['No file was submitted.']})
+        input_format = request.data.get('format') or guess_format(upload.name)
+        if input_format not in FORMATS:
+            raise ValidationError({'format': [f'Expected one of {", ".join(FORMATS)}.']})
+
+        result = TaskImporter(request.user).run(upload, input_format)
+        return Response(result.as_dict())
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Return the tasks created, updated or deleted since the 'since' watermark.
+
+        Pass the returned 'watermark' as 'since' on the next call. When 'has_more' is true,
+        call again straight away to fetch the rest of the changes.
+        """
+        config = getattr(settings, 'TASK_SYNC', {})
+        watermark = request.query_params.get('since')
+        if watermark:
+            try:
+                position = decode_watermark(watermark)
+            except ValueError:
+                raise ValidationError({'since': ['Invalid watermark.']})
+        else:
+            position = None
+        try:
+            limit = _positive_int(request.query_params['limit'], strict=True, cutoff=config.get('MAX_PAGE_SIZE', 5000))
+        except (KeyError, ValueError):
+            limit = config.get('PAGE_SIZE', 500)
+
+        tasks, has_more = get_changes(Task.all_objects.filter(user=self.request.user), position, limit)
+        if tasks:
+            watermark = encode_watermark(tasks[-1])
+        live_tasks = [task for task in tasks if task.date_deleted is None]
+        return Response({
+            'results': self.get_serializer(live_tasks, many=True).data,
+            'deleted': [task.id for task in tasks if task.date_deleted is not None],
+            'watermark': watermark or None,
+            'has_more': has_more,
+        })
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Return the number of open, completed, overdue and due this week tasks."""
+        return Response(get_stats(request.user))
+
+    def validate_bulk_size(self, items):
+        """Reject bulk payloads that are larger than 'TASK_BULK_MAX_ITEMS'."""
+        max_items = getattr(settings, 'TASK_BULK_MAX_ITEMS', 1000)
+        if isinstance(items, list) and len(items) > max_items:
+            raise ValidationError(f'Bulk requests are limited to {max_items} items.')
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Create many tasks in one request."""
+        self.validate_bulk_size(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=self.request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially update many tasks in one request, each item identified by its 'id'."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of items.')
+        self.validate_bulk_size(items)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        if not all(isinstance(task_id, int) for task_id in ids):
+            raise ValidationError({'id': ['Every item requires an integer id.']})
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'id': ['Each task may only appear once.']})
+
+        tasks = {task.id: task for task in self.get_queryset().filter(id__in=ids)}
+        missing = [task_id for task_id in ids if task_id not in tasks]
+        if missing and self.restore(*missing):
+            tasks.update((task.id, task) for task in self.get_queryset().filter(id__in=missing))
+            missing = [task_id for task_id in ids if task_id not in tasks]
+        if missing:
+            raise ValidationError({'id': [f'Tasks not found: {missing}.']})
+
+        serializer = self.get_serializer([tasks[task_id] for task_id in ids], data=items, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk/complete')
+    def bulk_complete(self, request):
+        """Mark the selected tasks as complete."""
+        return self.set_completed(request, True)
+
+    @action(detail=False, methods=['post'], url_path='bulk/uncomplete')
+    def bulk_uncomplete(self, request):
+        """Mark the selected tasks as not complete."""
+        return self.set_completed(request, False)
+
+    def set_completed(self, request, is_completed):
+        """Complete or reopen tasks selected by 'ids', or by the list filters when no ids are given.
+
+        Only tasks whose state changes are touched, so 'date_completed' follows the same rules as
+        'TaskSerializer.update'.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+        self.validate_bulk_size(ids)
+
+        queryset = self.get_queryset().filter(is_completed=not is_completed)
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        now = timezone.now()
+        values = {'is_completed': is_completed, 'date_completed': now if is_completed else None, 'updated_at': now}
+        with transaction.atomic():
+            updated = queryset.update(**values)
+            # Reopening archived tasks moves them back first, only checked when some ids were not found.
+            if ids is not None and not is_completed and updated < len(ids) and self.restore(*ids):
+                updated += queryset.update(**values)
+            TaskStats.objects.adjust(
+                request.user.id,
+                open_count=-updated if is_completed else updated,
+                completed_count=updated if is_completed else -updated,
+            )
+        return Response({'updated': updated})
@@ -4,7 +4,9 @@ Serializers for the user API view.
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext as _
 
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+
+from core.authentication import login_throttle
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -38,17 +40,30 @@ class AuthTokenSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        """Validate and authenticate the user."""
+        """Validate and authenticate the user.
+
+        Throttled and repeated failed attempts are refused before the password is hashed,
+        see 'core.authentication.LoginThrottle'.
+        """
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        if login_throttle.is_blocked(email):
+            raise exceptions.Throttled(wait=login_throttle.config.get('TIMEOUT', 300))
+
+        encoded = login_throttle.get_stored_password(email)
+        if login_throttle.is_known_failure(email, password, encoded):
+            user = None
+        else:
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password,
+            )
         if not user:
+            login_throttle.add_failure(email, password, encoded)
             msg = _('Unable to authenticate with provided credentials.')
             raise serializers.ValidationError(msg, code='authorization')
 
+        login_throttle.reset(email)
         attrs['user'] = user
         return attrs
@@ -1,13 +1,19 @@
 """
 Tests the user API.
 """
-from django.test import TestCase
-from django.contrib.auth import get_user_model
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import authenticate, get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.authentication import login_throttle
+from core.models import AuthToken
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -108,6 +114,102 @@ class PublicUserAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class TokenIssueTests(TestCase):
+    """Tests tokens are reused until they expire."""
+
+    def setUp(self):
+        login_throttle.cache.clear()
+        self.addCleanup(login_throttle.cache.clear)
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='goodpassword')
+        self.payload = {'email': 'test@example.com', 'password': 'goodpassword'}
+
+    def test_token_is_reused(self):
+        """Test logging in again returns the same token and its expiry."""
+        first = self.client.post(path=TOKEN_URL, data=self.payload)
+        second = self.client.post(path=TOKEN_URL, data=self.payload)
+
+        token = AuthToken.objects.get(user=self.user)
+        self.assertEqual(first.data, {'token': token.key, 'expires': token.expires})
+        self.assertEqual(second.data['token'], token.key)
+
+    def test_expired_token_is_replaced(self):
+        """Test logging in with an expired token issues a new one."""
+        old = AuthToken.objects.create(user=self.user, expires=timezone.now())
+
+        res = self.client.post(path=TOKEN_URL, data=self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], old.key)
+        token = AuthToken.objects.get(user=self.user)
+        self.assertEqual(token.key, res.data['token'])
+        self.assertFalse(token.is_expired())
+
+
+@override_settings(LOGIN_THROTTLE={'MAX_FAILURES': 3, 'TIMEOUT': 300, 'CACHE_ALIAS': 'default'})
+@patch('user.serializers.authenticate', wraps=authenticate)
+class LoginThrottleTests(TestCase):
+    """Tests failed logins are throttled before the password is hashed."""
+
+    def setUp(self):
+        login_throttle.cache.clear()
+        self.addCleanup(login_throttle.cache.clear)
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='goodpassword')
+
+    def login(self, password):
+        return self.client.post(path=TOKEN_URL, data={'email': 'test@example.com', 'password': password})
+
+    def test_blocked_after_max_failures(self, patched_authenticate):
+        """Test an email is refused, even with the right password, once it failed too often."""
+        for password in ('bad1', 'bad2', 'bad3'):
+            self.assertEqual(self.login(password).status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.login('goodpassword')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(patched_authenticate.call_count, 3)
+
+    def test_repeated_failure_is_not_hashed(self, patched_authenticate):
+        """Test a password that already failed is refused without authenticating again."""
+        self.login('badpassword')
+        res = self.login('badpassword')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(patched_authenticate.call_count, 1)
+
+    def test_unknown_email_is_throttled(self, patched_authenticate):
+        """Test failures are counted for emails without a user."""
+        for _ in range(3):
+            self.client.post(path=TOKEN_URL, data={'email': 'nobody@example.com', 'password': 'badpassword'})
+
+        res = self.client.post(path=TOKEN_URL, data={'email': 'nobody@example.com', 'password': 'other'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(patched_authenticate.call_count, 1)
+
+    def test_success_resets_failures(self, patched_authenticate):
+        """Test a successful login forgets the failure count."""
+        self.login('bad1')
+        self.login('bad2')
+        self.assertEqual(self.login('goodpassword').status_code, status.HTTP_200_OK)
+
+        self.login('bad3')
+        self.login('bad4')
+
+        self.assertEqual(self.login('goodpassword').status_code, status.HTTP_200_OK)
+
+    def test_password_change_forgets_failed_password(self, patched_authenticate):
+        """Test a password that failed is accepted once it becomes the user's password."""
+        self.login('newpassword')
+        self.user.set_password('newpassword')
+        self.user.save()
+
+        res = self.login('newpassword')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
 class PrivateUserAPITests(TestCase):
     """Test API requests that require authentication."""
 
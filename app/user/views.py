@@ -1,28 +1,45 @@
 """
 User API views.
 """
-from rest_framework import authentication, generics, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+
+from core.authentication import CachedTokenAuthentication
+from core.models import AuthToken
 from user.serializers import AuthTokenSerializer, UserSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
     """Creates a new user in the system."""
     serializer_class = UserSerializer
+    throttle_scope = 'signup'
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user."""
+    """Create a new auth token for user, or return their token while it is valid."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = AuthToken.objects.issue(serializer.validated_data['user'])
+        return Response({'token': token.key, 'expires': token.expires})
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    # Most queries each method may run, including the token lookup, see 'core.middleware'.
+    query_budget = {'get': 1, 'put': 5, 'patch': 5}
+    # Rate limit scope of each method, see 'core.throttling'.
+    throttle_scope = {'get': 'read', 'put': 'write', 'patch': 'write'}
 
     def get_object(self):
         """Retrieve and return the authenticated user."""